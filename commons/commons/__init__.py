@@ -1,2 +1,3 @@
-from .bearer_auth import BearerAuth
+from .bearer_auth import BearerAuth, RefreshingBearerAuth, Token
 from .command_result import CommandResult
+from .http_client import HttpClient, pooled_session, shared_session
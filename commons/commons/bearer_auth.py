@@ -1,4 +1,9 @@
-from requests import Request, auth
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from requests import Request, Response, auth
 
 
 class BearerAuth(auth.AuthBase):
@@ -22,5 +27,125 @@ class BearerAuth(auth.AuthBase):
 
         :return: Request object with Authorization bearer added.
         """
-        request.headers['Authorization'] = f'Bearer {self._token}'
+        request.headers['Authorization'] = f'Bearer {self.token()}'
+        return request
+
+    def token(self) -> str:
+        """
+        :return: The token sent in the Authorization header.
+        """
+        return self._token
+
+
+@dataclass(frozen=True)
+class Token:
+    """
+    A bearer token as handed out by an authorization server.
+    """
+
+    value: str
+    expires_in: float | None = None
+
+
+@dataclass(frozen=True)
+class _CachedToken:
+    value: str
+    refresh_at: float
+    expires_at: float
+
+
+class RefreshingBearerAuth(BearerAuth):
+    """
+    Bearer authentication fetching its token on demand and caching it
+    until shortly before it expires.
+
+    Only one thread fetches a token at a time, the others waiting for it,
+    or, while the cached one is still valid, keep sending it. A request
+    answered with 401 gets a new token and is sent once more.
+    """
+
+    def __init__(
+        self, fetch: Callable[[], Token], leeway: float = 60.0
+    ) -> None:
+        """
+        Initializes RefreshingBearerAuth object attributes.
+
+        :param fetch: Callable returning a new Token, called whenever the
+                      cached one is missing, rejected or about to expire.
+        :param leeway: Seconds before the expiry a token is refreshed.
+        """
+        self._fetch = fetch
+        self._leeway = leeway
+        self._cached: _CachedToken | None = None
+        self._lock = threading.Lock()
+
+    def __call__(self, request: Request) -> Request:
+        request = super().__call__(request)
+        request.register_hook('response', self._retry_unauthorized)
         return request
+
+    def token(self) -> str:
+        """
+        :return: The cached token, fetching a new one if needed.
+        """
+        cached = self._cached
+        now = time.monotonic()
+        if cached is not None and now < cached.refresh_at:
+            return cached.value
+
+        if cached is not None and now < cached.expires_at:
+            # Still valid, so let a single thread refresh it early.
+            if not self._lock.acquire(blocking=False):
+                return cached.value
+        else:
+            self._lock.acquire()
+
+        try:
+            # Another thread may have refreshed it while this one waited.
+            cached = self._cached
+            if cached is None or time.monotonic() >= cached.refresh_at:
+                cached = self._cached = self._refresh()
+            return cached.value
+        finally:
+            self._lock.release()
+
+    def invalidate(self, token: str | None = None) -> None:
+        """
+        Drops the cached token, so the next request fetches a new one.
+
+        :param token: Only drop it if it is still this one.
+        """
+        with self._lock:
+            cached = self._cached
+            if cached is not None and token in (None, cached.value):
+                self._cached = None
+
+    def _refresh(self) -> _CachedToken:
+        token = self._fetch()
+        now = time.monotonic()
+        if token.expires_in is None:
+            return _CachedToken(token.value, float('inf'), float('inf'))
+
+        expires_at = now + token.expires_in
+        refresh_at = now + max(0.0, token.expires_in - self._leeway)
+        return _CachedToken(token.value, refresh_at, expires_at)
+
+    def _retry_unauthorized(self, response: Response, **kwargs) -> Response:
+        # Hooks are not run on the response of the retry below.
+        if response.status_code != 401:
+            return response
+
+        request = response.request
+        sent = request.headers.get('Authorization', '')
+        self.invalidate(sent.removeprefix('Bearer '))
+
+        # Release the connection to the pool before sending again.
+        response.content
+        response.close()
+        retry = request.copy()
+        retry.headers['Authorization'] = f'Bearer {self.token()}'
+
+        retried = response.connection.send(retry, **kwargs)
+        retried.history.append(response)
+        retried.request = retry
+        return retried
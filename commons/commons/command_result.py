@@ -1,9 +1,191 @@
-from dataclasses import dataclass
-from typing import List
+import io
+from typing import Iterator, List, Tuple
+
+Output = bytes | str | List[str] | None
+
+_UNSET = object()
 
 
-@dataclass
 class CommandResult:
-    stdout: List[str] | None
-    stderr: List[str] | None
-    exit_code: int
+    """
+    Result of a command. The output is kept as the raw bytes the command
+    wrote, and only decoded and split into lines when stdout or stderr
+    are read, so callers checking exit_code alone pay for neither.
+    """
+
+    __slots__ = (
+        'exit_code',
+        'duration',
+        'encoding',
+        '_raw_stdout',
+        '_raw_stderr',
+        '_stdout',
+        '_stderr',
+    )
+
+    def __init__(
+        self,
+        stdout: Output,
+        stderr: Output,
+        exit_code: int,
+        duration: float | None = None,
+        encoding: str = 'utf-8',
+    ) -> None:
+        """
+        Initializes CommandResult object attributes.
+
+        :param stdout: Output of the command, either raw or as lines.
+        :param stderr: Error output of the command, either raw or as lines.
+        :param exit_code: Exit code of the command.
+        :param duration: Seconds the command took, if measured.
+        :param encoding: Encoding the raw output is decoded with.
+        """
+        self.exit_code = exit_code
+        self.duration = duration
+        self.encoding = encoding
+        self._raw_stdout, self._stdout = _store(stdout)
+        self._raw_stderr, self._stderr = _store(stderr)
+
+    @property
+    def stdout(self) -> List[str] | None:
+        """
+        :return: The lines of the output, None if there was none.
+        """
+        if self._stdout is _UNSET:
+            self._stdout = self._split(self._raw_stdout)
+        return self._stdout
+
+    @stdout.setter
+    def stdout(self, value: Output) -> None:
+        self._raw_stdout, self._stdout = _store(value)
+
+    @property
+    def stderr(self) -> List[str] | None:
+        """
+        :return: The lines of the error output, None if there was none.
+        """
+        if self._stderr is _UNSET:
+            self._stderr = self._split(self._raw_stderr)
+        return self._stderr
+
+    @stderr.setter
+    def stderr(self, value: Output) -> None:
+        self._raw_stderr, self._stderr = _store(value)
+
+    @property
+    def raw_stdout(self) -> bytes:
+        """
+        :return: The output as written by the command.
+        """
+        return self._raw(self._raw_stdout, self._stdout)
+
+    @property
+    def raw_stderr(self) -> bytes:
+        """
+        :return: The error output as written by the command.
+        """
+        return self._raw(self._raw_stderr, self._stderr)
+
+    @property
+    def stdout_bytes(self) -> int:
+        """
+        :return: The size of the output, in bytes.
+        """
+        return len(self.raw_stdout)
+
+    @property
+    def stderr_bytes(self) -> int:
+        """
+        :return: The size of the error output, in bytes.
+        """
+        return len(self.raw_stderr)
+
+    def iter_stdout(self) -> Iterator[str]:
+        """
+        Yields the lines of the output one by one, decoding them as they
+        are read instead of building the whole list.
+
+        :return: Iterator over the lines of the output.
+        """
+        return self._iter(self._raw_stdout, self._stdout)
+
+    def iter_stderr(self) -> Iterator[str]:
+        """
+        Yields the lines of the error output one by one.
+
+        :return: Iterator over the lines of the error output.
+        """
+        return self._iter(self._raw_stderr, self._stderr)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CommandResult):
+            return NotImplemented
+        return (self.exit_code, self.stdout, self.stderr) == (
+            other.exit_code,
+            other.stdout,
+            other.stderr,
+        )
+
+    __hash__ = None
+
+    def __reduce__(self) -> tuple:
+        # Rebuilt from the output as given, as the lazily split lines are
+        # marked by a sentinel that would not survive a copy.
+        return (
+            CommandResult,
+            (
+                _given(self._raw_stdout, self._stdout),
+                _given(self._raw_stderr, self._stderr),
+                self.exit_code,
+                self.duration,
+                self.encoding,
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f'CommandResult(exit_code={self.exit_code}, '
+            f'duration={self.duration}, stdout_bytes={self.stdout_bytes}, '
+            f'stderr_bytes={self.stderr_bytes})'
+        )
+
+    def _split(self, raw: bytes | str | None) -> List[str] | None:
+        if not raw:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode(self.encoding, 'replace')
+        return raw.splitlines()
+
+    def _raw(self, raw: bytes | str | None, lines: object) -> bytes:
+        if isinstance(raw, bytes):
+            return raw
+        if raw is None:
+            raw = '\n'.join(lines) if lines and lines is not _UNSET else ''
+        return raw.encode(self.encoding)
+
+    def _iter(self, raw: bytes | str | None, lines: object) -> Iterator[str]:
+        if lines is not _UNSET:
+            yield from lines or ()
+            return
+        if not raw:
+            return
+
+        if isinstance(raw, bytes):
+            stream = io.TextIOWrapper(
+                io.BytesIO(raw), self.encoding, 'replace', newline=None
+            )
+        else:
+            stream = io.StringIO(raw, newline=None)
+        for line in stream:
+            yield line.rstrip('\n')
+
+
+def _store(output: Output) -> Tuple[bytes | str | None, object]:
+    # Lines are kept as given, raw output is split when first read.
+    if output is None or isinstance(output, list):
+        return None, output
+    return output, _UNSET
+
+
+def _given(raw: bytes | str | None, lines: object) -> Output:
+    return lines if raw is None else raw
@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import Collection
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def pooled_session(
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    retries: int = 3,
+    backoff_factor: float = 0.5,
+    retry_statuses: Collection[int] = RETRY_STATUSES,
+) -> Session:
+    """
+    Creates a session keeping connections alive, so requests to the same
+    host skip the TCP and TLS handshakes.
+
+    :param pool_connections: Number of hosts whose connections are kept.
+    :param pool_maxsize: Connections kept per host, which should be at
+                         least the number of threads sharing the session.
+    :param retries: Retries of failed connections, and of idempotent
+                    requests answered with one of retry_statuses.
+    :param backoff_factor: Seconds before the first retry, doubled at
+                           every further one.
+    :param retry_statuses: Statuses worth retrying.
+
+    :return: The configured session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=retry_statuses,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    session = Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+@lru_cache(maxsize=None)
+def shared_session() -> Session:
+    """
+    :return: A pooled session shared by the whole process.
+    """
+    return pooled_session()
+
+
+class HttpClient:
+    """
+    Client of an HTTP API, sending its requests with its own
+    authentication through a pooled session.
+
+    Usage:
+        client = HttpClient(
+            'https://api.host.com/v1',
+            RefreshingBearerAuth(fetch_token),
+        )
+        devices = client.get('devices').json()
+    """
+
+    def __init__(
+        self,
+        base_url: str = '',
+        auth: AuthBase | None = None,
+        timeout: float = 30.0,
+        session: Session | None = None,
+    ) -> None:
+        """
+        Initializes HttpClient object attributes.
+
+        :param base_url: URL the request paths are relative to.
+        :param auth: Authentication of every request, e.g. a BearerAuth.
+        :param timeout: Default seconds to wait for the server.
+        :param session: Session sending the requests, shared_session() if
+                        omitted. Authentication is set per request, so
+                        clients of different APIs can share one.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.auth = auth
+        self.timeout = timeout
+        self.session = session or shared_session()
+
+    def request(self, method: str, path: str, **kwargs) -> Response:
+        """
+        Sends a request, as Session.request does.
+
+        :param method: HTTP method.
+        :param path: Path relative to base_url, or an absolute URL.
+        :param kwargs: Further Session.request arguments.
+
+        :return: The response.
+        """
+        kwargs.setdefault('auth', self.auth)
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, self._url(path), **kwargs)
+
+    def get(self, path: str, **kwargs) -> Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> Response:
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> Response:
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> Response:
+        return self.request('DELETE', path, **kwargs)
+
+    def _url(self, path: str) -> str:
+        if not self.base_url or '://' in path:
+            return path
+        return f'{self.base_url}/{path.lstrip("/")}'
@@ -0,0 +1,53 @@
+import copy
+import pickle
+from unittest import TestCase
+
+from commons import CommandResult
+
+
+class TestCommandResult(TestCase):
+    def test_raw_output_is_split_lazily(self):
+        result = CommandResult(b'one\r\ntwo\n', b'', 0, duration=0.5)
+
+        self.assertNotIsInstance(result._stdout, list)
+        self.assertEqual(result.stdout, ['one', 'two'])
+        self.assertIsNone(result.stderr)
+        self.assertEqual(result.stdout_bytes, 9)
+        self.assertEqual(result.duration, 0.5)
+
+    def test_iterates_without_splitting(self):
+        result = CommandResult('a\nb\rc'.encode(), None, 0)
+
+        self.assertEqual(list(result.iter_stdout()), ['a', 'b', 'c'])
+        self.assertEqual(list(result.iter_stderr()), [])
+
+    def test_lines_are_still_accepted(self):
+        result = CommandResult(None, ['su: not found'], 1)
+
+        self.assertEqual(result, CommandResult(b'', b'su: not found\n', 1))
+        self.assertEqual(result.raw_stderr, b'su: not found')
+        self.assertEqual(list(result.iter_stderr()), ['su: not found'])
+        self.assertFalse(hasattr(result, '__dict__'))
+
+    def test_invalid_bytes_are_replaced(self):
+        result = CommandResult(b'caf\xe9', None, 0)
+
+        self.assertEqual(result.stdout, ['caf�'])
+
+    def test_survives_copies(self):
+        for stdout in (b'one\ntwo\n', ['one', 'two']):
+            result = CommandResult(stdout, None, 0, duration=0.5)
+            copies = [
+                copy.copy(result),
+                copy.deepcopy(result),
+                pickle.loads(pickle.dumps(result)),
+            ]
+            self.assertEqual(result.stdout, ['one', 'two'])
+            copies.append(copy.deepcopy(result))
+
+            for copied in copies:
+                with self.subTest(stdout=stdout, copied=copied):
+                    self.assertEqual(copied.stdout, ['one', 'two'])
+                    self.assertIsNone(copied.stderr)
+                    self.assertEqual(copied.duration, 0.5)
+                    self.assertEqual(copied, result)
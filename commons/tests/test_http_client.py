@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+from commons import HttpClient, RefreshingBearerAuth, Token, pooled_session
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        authorization = self.headers.get('Authorization')
+        self.server.authorizations.append(authorization)
+        status = 401 if authorization in self.server.revoked else 200
+        body = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+class TestHttpClient(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.connections = 0
+        self.server.authorizations = []
+        self.server.revoked = set()
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        ).start()
+        self.fetched = 0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fetch(self, expires_in: float | None = 3600.0) -> Token:
+        self.fetched += 1
+        time.sleep(0.05)
+        return Token(f'token{self.fetched}', expires_in)
+
+    def client(self, auth: RefreshingBearerAuth) -> HttpClient:
+        return HttpClient(
+            f'http://127.0.0.1:{self.server.server_port}/api/',
+            auth,
+            session=pooled_session(),
+        )
+
+    def test_connection_and_token_are_reused(self):
+        client = self.client(RefreshingBearerAuth(self.fetch))
+        for _ in range(5):
+            self.assertEqual(client.get('/devices').status_code, 200)
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.authorizations, ['Bearer token1'] * 5)
+
+    def test_concurrent_refreshes_are_coalesced(self):
+        auth = RefreshingBearerAuth(self.fetch)
+        with ThreadPoolExecutor(8) as executor:
+            tokens = list(executor.map(lambda _: auth.token(), range(8)))
+
+        self.assertEqual(tokens, ['token1'] * 8)
+        self.assertEqual(self.fetched, 1)
+
+    def test_token_is_refreshed_before_expiry(self):
+        auth = RefreshingBearerAuth(lambda: self.fetch(30.0), leeway=60.0)
+        self.assertEqual(auth.token(), 'token1')
+        self.assertEqual(auth.token(), 'token2')
+
+    def test_rejected_token_is_refreshed(self):
+        self.server.revoked.add('Bearer token1')
+        client = self.client(RefreshingBearerAuth(self.fetch))
+
+        response = client.get('devices')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.history[0].status_code, 401)
+        self.assertEqual(
+            self.server.authorizations, ['Bearer token1', 'Bearer token2']
+        )
@@ -0,0 +1,144 @@
+"""
+Synthetic workloads comparing FileCache TTL and eviction policies.
+
+Run from the package root with:
+
+    python -m benchmarks.bench_file_cache --scale 1
+"""
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List
+
+from fcache import FileCache
+
+
+@dataclass(frozen=True)
+class Workload:
+    name: str
+    file_count: int
+    file_size: int
+    accesses: int
+    pick: Callable[[random.Random, int], int]
+
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    ttl: int
+    purge_every: int | None = None
+
+
+def uniform(rng: random.Random, count: int) -> int:
+    return rng.randrange(count)
+
+
+def zipfian(skew: float) -> Callable[[random.Random, int], int]:
+    cumulative: List[float] = []
+
+    def pick(rng: random.Random, count: int) -> int:
+        if len(cumulative) != count:
+            cumulative[:] = itertools.accumulate(
+                1 / (rank**skew) for rank in range(1, count + 1)
+            )
+        return bisect.bisect(cumulative, rng.random() * cumulative[-1])
+
+    return pick
+
+
+def build_workloads(scale: int) -> List[Workload]:
+    return [
+        Workload('many-small', 1000 * scale, 4 << 10, 5000 * scale, uniform),
+        Workload('few-huge', 4, 64 << 20, 16 * scale, uniform),
+        Workload('zipfian', 500 * scale, 64 << 10, 5000 * scale, zipfian(1.1)),
+    ]
+
+
+POLICIES = [
+    # FileCache has no 'never expire' value, ttl=0 expires right away.
+    Policy('no-ttl', ttl=10**9),
+    Policy('ttl-60s', ttl=60),
+    Policy('ttl-60s+purge', ttl=60, purge_every=500),
+    Policy('ttl-0s+purge', ttl=0, purge_every=500),
+]
+
+
+def populate(directory: Path, workload: Workload) -> List[str]:
+    paths = []
+    for index in range(workload.file_count):
+        path = directory / f'{workload.name}-{index}.bin'
+        path.write_bytes(os.urandom(workload.file_size))
+        paths.append(str(path))
+    return paths
+
+
+def run(workload: Workload, policy: Policy, sources: List[str]) -> dict:
+    cache_dir = tempfile.mkdtemp(prefix='fcache-bench-')
+    try:
+        cache = FileCache(cache_dir, policy.ttl)
+        rng = random.Random(16)
+        started = time.perf_counter()
+        for access in range(1, workload.accesses + 1):
+            cache.cache_file(sources[workload.pick(rng, len(sources))])
+            if policy.purge_every and access % policy.purge_every == 0:
+                cache.purge_expired()
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(cache_dir)
+
+    stats = cache.stats()
+    return {
+        'workload': workload.name,
+        'policy': policy.name,
+        'strategy': cache.copy_strategy.value,
+        'hit_rate': stats.hit_rate,
+        'copied_mb': stats.bytes_copied / (1 << 20),
+        'evictions': stats.evictions,
+        'ops_per_s': workload.accesses / elapsed,
+        'elapsed_s': elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--workload', action='append', default=None)
+    args = parser.parse_args()
+
+    header = (
+        f'{"workload":<12} {"policy":<15} {"strategy":<16} '
+        f'{"hit rate":>8} {"copied MB":>10} {"evictions":>9} '
+        f'{"ops/s":>10} {"elapsed s":>9}'
+    )
+    print(header)
+    print('-' * len(header))
+
+    for workload in build_workloads(args.scale):
+        if args.workload and workload.name not in args.workload:
+            continue
+
+        source_dir = Path(tempfile.mkdtemp(prefix='fcache-src-'))
+        try:
+            sources = populate(source_dir, workload)
+            for policy in POLICIES:
+                row = run(workload, policy, sources)
+                print(
+                    f'{row["workload"]:<12} {row["policy"]:<15} '
+                    f'{row["strategy"]:<16} {row["hit_rate"]:>8.2%} '
+                    f'{row["copied_mb"]:>10.1f} {row["evictions"]:>9} '
+                    f'{row["ops_per_s"]:>10.0f} {row["elapsed_s"]:>9.2f}'
+                )
+        finally:
+            shutil.rmtree(source_dir)
+
+
+if __name__ == '__main__':
+    main()
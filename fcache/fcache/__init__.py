@@ -1 +1,6 @@
+from .batch_result import BatchResult
+from .cache_stats import CacheStats
+from .compression import Codec, CompressionPolicy
+from .copy_strategy import CopyStrategy
 from .file_cache import FileCache
+from .memory_tier import MemoryTier
@@ -0,0 +1,17 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of caching several files at once.
+    """
+
+    cached: Dict[str, Path] = field(default_factory=dict)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
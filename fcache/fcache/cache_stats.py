@@ -0,0 +1,102 @@
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict
+
+# Upper bounds, in seconds, of the copy latency histogram buckets.
+LATENCY_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0, float('inf'))
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters describing how a FileCache has been used.
+    """
+
+    hits: int = 0
+    memory_hits: int = 0
+    misses: int = 0
+    expired_refreshes: int = 0
+    bytes_copied: int = 0
+    evictions: int = 0
+    copy_latency: Dict[float, int] = field(
+        default_factory=lambda: dict.fromkeys(LATENCY_BUCKETS, 0)
+    )
+
+    @property
+    def lookups(self) -> int:
+        return (
+            self.hits
+            + self.memory_hits
+            + self.misses
+            + self.expired_refreshes
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        if not self.lookups:
+            return 0.0
+
+        return (self.hits + self.memory_hits) / self.lookups
+
+    def record_copy(self, size: int, elapsed: float) -> None:
+        """
+        Account for a file copied into the cache.
+
+        :param size: Number of bytes read from the source.
+        :param elapsed: Time spent copying, in seconds.
+        """
+        self.bytes_copied += size
+        for bound in LATENCY_BUCKETS:
+            if elapsed <= bound:
+                self.copy_latency[bound] += 1
+                break
+
+    def as_dict(self) -> dict:
+        """
+        Serialize the counters into JSON friendly types.
+
+        :return: A dict with every counter plus the hit rate.
+        """
+        stats = asdict(self)
+        stats['copy_latency'] = {
+            str(bound): count for bound, count in self.copy_latency.items()
+        }
+        stats['hit_rate'] = self.hit_rate
+        return stats
+
+
+class StatsDumper(threading.Thread):
+    """
+    Daemon thread that periodically hands a stats snapshot to a sink.
+    """
+
+    def __init__(
+        self,
+        snapshot: Callable[[], CacheStats],
+        sink: Callable[[CacheStats], None],
+        interval: float,
+    ) -> None:
+        """
+        :param snapshot: Callable returning the current statistics.
+        :param sink: Callable receiving every snapshot.
+        :param interval: Seconds between two dumps.
+        """
+        super().__init__(name='fcache-stats', daemon=True)
+        self._snapshot = snapshot
+        self._sink = sink
+        self._interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self._sink(self._snapshot())
+
+    def stop(self) -> None:
+        """
+        Stop dumping, flushing one last snapshot to the sink.
+        """
+        if self._stopped.is_set():
+            return
+
+        self._stopped.set()
+        self._sink(self._snapshot())
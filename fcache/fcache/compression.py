@@ -0,0 +1,128 @@
+import gzip
+import os
+import shutil
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import BinaryIO, Callable, FrozenSet
+
+from .copy_strategy import _discard, _reserve_temporary
+
+_CHUNK_SIZE = 1 << 20
+
+
+class Codec(str, Enum):
+    """
+    Compression formats supported by the compressed tier. The value is
+    the suffix appended to compressed cache entries.
+    """
+
+    ZSTD = 'zst'
+    LZ4 = 'lz4'
+    GZIP = 'gz'
+
+    @property
+    def suffix(self) -> str:
+        return f'.{self.value}'
+
+
+@dataclass(frozen=True)
+class CompressionPolicy:
+    """
+    Decides which files are stored compressed and how they are read back.
+
+    A file is compressed when its suffix is listed in suffixes or when it
+    is at least min_size bytes long.
+
+    :param codec: The codec used to compress the entries.
+    :param suffixes: File suffixes (e.g. '.log') that are always
+                     compressed.
+    :param min_size: Size threshold in bytes, None disables it.
+    :param hot_tier: If True, cache_file decompresses entries into an
+                     uncompressed hot tier and returns that path. If
+                     False, it returns the compressed entry and readers
+                     should use FileCache.open_cached.
+    """
+
+    codec: Codec = Codec.ZSTD
+    suffixes: FrozenSet[str] = field(default_factory=frozenset)
+    min_size: int | None = None
+    hot_tier: bool = True
+
+    def applies_to(self, path: Path, size: int) -> bool:
+        if path.suffix.lower() in self.suffixes:
+            return True
+
+        return self.min_size is not None and size >= self.min_size
+
+
+def compress_file(source: Path, destination: Path, codec: Codec) -> None:
+    """
+    Atomically write a compressed copy of source at destination.
+
+    :param source: The uncompressed file.
+    :param destination: Where the compressed file must end up.
+    :param codec: The codec to compress with.
+    """
+    opener = get_opener(codec)
+    temporary = _reserve_temporary(destination)
+    try:
+        with open(source, 'rb') as src, opener(temporary, 'wb') as dst:
+            shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+        shutil.copystat(source, temporary)
+        os.replace(temporary, destination)
+    except BaseException:
+        _discard(temporary)
+        raise
+
+
+def decompress_file(source: Path, destination: Path, codec: Codec) -> None:
+    """
+    Atomically write the decompressed contents of source at destination.
+
+    :param source: The compressed file.
+    :param destination: Where the uncompressed file must end up.
+    :param codec: The codec source was compressed with.
+    """
+    temporary = _reserve_temporary(destination)
+    try:
+        with open_decompressed(source, codec) as src, open(
+            temporary, 'xb'
+        ) as dst:
+            shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+        os.replace(temporary, destination)
+    except BaseException:
+        _discard(temporary)
+        raise
+
+
+def open_decompressed(path: Path, codec: Codec) -> BinaryIO:
+    """
+    Open a compressed file as a streaming, decompressing reader.
+
+    :param path: The compressed file.
+    :param codec: The codec path was compressed with.
+    :return: A binary file object yielding the uncompressed data.
+    """
+    return get_opener(codec)(path, 'rb')
+
+
+def get_opener(codec: Codec) -> Callable[[Path, str], BinaryIO]:
+    """
+    Resolve the open() function of a codec.
+
+    :param codec: The desired codec.
+    :return: A callable with the same signature as open(path, mode).
+    :raise ModuleNotFoundError: If the codec's optional dependency is
+                                not installed.
+    """
+    if codec is Codec.ZSTD:
+        import zstandard
+
+        return zstandard.open
+    if codec is Codec.LZ4:
+        import lz4.frame
+
+        return lz4.frame.open
+
+    return gzip.open
@@ -0,0 +1,213 @@
+import errno
+import os
+import shutil
+import tempfile
+import threading
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# Value of the FICLONE ioctl on Linux, only exposed by fcntl on 3.12+.
+FICLONE = getattr(fcntl, 'FICLONE', 0x40049409)
+
+_CHUNK_SIZE = 1 << 30
+_FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.ENOTTY,
+}
+
+
+class CopyStrategy(str, Enum):
+    """
+    The ways a file can be materialized inside the cache, from the
+    fastest to the most portable one.
+    """
+
+    REFLINK = 'reflink'
+    COPY_FILE_RANGE = 'copy_file_range'
+    SENDFILE = 'sendfile'
+    COPY = 'copy'
+    HARDLINK = 'hardlink'
+
+
+# Order in which strategies are attempted. HARDLINK shares the inode with
+# the source, so it is never picked unless explicitly requested.
+FALLBACK_CHAIN: Tuple[CopyStrategy, ...] = (
+    CopyStrategy.REFLINK,
+    CopyStrategy.COPY_FILE_RANGE,
+    CopyStrategy.SENDFILE,
+    CopyStrategy.COPY,
+)
+
+_probed: Dict[Path, CopyStrategy] = {}
+_probed_lock = threading.Lock()
+
+
+def probe_strategy(root_directory: Path) -> CopyStrategy:
+    """
+    Find the fastest strategy supported by the filesystem of a directory.
+
+    The result is memoized per resolved directory, so the probe only
+    touches the disk once per cache root and process.
+
+    :param root_directory: The directory where copies will be written.
+    :return: The first strategy of the fallback chain that works there.
+    """
+    root = Path(root_directory).resolve()
+    with _probed_lock:
+        if root in _probed:
+            return _probed[root]
+
+        strategy = _probe(root)
+        _probed[root] = strategy
+        return strategy
+
+
+def copy_file(
+    source: Path,
+    destination: Path,
+    strategy: CopyStrategy = CopyStrategy.REFLINK,
+) -> CopyStrategy:
+    """
+    Atomically place a copy of source at destination.
+
+    The data is written to a temporary sibling of the destination and
+    renamed over it, so readers never observe a partially written file.
+    If the requested strategy is not supported for this pair of files,
+    the next one in the fallback chain is tried.
+
+    :param source: The file to be copied.
+    :param destination: Where the copy must end up.
+    :param strategy: The preferred strategy.
+    :return: The strategy that was actually used.
+    """
+    source = Path(source)
+    destination = Path(destination)
+
+    if strategy is CopyStrategy.HARDLINK:
+        candidates = (CopyStrategy.HARDLINK,) + FALLBACK_CHAIN
+    else:
+        candidates = FALLBACK_CHAIN[FALLBACK_CHAIN.index(strategy):]
+
+    for candidate in candidates:
+        temporary = _reserve_temporary(destination)
+        try:
+            _STRATEGIES[candidate](source, temporary)
+            if candidate is not CopyStrategy.HARDLINK:
+                shutil.copystat(source, temporary)
+            os.replace(temporary, destination)
+            return candidate
+        except OSError as e:
+            _discard(temporary)
+            if candidate is CopyStrategy.COPY:
+                raise
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+
+    raise AssertionError('unreachable')  # pragma: no cover
+
+
+def _probe(root: Path) -> CopyStrategy:
+    """
+    Try every strategy of the fallback chain on a scratch file.
+
+    :param root: The directory being probed.
+    :return: The first strategy that succeeded.
+    """
+    fd, name = tempfile.mkstemp(prefix='.fcache-probe-', dir=root)
+    source = Path(name)
+    try:
+        os.write(fd, b'fcache')
+        os.close(fd)
+        for strategy in FALLBACK_CHAIN[:-1]:
+            destination = _reserve_temporary(source)
+            try:
+                _STRATEGIES[strategy](source, destination)
+                if destination.read_bytes() == b'fcache':
+                    return strategy
+            except OSError:
+                pass
+            finally:
+                _discard(destination)
+    finally:
+        _discard(source)
+
+    return CopyStrategy.COPY
+
+
+def _reserve_temporary(destination: Path) -> Path:
+    """
+    Build an unused temporary path next to destination.
+
+    :param destination: The final path of the copy.
+    :return: A path in the same directory that does not exist yet.
+    """
+    fd, name = tempfile.mkstemp(
+        prefix=f'.{destination.name}.', suffix='.tmp', dir=destination.parent
+    )
+    os.close(fd)
+    os.unlink(name)
+    return Path(name)
+
+
+def _discard(path: Path) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _reflink(source: Path, destination: Path) -> None:
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, 'reflink is not supported')
+
+    with open(source, 'rb') as src, open(destination, 'xb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _copy_file_range(source: Path, destination: Path) -> None:
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError(errno.ENOSYS, 'copy_file_range is not supported')
+
+    with open(source, 'rb') as src, open(destination, 'xb') as dst:
+        while os.copy_file_range(src.fileno(), dst.fileno(), _CHUNK_SIZE):
+            pass
+
+
+def _sendfile(source: Path, destination: Path) -> None:
+    if not hasattr(os, 'sendfile'):
+        raise OSError(errno.ENOSYS, 'sendfile is not supported')
+
+    with open(source, 'rb') as src, open(destination, 'xb') as dst:
+        offset = 0
+        while True:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, _CHUNK_SIZE)
+            if sent == 0:
+                break
+            offset += sent
+
+
+def _copy(source: Path, destination: Path) -> None:
+    shutil.copyfile(source, destination)
+
+
+def _hardlink(source: Path, destination: Path) -> None:
+    os.link(source, destination)
+
+
+_STRATEGIES = {
+    CopyStrategy.REFLINK: _reflink,
+    CopyStrategy.COPY_FILE_RANGE: _copy_file_range,
+    CopyStrategy.SENDFILE: _sendfile,
+    CopyStrategy.COPY: _copy,
+    CopyStrategy.HARDLINK: _hardlink,
+}
@@ -1,6 +1,25 @@
+import asyncio
+import copy
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from shutil import copy2
+from typing import BinaryIO, Callable, Dict, Iterable, Tuple
+
+from .batch_result import BatchResult
+from .cache_stats import CacheStats, StatsDumper
+from .compression import (
+    Codec,
+    CompressionPolicy,
+    compress_file,
+    decompress_file,
+    get_opener,
+    open_decompressed,
+)
+from .copy_strategy import CopyStrategy, copy_file, probe_strategy
+from .memory_tier import MemoryTier
+
+HOT_DIRECTORY = '.hot'
 
 
 class FileCache:
@@ -8,17 +27,50 @@ class FileCache:
     Implements a file caching system with time-to-live (TTL) control.
     """
 
-    def __init__(self, root_directory: str, ttl: int) -> None:
+    def __init__(
+        self,
+        root_directory: str,
+        ttl: int,
+        copy_strategy: CopyStrategy | None = None,
+        compression: CompressionPolicy | None = None,
+        memory: MemoryTier | None = None,
+    ) -> None:
         """
         Initialize the file cache system.
         :param root_directory: The root directory for cached files.
         :param ttl: Time-to-live for cached files in seconds.
+        :param copy_strategy: How files are copied into the cache. When
+                              omitted, the fastest strategy supported by
+                              the root directory filesystem is probed.
+                              HARDLINK must be requested explicitly and
+                              is only safe for read-only consumers: the
+                              entry is the source's inode, so in-place
+                              edits of the source show up in the cache,
+                              mmap views of MemoryTier included. Its
+                              freshness is tracked by a hidden stamp
+                              file, as touching it would touch the source.
+        :param compression: Opt-in policy for storing entries compressed.
+        :param memory: Optional in-memory tier used by read_cached.
         :raise NotADirectoryError: If the root_directory does not exist.
+        :raise ModuleNotFoundError: If the compression codec requires a
+                                    package that is not installed.
         """
         self.root_directory = Path(root_directory)
         if not self.root_directory.is_dir():
             raise NotADirectoryError('Root directory does not exist')
         self.ttl = ttl
+        self.copy_strategy = copy_strategy or probe_strategy(
+            self.root_directory
+        )
+        self.last_copy_strategy: CopyStrategy | None = None
+        self.compression = compression
+        if compression is not None:
+            get_opener(compression.codec)
+        self.memory = memory
+        self._locks: Dict[Path, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._stats = CacheStats()
+        self._stats_lock = threading.Lock()
 
     def cache_file(self, source_path: str) -> Path | None:
         """
@@ -28,26 +80,297 @@ class FileCache:
         it's copied into the cache. If already in cache and within TTL,
         returns the existing path.
 
+        When a compression policy applies to the file, it is stored
+        compressed and the returned path points to its decompressed copy
+        in the hot tier, or to the compressed entry itself if the hot
+        tier is disabled.
+
         :param source_path: Path to the source file to be cached.
         :return: The Path to the cached file, or None if the file
                  cannot be cached.
         :raise FileNotFoundError: If the source file does not exist.
         """
-        source = Path(source_path)
+        entry, codec = self._ensure_entry(Path(source_path))
+        if codec is None or not self.compression.hot_tier:
+            return entry
+
+        return self._ensure_hot_entry(entry, codec)
+
+    def open_cached(self, source_path: str) -> BinaryIO:
+        """
+        Ensure a file is in the cache and open it for streaming reads.
+
+        Compressed entries are decompressed on the fly, without touching
+        the hot tier.
+
+        :param source_path: Path to the source file to be cached.
+        :return: A binary file object with the uncompressed contents.
+        :raise FileNotFoundError: If the source file does not exist.
+        """
+        entry, codec = self._ensure_entry(Path(source_path))
+        if codec is None:
+            return open(entry, 'rb')
+
+        return open_decompressed(entry, codec)
+
+    def read_cached(self, source_path: str) -> memoryview:
+        """
+        Ensure a file is in the cache and return its whole contents.
+
+        With a memory tier, recently read entries are served straight
+        from memory without any filesystem call until their disk entry
+        expires.
+
+        :param source_path: Path to the source file to be cached.
+        :return: A read-only memoryview of the uncompressed contents.
+        :raise FileNotFoundError: If the source file does not exist.
+        """
+        if self.memory is not None:
+            view = self.memory.get(source_path)
+            if view is not None:
+                self._count('memory_hits')
+                return view
+
+        entry, codec = self._ensure_entry(Path(source_path))
+        expires_at = self._refreshed_at(entry) + self.ttl
+        loader = self.memory.load if self.memory else MemoryTier.load_bytes
+
+        if codec is None:
+            view = loader(entry)
+        elif self.compression.hot_tier:
+            view = loader(self._ensure_hot_entry(entry, codec))
+        else:
+            with open_decompressed(entry, codec) as reader:
+                view = memoryview(reader.read()).toreadonly()
+
+        if self.memory is not None:
+            self.memory.put(source_path, entry, view, expires_at)
+        return view
+
+    def cache_many(
+        self, source_paths: Iterable[str], max_workers: int | None = None
+    ) -> BatchResult:
+        """
+        Cache several files concurrently using a thread pool.
+
+        Copies are I/O bound and release the GIL, so running them in
+        parallel saturates the disk instead of waiting on one copy at a
+        time. Files that map to the same cache entry are serialized.
+
+        :param source_paths: Paths to the source files to be cached.
+        :param max_workers: Maximum number of concurrent copies. Defaults
+                            to the ThreadPoolExecutor default.
+        :return: A BatchResult mapping every source path either to its
+                 cached path or to the exception raised while caching it.
+        """
+        result = BatchResult()
+        unique_paths = list(dict.fromkeys(str(p) for p in source_paths))
+        if not unique_paths:
+            return result
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.cache_file, path): path
+                for path in unique_paths
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result.cached[path] = future.result()
+                except Exception as e:
+                    result.errors[path] = e
+
+        return result
+
+    async def cache_file_async(self, source_path: str) -> Path | None:
+        """
+        Asynchronous version of cache_file.
+
+        The copy runs in the default executor so the event loop is never
+        blocked by disk I/O.
+
+        :param source_path: Path to the source file to be cached.
+        :return: The Path to the cached file, or None if the file
+                 cannot be cached.
+        :raise FileNotFoundError: If the source file does not exist.
+        """
+        return await asyncio.to_thread(self.cache_file, source_path)
+
+    def stats(self) -> CacheStats:
+        """
+        Take a snapshot of the cache usage counters.
+
+        :return: A copy of the counters, safe to keep around.
+        """
+        with self._stats_lock:
+            return copy.deepcopy(self._stats)
+
+    def reset_stats(self) -> None:
+        """
+        Zero every usage counter.
+        """
+        with self._stats_lock:
+            self._stats = CacheStats()
+
+    def start_stats_dump(
+        self, interval: float, sink: Callable[[CacheStats], None]
+    ) -> StatsDumper:
+        """
+        Periodically hand a stats snapshot to sink from a daemon thread.
+
+        :param interval: Seconds between two dumps.
+        :param sink: Callable receiving every snapshot, e.g. a function
+                     appending stats().as_dict() to a JSON lines file.
+        :return: The running StatsDumper, call stop() to end it.
+        """
+        dumper = StatsDumper(self.stats, sink, interval)
+        dumper.start()
+        return dumper
+
+    def purge_expired(self) -> int:
+        """
+        Remove every cache entry that is beyond its TTL.
+
+        :return: The number of evicted entries.
+        """
+        evicted = 0
+        for entry in self.root_directory.iterdir():
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+
+            with self._lock_for(entry):
+                try:
+                    if self._is_file_within_ttl(entry):
+                        continue
+                    entry.unlink()
+                except FileNotFoundError:
+                    continue
+                _stamp_path(entry).unlink(missing_ok=True)
+
+            evicted += 1
+            self._discard_hot_entry(entry)
+            if self.memory is not None:
+                self.memory.invalidate(entry)
+
+        with self._stats_lock:
+            self._stats.evictions += evicted
+        return evicted
+
+    def _ensure_entry(self, source: Path) -> Tuple[Path, Codec | None]:
+        """
+        Make sure the primary cache entry of a source is fresh.
+
+        :param source: The Path of the source file.
+        :return: The Path of the entry and the codec it is compressed
+                 with, or None if it is stored raw.
+        :raise FileNotFoundError: If the source file does not exist.
+        """
         if not source.exists():
             raise FileNotFoundError('Source file does not exist')
 
         cache_path = self.root_directory / source.name
-
         if source.resolve() == cache_path.resolve():
-            cache_path.touch()
-            return cache_path
+            with self._lock_for(cache_path):
+                cache_path.touch()
+            self._count('hits')
+            return cache_path, None
+
+        codec = None
+        if self.compression is not None and self.compression.applies_to(
+            source, source.stat().st_size
+        ):
+            codec = self.compression.codec
+            cache_path = cache_path.with_name(cache_path.name + codec.suffix)
+
+        with self._lock_for(cache_path):
+            if not cache_path.exists():
+                self._count('misses')
+            elif not self._is_file_within_ttl(cache_path):
+                self._count('expired_refreshes')
+            else:
+                self._count('hits')
+                return cache_path, codec
+
+            if self.memory is not None:
+                self.memory.invalidate(cache_path)
+
+            started = time.perf_counter()
+            strategy = None
+            if codec is None:
+                strategy = self.last_copy_strategy = copy_file(
+                    source, cache_path, self.copy_strategy
+                )
+            else:
+                compress_file(source, cache_path, codec)
+            elapsed = time.perf_counter() - started
+
+            stamp = _stamp_path(cache_path)
+            if strategy is CopyStrategy.HARDLINK:
+                # Touching a hardlink would touch the source too.
+                stamp.touch()
+            else:
+                cache_path.touch()  # Update file's modification time
+                stamp.unlink(missing_ok=True)
 
-        if not cache_path.exists() or not self._is_file_within_ttl(cache_path):
-            copy2(source, cache_path)
-            cache_path.touch()  # Update file's modification time
+        with self._stats_lock:
+            self._stats.record_copy(source.stat().st_size, elapsed)
+        return cache_path, codec
 
-        return cache_path
+    def _ensure_hot_entry(self, entry: Path, codec: Codec) -> Path:
+        """
+        Make sure the decompressed copy of a compressed entry is current.
+
+        :param entry: The Path of the compressed entry.
+        :param codec: The codec the entry is compressed with.
+        :return: The Path of the decompressed copy in the hot tier.
+        """
+        hot_directory = self.root_directory / HOT_DIRECTORY
+        hot_path = hot_directory / entry.name[: -len(codec.suffix)]
+
+        with self._lock_for(hot_path):
+            if (
+                not hot_path.exists()
+                or hot_path.stat().st_mtime < entry.stat().st_mtime
+            ):
+                hot_directory.mkdir(exist_ok=True)
+                decompress_file(entry, hot_path, codec)
+
+        return hot_path
+
+    def _discard_hot_entry(self, entry: Path) -> None:
+        """
+        Remove the hot tier copy of a compressed entry, if any.
+
+        :param entry: The Path of the evicted entry.
+        """
+        if self.compression is None:
+            return
+
+        suffix = self.compression.codec.suffix
+        if not entry.name.endswith(suffix):
+            return
+
+        name = entry.name[: -len(suffix)]
+        hot_path = self.root_directory / HOT_DIRECTORY / name
+        with self._lock_for(hot_path):
+            hot_path.unlink(missing_ok=True)
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self._stats, counter, getattr(self._stats, counter) + 1)
+
+    def _lock_for(self, cache_path: Path) -> threading.Lock:
+        """
+        Get the lock guarding a single cache entry.
+
+        :param cache_path: The Path of the cache entry.
+        :return: The lock shared by every caller of that entry.
+        """
+        with self._locks_lock:
+            lock = self._locks.get(cache_path)
+            if lock is None:
+                lock = self._locks[cache_path] = threading.Lock()
+            return lock
 
     def _is_file_within_ttl(self, file_path: Path) -> bool:
         """
@@ -56,6 +379,24 @@ class FileCache:
         :param file_path: The Path to the file being checked.
         :return: True if the file is within TTL, False otherwise.
         """
-        current_time = time.time()
-        file_mod_time = file_path.stat().st_mtime
-        return (current_time - file_mod_time) <= self.ttl
+        return (time.time() - self._refreshed_at(file_path)) <= self.ttl
+
+    def _refreshed_at(self, file_path: Path) -> float:
+        """
+        Get when a cache entry was last refreshed.
+
+        :param file_path: The Path to the cache entry.
+        :return: The modification time of its stamp if it is a hardlink,
+                 of the entry itself otherwise.
+        """
+        if self.copy_strategy is CopyStrategy.HARDLINK:
+            try:
+                return _stamp_path(file_path).stat().st_mtime
+            except FileNotFoundError:
+                pass
+        return file_path.stat().st_mtime
+
+
+def _stamp_path(cache_path: Path) -> Path:
+    # Hidden, so purge_expired skips it like the temporary files.
+    return cache_path.with_name(f'.{cache_path.name}.stamp')
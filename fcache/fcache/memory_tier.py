@@ -0,0 +1,146 @@
+import mmap
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, NamedTuple, Set
+
+
+class _MemoryEntry(NamedTuple):
+    view: memoryview
+    cache_path: Path
+    expires_at: float
+
+
+class MemoryTier:
+    """
+    Bounded LRU of file contents kept in front of a FileCache.
+
+    Entries are served without touching the filesystem until the disk
+    entry they mirror reaches its TTL, and are dropped whenever that disk
+    entry is refreshed or evicted.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entry_size: int = 1 << 20,
+        use_mmap: bool = False,
+    ) -> None:
+        """
+        :param max_bytes: Upper bound of the total size of the entries.
+        :param max_entry_size: Files larger than this are never kept.
+        :param use_mmap: Keep read-only mmap views instead of bytes. Cache
+                         entries are replaced by rename, so a mapping
+                         always sees the contents it was created from,
+                         unless they are hardlinks to a source edited
+                         in place.
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_size = min(max_entry_size, max_bytes)
+        self.use_mmap = use_mmap
+        self.size = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, _MemoryEntry] = OrderedDict()
+        self._keys_by_path: Dict[Path, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> memoryview | None:
+        """
+        Look up a live entry, marking it as recently used.
+
+        :param key: The source path the entry was stored under.
+        :return: The cached contents, or None if absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if time.time() > entry.expires_at:
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return entry.view
+
+    def put(
+        self,
+        key: str,
+        cache_path: Path,
+        view: memoryview,
+        expires_at: float,
+    ) -> None:
+        """
+        Store an entry, evicting the least recently used ones if needed.
+
+        :param key: The source path the entry is looked up by.
+        :param cache_path: The disk entry whose lifetime it follows.
+        :param view: The file contents.
+        :param expires_at: Epoch after which the entry is stale.
+        """
+        if view.nbytes > self.max_entry_size:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            while self._entries and self.size + view.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            self._entries[key] = _MemoryEntry(view, cache_path, expires_at)
+            self._keys_by_path.setdefault(cache_path, set()).add(key)
+            self.size += view.nbytes
+
+    def invalidate(self, cache_path: Path) -> None:
+        """
+        Drop every entry mirroring a disk entry.
+
+        :param cache_path: The disk entry that changed or disappeared.
+        """
+        with self._lock:
+            for key in list(self._keys_by_path.get(cache_path, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_path.clear()
+            self.size = 0
+
+    def load(self, path: Path) -> memoryview:
+        """
+        Read a whole file as a memoryview, honoring use_mmap.
+
+        :param path: The file to be read.
+        :return: A read-only view of its contents.
+        """
+        if not self.use_mmap:
+            return self.load_bytes(path)
+
+        with open(path, 'rb') as file:
+            try:
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty files cannot be mapped
+                return memoryview(b'')
+
+            return memoryview(mapping)
+
+    @staticmethod
+    def load_bytes(path: Path) -> memoryview:
+        with open(path, 'rb') as file:
+            return memoryview(file.read()).toreadonly()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.size -= entry.view.nbytes
+
+        keys = self._keys_by_path[entry.cache_path]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_path[entry.cache_path]
@@ -1,10 +1,17 @@
+import asyncio
 import os
 import shutil
 import tempfile
 from pathlib import Path
 from unittest import TestCase
 
-from fcache import FileCache
+from fcache import (
+    Codec,
+    CompressionPolicy,
+    CopyStrategy,
+    FileCache,
+    MemoryTier,
+)
 
 
 class TestFileCache(TestCase):
@@ -47,3 +54,188 @@ class TestFileCache(TestCase):
         cache = FileCache(self.cache_dir, self.ttl)
         with self.assertRaises(FileNotFoundError):
             cache.cache_file("/path/to/nonexistent/file")
+
+    def test_copy_strategy_is_probed_and_reported(self):
+        cache = FileCache(self.cache_dir, self.ttl)
+        self.assertIn(cache.copy_strategy, list(CopyStrategy))
+        self.assertNotEqual(cache.copy_strategy, CopyStrategy.HARDLINK)
+
+        source_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        source = Path(source_dir) / 'payload.bin'
+        source.write_bytes(os.urandom(4096))
+
+        cached_path = cache.cache_file(str(source))
+        self.assertEqual(cached_path.read_bytes(), source.read_bytes())
+        self.assertIsNotNone(cache.last_copy_strategy)
+
+    def test_every_copy_strategy(self):
+        source_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        source = Path(source_dir) / 'payload.bin'
+        source.write_bytes(os.urandom(4096))
+
+        for strategy in CopyStrategy:
+            with self.subTest(strategy=strategy):
+                cache = FileCache(self.cache_dir, 0, strategy)
+                cached_path = cache.cache_file(str(source))
+                self.assertEqual(
+                    cached_path.read_bytes(), source.read_bytes()
+                )
+
+    def test_hardlink_shares_the_source_inode(self):
+        source_dir = tempfile.mkdtemp(dir=self.cache_dir)
+        source = Path(source_dir) / 'payload.bin'
+        source.write_bytes(b'payload')
+
+        cache = FileCache(self.cache_dir, self.ttl, CopyStrategy.HARDLINK)
+        cached_path = cache.cache_file(str(source))
+
+        self.assertEqual(cache.last_copy_strategy, CopyStrategy.HARDLINK)
+        self.assertTrue(os.path.samefile(cached_path, source))
+
+    def test_hardlink_leaves_the_source_mtime_alone(self):
+        source_dir = tempfile.mkdtemp(dir=self.cache_dir)
+        source = Path(source_dir) / 'payload.bin'
+        source.write_bytes(b'payload')
+        os.utime(source, (0, 0))
+
+        cache = FileCache(self.cache_dir, self.ttl, CopyStrategy.HARDLINK)
+        cached_path = cache.cache_file(str(source))
+
+        self.assertEqual(source.stat().st_mtime, 0)
+        self.assertTrue(cache._is_file_within_ttl(cached_path))
+        self.assertEqual(cache.purge_expired(), 0)
+
+    def test_cache_many(self):
+        source_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        sources = []
+        for index in range(32):
+            source = Path(source_dir) / f'file-{index}.txt'
+            source.write_text(str(index))
+            sources.append(str(source))
+        missing = str(Path(source_dir) / 'missing.txt')
+
+        cache = FileCache(self.cache_dir, self.ttl)
+        result = cache.cache_many(sources + [missing], max_workers=8)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(len(result.cached), 32)
+        self.assertIsInstance(result.errors[missing], FileNotFoundError)
+        for source in sources:
+            self.assertEqual(
+                result.cached[source].read_text(), Path(source).read_text()
+            )
+
+    def test_cache_file_async(self):
+        source_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        source = Path(source_dir) / 'payload.txt'
+        source.write_text('payload')
+
+        cache = FileCache(self.cache_dir, self.ttl)
+        cached_path = asyncio.run(cache.cache_file_async(str(source)))
+        self.assertEqual(cached_path.read_text(), 'payload')
+
+    def test_compressed_tier(self):
+        source_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        log = Path(source_dir) / 'trace.log'
+        log.write_text('event\n' * 10000)
+        small = Path(source_dir) / 'small.bin'
+        small.write_bytes(b'raw')
+
+        policy = CompressionPolicy(Codec.GZIP, suffixes=frozenset({'.log'}))
+        cache = FileCache(self.cache_dir, self.ttl, compression=policy)
+
+        hot_path = cache.cache_file(str(log))
+        compressed_path = Path(self.cache_dir) / 'trace.log.gz'
+        self.assertTrue(compressed_path.exists())
+        self.assertLess(
+            compressed_path.stat().st_size, log.stat().st_size // 5
+        )
+        self.assertEqual(hot_path.read_text(), log.read_text())
+        self.assertEqual(cache.cache_file(str(small)).read_bytes(), b'raw')
+
+        with cache.open_cached(str(log)) as reader:
+            self.assertEqual(reader.read(), log.read_bytes())
+
+    def test_compressed_tier_by_size_without_hot_tier(self):
+        source_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        big = Path(source_dir) / 'dump.bin'
+        big.write_bytes(b'\0' * 4096)
+
+        policy = CompressionPolicy(Codec.GZIP, min_size=1024, hot_tier=False)
+        cache = FileCache(self.cache_dir, self.ttl, compression=policy)
+
+        self.assertEqual(cache.cache_file(str(big)).name, 'dump.bin.gz')
+        with cache.open_cached(str(big)) as reader:
+            self.assertEqual(reader.read(), big.read_bytes())
+
+    def test_stats(self):
+        source_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        source = Path(source_dir) / 'payload.bin'
+        source.write_bytes(b'x' * 100)
+
+        cache = FileCache(self.cache_dir, self.ttl)
+        cached_path = cache.cache_file(str(source))
+        cache.cache_file(str(source))
+
+        old_mtime = os.path.getmtime(cached_path) - (self.ttl + 1)
+        os.utime(cached_path, (old_mtime, old_mtime))
+        cache.cache_file(str(source))
+
+        os.utime(cached_path, (old_mtime, old_mtime))
+        self.assertEqual(cache.purge_expired(), 1)
+        self.assertFalse(cached_path.exists())
+
+        stats = cache.stats()
+        self.assertEqual(stats.hits, 1)
+        self.assertEqual(stats.misses, 1)
+        self.assertEqual(stats.expired_refreshes, 1)
+        self.assertEqual(stats.evictions, 1)
+        self.assertEqual(stats.bytes_copied, 200)
+        self.assertEqual(sum(stats.copy_latency.values()), 2)
+        self.assertAlmostEqual(stats.hit_rate, 1 / 3)
+
+        dumps = []
+        dumper = cache.start_stats_dump(60, dumps.append)
+        dumper.stop()
+        self.assertEqual(dumps[0].as_dict()['hits'], 1)
+
+    def test_memory_tier(self):
+        source_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source_dir)
+        sources = []
+        for index in range(3):
+            source = Path(source_dir) / f'config-{index}.json'
+            source.write_bytes(bytes([index]) * 400)
+            sources.append(str(source))
+
+        for use_mmap in (False, True):
+            with self.subTest(use_mmap=use_mmap):
+                memory = MemoryTier(max_bytes=1000, use_mmap=use_mmap)
+                cache = FileCache(self.cache_dir, self.ttl, memory=memory)
+
+                view = cache.read_cached(sources[0])
+                self.assertEqual(bytes(view), Path(sources[0]).read_bytes())
+                self.assertIs(cache.read_cached(sources[0]), view)
+                self.assertEqual(cache.stats().memory_hits, 1)
+
+                cache.read_cached(sources[1])
+                cache.read_cached(sources[2])
+                self.assertEqual(len(memory), 2)
+                self.assertLessEqual(memory.size, 1000)
+                self.assertIsNone(memory.get(sources[0]))
+
+                cached_path = Path(self.cache_dir) / 'config-2.json'
+                old_mtime = os.path.getmtime(cached_path) - (self.ttl + 1)
+                os.utime(cached_path, (old_mtime, old_mtime))
+                cache.purge_expired()
+                self.assertIsNone(memory.get(sources[2]))
+                self.assertIsNotNone(memory.get(sources[1]))
+                for cached in Path(self.cache_dir).glob('config-*'):
+                    cached.unlink()
@@ -0,0 +1,126 @@
+"""
+Offline benchmarks of Kahlo against the fakes in kahlo.testing.
+
+Run from the package root with:
+
+    python -m benchmarks.bench_kahlo
+"""
+
+import argparse
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from kahlo import FridaServerRepository, Kahlo, KahloFleet, MessageChannel
+from kahlo.testing import FakeAdb, FakeAndroid, FakeDevice, FakeScript
+
+VERSION = '16.2.1'
+
+
+def seeded_repository(directory: str) -> FridaServerRepository:
+    repository = FridaServerRepository(directory, VERSION)
+    binary = Path(directory) / repository.binary_name('arm64')
+    binary.write_bytes(b'frida-server')
+    return repository
+
+
+def bench_channel(batches: int, batch_size: int) -> None:
+    channel = MessageChannel('<IIQd', capacity=64, batch_size=batch_size)
+    script = FakeScript(channel.wrap(''))
+    script.on('message', channel.handler())
+    channel.bind(script)
+
+    record = struct.pack('<IIQd', 1, 2, 3, 4.0)
+    data = record * batch_size
+    payload = {'type': 'kahlo:batch', 'channel': 'events'}
+
+    sent = [0]
+
+    def produce() -> None:
+        for _ in range(batches):
+            # Emulate the agent honouring its credits.
+            while len(script.posted) + 64 <= sent[0]:
+                time.sleep(0)
+            script.send(dict(payload, count=batch_size), data)
+            sent[0] += 1
+        channel.close()
+
+    producer = threading.Thread(target=produce)
+    started = time.perf_counter()
+    producer.start()
+    consumed = sum(1 for _ in channel)
+    elapsed = time.perf_counter() - started
+    producer.join()
+
+    stats = channel.stats
+    print(
+        f'channel: {consumed} records in {elapsed:.2f}s, '
+        f'{consumed / elapsed:,.0f} records/s, '
+        f'{stats.dropped_locally} dropped'
+    )
+
+
+def bench_preconditions(calls: int, latency: float, directory: str) -> None:
+    for ttl in (0.0, 30.0):
+        adb = FakeAdb({'fake': FakeAndroid()}, latency)
+        device = FakeDevice('fake')
+        kahlo = Kahlo(
+            'fake',
+            ttl,
+            seeded_repository(directory),
+            adb,
+            lambda name: device,
+        )
+        started = time.perf_counter()
+        for _ in range(calls):
+            kahlo.is_device_rooted()
+        elapsed = time.perf_counter() - started
+        print(
+            f'preconditions (ttl={ttl:>4}): {calls} checks in '
+            f'{elapsed:.3f}s, {sum(adb.calls.values())} adb calls'
+        )
+
+
+def bench_fleet(devices: int, latency: float, directory: str) -> None:
+    for workers in (1, devices):
+        androids = {f'fake-{index}': FakeAndroid() for index in range(devices)}
+        adb = FakeAdb(androids, latency)
+        fleet = KahloFleet(
+            androids,
+            max_workers=workers,
+            server_repository=seeded_repository(directory),
+            adb=adb,
+            device_factory=lambda name: FakeDevice(name, latency),
+        )
+        started = time.perf_counter()
+        outcomes = fleet.prepare(timeout=5)
+        elapsed = time.perf_counter() - started
+        failures = sum(not outcome.ok for outcome in outcomes.values())
+        print(
+            f'fleet ({devices} devices, {workers:>2} workers): prepared in '
+            f'{elapsed:.2f}s, {failures} failures'
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--batches', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=4096)
+    parser.add_argument('--devices', type=int, default=16)
+    parser.add_argument('--adb-latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='kahlo-bench-')
+    try:
+        bench_channel(args.batches, args.batch_size)
+        bench_preconditions(100, args.adb_latency, directory)
+        bench_fleet(args.devices, args.adb_latency, directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
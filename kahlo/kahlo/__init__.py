@@ -1 +1,7 @@
+from .channel import ChannelStats, MessageChannel, RecordBatch
+from .device_state import DeviceState
+from .fleet import DeviceOutcome, KahloFleet
+from .frida_server import FridaServerRepository
+from .instrumentation import Instrumentation
 from .kahlo import Kahlo
+from .profiler import HotSpot, Profiler
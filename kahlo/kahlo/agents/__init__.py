@@ -0,0 +1,13 @@
+from functools import lru_cache
+from importlib import resources
+
+
+@lru_cache(maxsize=None)
+def read_agent(name: str) -> str:
+    """
+    Read the source of one of the JavaScript agents shipped with Kahlo.
+
+    :param name: The file name, e.g. 'channel.js'.
+    :return: The JavaScript source.
+    """
+    return resources.files(__package__).joinpath(name).read_text()
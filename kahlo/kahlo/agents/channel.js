@@ -0,0 +1,99 @@
+/*
+ * Batches fixed-size binary records and ships them to Python as the
+ * `data` buffer of a single send(). Flow control is credit based: every
+ * batch consumes one credit, Python grants one back for each batch it
+ * consumes. Without credits, records are dropped and accounted for, or,
+ * in lossless mode, the producing thread blocks until a credit arrives.
+ */
+class KahloChannel {
+  static TYPES = {
+    b: [1, 'setInt8'],
+    B: [1, 'setUint8'],
+    h: [2, 'setInt16'],
+    H: [2, 'setUint16'],
+    i: [4, 'setInt32'],
+    I: [4, 'setUint32'],
+    q: [8, 'setBigInt64'],
+    Q: [8, 'setBigUint64'],
+    f: [4, 'setFloat32'],
+    d: [8, 'setFloat64'],
+  };
+
+  constructor(config) {
+    this.name = config.name;
+    this.fields = [];
+    this.recordSize = 0;
+    for (const code of config.format.replace(/^[<=]/, '')) {
+      const [size, setter] = KahloChannel.TYPES[code];
+      const big = code === 'q' || code === 'Q';
+      this.fields.push([this.recordSize, setter, big]);
+      this.recordSize += size;
+    }
+
+    this.capacity = config.batchSize;
+    this.buffer = new ArrayBuffer(this.capacity * this.recordSize);
+    this.view = new DataView(this.buffer);
+    this.count = 0;
+    this.dropped = 0;
+    this.credits = config.credits;
+    this.lossless = config.lossless;
+
+    const type = `kahlo:credit:${this.name}`;
+    const onCredit = (message) => {
+      this.credits += message.credits;
+      this.pending = recv(type, onCredit);
+    };
+    this.pending = recv(type, onCredit);
+
+    if (config.flushInterval > 0) {
+      setInterval(() => this.flush(), config.flushInterval);
+    }
+  }
+
+  push(...values) {
+    if (this.count === this.capacity) {
+      this.flush();
+    }
+
+    let offset = this.count * this.recordSize;
+    const fields = this.fields;
+    for (let i = 0; i !== fields.length; i++) {
+      const [fieldOffset, setter, big] = fields[i];
+      const value = values[i];
+      this.view[setter](
+        offset + fieldOffset,
+        big && typeof value !== 'bigint' ? BigInt(value.toString()) : value,
+        true,
+      );
+    }
+    this.count++;
+  }
+
+  flush() {
+    if (this.count === 0) {
+      return;
+    }
+
+    while (this.credits === 0 && this.lossless) {
+      this.pending.wait();
+    }
+    if (this.credits === 0) {
+      this.dropped += this.count;
+      this.count = 0;
+      return;
+    }
+
+    this.credits--;
+    send(
+      {
+        type: 'kahlo:batch',
+        channel: this.name,
+        count: this.count,
+        dropped: this.dropped,
+      },
+      this.buffer.slice(0, this.count * this.recordSize),
+    );
+    this.count = 0;
+    this.dropped = 0;
+  }
+}
@@ -0,0 +1,154 @@
+/*
+ * Aggregates call counts and log2 latency histograms per selector inside
+ * the agent, and flushes one summary per interval instead of one message
+ * per call. Expects KAHLO_PROFILER = {selectors, flushInterval} to be
+ * declared before this library.
+ */
+const HISTOGRAM_BUCKETS = 32;
+
+const clockGettime = new NativeFunction(
+  Module.getExportByName(null, 'clock_gettime'),
+  'int',
+  ['int', 'pointer'],
+  { scheduling: 'exclusive' },
+);
+const CLOCK_MONOTONIC = 1;
+const timespec = Memory.alloc(2 * Process.pointerSize);
+
+function now() {
+  clockGettime(CLOCK_MONOTONIC, timespec);
+  if (Process.pointerSize === 8) {
+    return (
+      timespec.readS64().toNumber() * 1e9 +
+      timespec.add(8).readS64().toNumber()
+    );
+  }
+  return timespec.readS32() * 1e9 + timespec.add(4).readS32();
+}
+
+function newStat() {
+  return {
+    calls: 0,
+    total: 0,
+    min: Infinity,
+    max: 0,
+    histogram: new Uint32Array(HISTOGRAM_BUCKETS),
+  };
+}
+
+function record(stat, elapsed) {
+  stat.calls++;
+  stat.total += elapsed;
+  if (elapsed < stat.min) stat.min = elapsed;
+  if (elapsed > stat.max) stat.max = elapsed;
+  const bucket = elapsed >= 0xffffffff ? 31 : 31 - Math.clz32(elapsed | 1);
+  stat.histogram[bucket]++;
+}
+
+function hookNative(target, stat) {
+  const separator = target.indexOf('!');
+  const module = separator === -1 ? null : target.slice(0, separator);
+  const name = separator === -1 ? target : target.slice(separator + 1);
+
+  Interceptor.attach(Module.getExportByName(module, name), {
+    onEnter() {
+      this.kahloStart = now();
+    },
+    onLeave() {
+      record(stat, now() - this.kahloStart);
+    },
+  });
+}
+
+// Must run inside Java.perform.
+function hookJava(target, stat) {
+  const separator = target.lastIndexOf('.');
+  const className = target.slice(0, separator);
+  const methodName = target.slice(separator + 1);
+
+  const klass = Java.use(className);
+  for (const overload of klass[methodName].overloads) {
+    overload.implementation = function (...args) {
+      const start = now();
+      try {
+        return overload.apply(this, args);
+      } finally {
+        record(stat, now() - start);
+      }
+    };
+  }
+}
+
+const kahloStats = {};
+const kahloErrors = {};
+const kahloJavaTargets = {};
+
+function install(selector, hook, target) {
+  const stat = newStat();
+  try {
+    hook(target, stat);
+    kahloStats[selector] = stat;
+  } catch (e) {
+    kahloErrors[selector] = e.message;
+  }
+}
+
+for (const selector of KAHLO_PROFILER.selectors) {
+  const separator = selector.indexOf(':');
+  const kind = selector.slice(0, separator);
+  const target = selector.slice(separator + 1);
+
+  if (kind === 'java') {
+    kahloJavaTargets[selector] = target;
+  } else if (kind === 'native') {
+    install(selector, hookNative, target);
+  } else {
+    kahloErrors[selector] = `unknown selector kind "${kind}"`;
+  }
+}
+
+function flushProfile() {
+  const entries = [];
+  for (const [selector, stat] of Object.entries(kahloStats)) {
+    if (stat.calls === 0) continue;
+
+    entries.push({
+      selector,
+      calls: stat.calls,
+      total: stat.total,
+      min: stat.min,
+      max: stat.max,
+      histogram: Array.from(stat.histogram),
+    });
+    Object.assign(stat, newStat());
+  }
+
+  if (entries.length !== 0) {
+    send({ type: 'kahlo:profile', entries });
+  }
+}
+
+function ready() {
+  send({ type: 'kahlo:profile:ready', errors: kahloErrors });
+}
+
+const kahloJavaSelectors = Object.keys(kahloJavaTargets);
+if (kahloJavaSelectors.length === 0) {
+  ready();
+} else if (!Java.available) {
+  for (const selector of kahloJavaSelectors) {
+    kahloErrors[selector] = 'the Java runtime is not available';
+  }
+  ready();
+} else {
+  // Java.perform may defer its callback until the runtime is loaded, so
+  // the host only hears the profile is armed once the hooks are in.
+  Java.perform(() => {
+    for (const selector of kahloJavaSelectors) {
+      install(selector, hookJava, kahloJavaTargets[selector]);
+    }
+    ready();
+  });
+}
+setInterval(flushProfile, KAHLO_PROFILER.flushInterval);
+rpc.exports.kahloFlushProfile = flushProfile;
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import queue
+import struct
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterator, Sequence, Set, Tuple
+
+from frida.core import Script
+
+from .agents import read_agent
+
+MessageHandler = Callable[[dict, bytes | None], None]
+
+RECORD_TYPES = 'bBhHiIqQfd'
+_DTYPES = {
+    'b': '<i1',
+    'B': '<u1',
+    'h': '<i2',
+    'H': '<u2',
+    'i': '<i4',
+    'I': '<u4',
+    'q': '<i8',
+    'Q': '<u8',
+    'f': '<f4',
+    'd': '<f8',
+}
+_CLOSED = object()
+
+
+@dataclass(frozen=True)
+class ChannelStats:
+    batches: int
+    records: int
+    dropped_by_agent: int
+    dropped_locally: int
+
+
+class RecordBatch:
+    """
+    A batch of fixed-size records, decoded lazily from the raw buffer.
+    """
+
+    __slots__ = ('data', 'count', '_struct', '_fields')
+
+    def __init__(
+        self,
+        data: bytes,
+        count: int,
+        record_struct: struct.Struct,
+        fields: Sequence[str] | None = None,
+    ) -> None:
+        self.data = data
+        self.count = count
+        self._struct = record_struct
+        self._fields = fields
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[tuple]:
+        return self._struct.iter_unpack(self.data)
+
+    def to_array(self):
+        """
+        View the batch as a numpy structured array, without copying.
+
+        :return: A read-only numpy array with one row per record.
+        :raise ModuleNotFoundError: If numpy is not installed.
+        """
+        import numpy
+
+        codes = self._struct.format.lstrip('<')
+        names = self._fields or [f'f{index}' for index in range(len(codes))]
+        dtype = numpy.dtype(
+            [(name, _DTYPES[code]) for name, code in zip(names, codes)]
+        )
+        return numpy.frombuffer(self.data, dtype=dtype, count=self.count)
+
+
+class MessageChannel:
+    """
+    Receives batched binary records sent by the KahloChannel agent
+    helper, queueing them for a consumer thread or coroutine.
+
+    The agent only sends a batch when it holds a credit, and a credit is
+    granted back for every batch consumed, so the local queue never
+    grows past capacity. When the consumer falls behind, the agent
+    drops records and reports how many, or, if lossless, blocks the
+    traced thread until the consumer catches up.
+    """
+
+    def __init__(
+        self,
+        record_format: str,
+        name: str = 'events',
+        fields: Sequence[str] | None = None,
+        capacity: int = 64,
+        batch_size: int = 4096,
+        flush_interval: int = 50,
+        lossless: bool = False,
+    ) -> None:
+        """
+        :param record_format: struct format of a record, restricted to
+                              the codes in RECORD_TYPES, little-endian.
+        :param name: Name of the JavaScript constant exposing the channel
+                     to the agent, e.g. events.push(a, b).
+        :param fields: Optional field names, used by to_array().
+        :param capacity: Maximum number of batches in flight.
+        :param batch_size: Number of records per batch.
+        :param flush_interval: Milliseconds between two flushes of a
+                               partial batch, 0 disables it.
+        :param lossless: Block the agent instead of dropping records.
+        :raise ValueError: If the record format is not supported.
+        """
+        codes = record_format.lstrip('<=')
+        if not codes or any(code not in RECORD_TYPES for code in codes):
+            raise ValueError(f'Unsupported record format: {record_format}')
+        if fields is not None and len(fields) != len(codes):
+            raise ValueError('There must be one field name per record code')
+
+        self.name = name
+        self.fields = fields
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lossless = lossless
+        self._struct = struct.Struct(f'<{codes}')
+        self._queue: queue.Queue = queue.Queue()
+        self._script: Script | None = None
+        self._lock = threading.Lock()
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = (
+            set()
+        )
+        self._batches = 0
+        self._records = 0
+        self._dropped_by_agent = 0
+        self._dropped_locally = 0
+
+    @property
+    def stats(self) -> ChannelStats:
+        with self._lock:
+            return ChannelStats(
+                self._batches,
+                self._records,
+                self._dropped_by_agent,
+                self._dropped_locally,
+            )
+
+    def wrap(self, source: str) -> str:
+        """
+        Prepend the agent helper and the channel declaration to a script.
+
+        :param source: The JavaScript source using the channel.
+        :return: The source to be loaded.
+        """
+        config = {
+            'name': self.name,
+            'format': self._struct.format,
+            'batchSize': self.batch_size,
+            'flushInterval': self.flush_interval,
+            'credits': self.capacity,
+            'lossless': self.lossless,
+        }
+        return (
+            f'{agent_library()}\n'
+            f'const {self.name} = new KahloChannel({json.dumps(config)});\n'
+            f'{source}'
+        )
+
+    def bind(self, script: Script) -> None:
+        """
+        Remember the script credits must be granted to.
+
+        :param script: The loaded script created from wrap().
+        """
+        self._script = script
+
+    def handler(
+        self, fallback: MessageHandler | None = None
+    ) -> MessageHandler:
+        """
+        Build the frida message handler feeding the channel.
+
+        :param fallback: Handler for every message that is not a batch of
+                         this channel.
+        :return: A callable to be passed to script.on('message').
+        """
+
+        def on_message(message: dict, data: bytes | None) -> None:
+            payload = message.get('payload')
+            if (
+                message.get('type') != 'send'
+                or not isinstance(payload, dict)
+                or payload.get('type') != 'kahlo:batch'
+                or payload.get('channel') != self.name
+            ):
+                if fallback is not None:
+                    fallback(message, data)
+                return
+
+            self.feed(data, payload.get('count', 0), payload.get('dropped', 0))
+
+        return on_message
+
+    def feed(self, data: bytes | None, count: int, dropped: int = 0) -> None:
+        """
+        Queue a batch received from the agent.
+
+        :param data: The raw records, None if the message had none, in
+                     which case the batch is counted as dropped.
+        :param count: Number of records in data.
+        :param dropped: Records the agent dropped before this batch.
+        """
+        with self._lock:
+            self._batches += 1
+            self._records += count
+            self._dropped_by_agent += dropped
+
+        if data is None or self._queue.qsize() >= self.capacity:
+            with self._lock:
+                self._dropped_locally += count
+            self._grant()
+            return
+
+        self._put(RecordBatch(data, count, self._struct, self.fields))
+
+    def close(self) -> None:
+        """
+        Stop the consumers once the queued batches are drained.
+        """
+        self._put(_CLOSED)
+
+    def batches(self, timeout: float | None = None) -> Iterator[RecordBatch]:
+        """
+        Consume batches until the channel is closed.
+
+        :param timeout: Seconds to wait for each batch, None waits
+                        forever.
+        :raise queue.Empty: If no batch arrived within timeout.
+        """
+        while True:
+            batch = self._queue.get(timeout=timeout)
+            if batch is _CLOSED:
+                # Left for the other consumers.
+                self._queue.put(_CLOSED)
+                return
+
+            self._grant()
+            yield batch
+
+    def __iter__(self) -> Iterator[tuple]:
+        for batch in self.batches():
+            yield from batch
+
+    async def stream(self) -> AsyncIterator[RecordBatch]:
+        """
+        Consume batches from asyncio until the channel is closed.
+
+        Batches are only taken off the queue from the loop, so a consumer
+        cancelled while waiting leaves the next one, and its credit, to
+        whoever consumes next.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                waiter[1].clear()
+                try:
+                    batch = self._queue.get_nowait()
+                except queue.Empty:
+                    await waiter[1].wait()
+                    continue
+
+                if batch is _CLOSED:
+                    self._put(_CLOSED)
+                    return
+
+                self._grant()
+                yield batch
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def _put(self, item: object) -> None:
+        self._queue.put(item)
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # The loop of an abandoned stream was closed.
+
+    def _grant(self) -> None:
+        if self._script is None:
+            return
+
+        self._script.post({'type': f'kahlo:credit:{self.name}', 'credits': 1})
+
+
+def agent_library() -> str:
+    """
+    :return: The JavaScript source of the KahloChannel agent helper.
+    """
+    return read_agent('channel.js')
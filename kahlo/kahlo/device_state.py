@@ -0,0 +1,28 @@
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class DeviceState:
+    """
+    Snapshot of the capabilities of a device, as seen through adb.
+    """
+
+    present: bool = False
+    rooted: bool = False
+    abi: str = ''
+    frida_server_pid: int = 0
+    refreshed_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def is_frida_server_running(self) -> bool:
+        return self.frida_server_pid != 0
+
+    def is_stale(self, ttl: float) -> bool:
+        """
+        Check if the snapshot is older than a TTL.
+
+        :param ttl: Maximum age of the snapshot in seconds.
+        :return: True if the snapshot must be refreshed.
+        """
+        return time.monotonic() - self.refreshed_at > ttl
@@ -3,3 +3,6 @@ from .device_is_not_connected import DeviceIsNotConnceted
 from .device_is_not_rooted import DeviceIsNotRooted
 from .frida_is_already_running import FridaIsAlreadyRunning
 from .frida_is_not_running import FridaIsNotRunning
+from .frida_server_did_not_start import FridaServerDidNotStart
+from .invalid_frida_server_build import InvalidFridaServerBuild
+from .unsupported_abi import UnsupportedAbi
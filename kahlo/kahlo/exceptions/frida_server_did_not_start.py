@@ -0,0 +1,6 @@
+class FridaServerDidNotStart(Exception):
+    def __init__(self, device_name: str, timeout: float) -> None:
+        super().__init__(
+            f'frida-server did not become ready at {device_name} '
+            f'within {timeout} seconds.'
+        )
@@ -0,0 +1,3 @@
+class InvalidFridaServerBuild(Exception):
+    def __init__(self, url: str) -> None:
+        super().__init__(f'The frida-server build at {url} is not an ELF.')
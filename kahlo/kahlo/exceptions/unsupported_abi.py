@@ -0,0 +1,6 @@
+class UnsupportedAbi(Exception):
+    def __init__(self, device_name: str, abi: str) -> None:
+        super().__init__(
+            f'There is no frida-server build for the ABI "{abi}" '
+            f'of {device_name}.'
+        )
@@ -0,0 +1,172 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from frida.core import Device
+from py_adb import Adb
+
+from .frida_server import FridaServerRepository
+from .kahlo import Kahlo
+
+
+@dataclass
+class DeviceOutcome:
+    """
+    Result of running one fleet step on one device.
+    """
+
+    device_name: str
+    result: Any = None
+    error: Exception | None = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class KahloFleet:
+    """
+    Drives many Kahlo instances concurrently with a bounded worker pool.
+    """
+
+    def __init__(
+        self,
+        device_names: Iterable[str],
+        max_workers: int = 8,
+        state_ttl: float = 30.0,
+        server_repository: FridaServerRepository | None = None,
+        adb: Adb | None = None,
+        device_factory: Callable[[str], Device] | None = None,
+    ) -> None:
+        """
+        :param device_names: Serials of the devices in the fleet.
+        :param max_workers: Maximum number of devices handled at once.
+        :param state_ttl: Passed to every Kahlo instance.
+        :param server_repository: Store of frida-server builds shared by
+                                  every device, so each build is
+                                  downloaded once.
+        :param adb: The adb backend shared by every device.
+        :param device_factory: Passed to every Kahlo instance.
+        """
+        self.max_workers = max_workers
+        server_repository = server_repository or FridaServerRepository()
+        adb = adb or Adb()
+        self.kahlos: Dict[str, Kahlo] = {
+            name: Kahlo(
+                name, state_ttl, server_repository, adb, device_factory
+            )
+            for name in dict.fromkeys(device_names)
+        }
+
+    def prepare(self, timeout: float = 10.0) -> Dict[str, DeviceOutcome]:
+        """
+        Ensure frida-server is running and connect, on every device.
+
+        :param timeout: Seconds each device may take to start its server.
+        :return: Outcomes by device, the result being the server pid.
+        """
+
+        def step(kahlo: Kahlo, timings: Dict[str, float]) -> int:
+            with _timed(timings, 'frida_server'):
+                pid = kahlo.ensure_frida_server(timeout)
+            with _timed(timings, 'connect'):
+                kahlo.connect()
+            return pid
+
+        return self._map(step)
+
+    def instrument(
+        self,
+        target: int | str,
+        sources: List[str],
+        on_message: Callable[[str, dict, bytes | None], None] | None = None,
+        spawn: bool = False,
+    ) -> Dict[str, DeviceOutcome]:
+        """
+        Attach to the same target and load the same scripts everywhere.
+
+        :param target: The pid or process name to attach to, or the
+                       package name to spawn.
+        :param sources: JavaScript sources to be loaded, in order.
+        :param on_message: Optional handler, receiving the device name
+                           before the usual frida message arguments.
+        :param spawn: If True, spawn target with spawn_and_instrument
+                      instead of attaching to it.
+        :return: Outcomes by device, the result being the list of
+                 loaded scripts.
+        """
+
+        def step(kahlo: Kahlo, timings: Dict[str, float]) -> list:
+            handler = None
+            if on_message is not None:
+                handler = partial(on_message, kahlo.device_name)
+
+            if spawn:
+                with _timed(timings, 'spawn'):
+                    return kahlo.spawn_and_instrument(
+                        target, sources, handler
+                    ).scripts
+
+            with _timed(timings, 'attach'):
+                session = kahlo.attach(target)
+            with _timed(timings, 'load'):
+                return [
+                    kahlo.load_script(session, source, handler)
+                    for source in sources
+                ]
+
+        return self._map(step)
+
+    def run(
+        self, workflow: Callable[[Kahlo], Any]
+    ) -> Dict[str, DeviceOutcome]:
+        """
+        Run an arbitrary workflow on every device.
+
+        :param workflow: Callable receiving the Kahlo of each device.
+        :return: Outcomes by device, the result being what workflow
+                 returned.
+        """
+
+        def step(kahlo: Kahlo, timings: Dict[str, float]) -> Any:
+            with _timed(timings, 'workflow'):
+                return workflow(kahlo)
+
+        return self._map(step)
+
+    def _map(
+        self, step: Callable[[Kahlo, Dict[str, float]], Any]
+    ) -> Dict[str, DeviceOutcome]:
+        """
+        Run a step on every device, never letting one failure stop the
+        others.
+
+        :param step: Callable receiving the Kahlo and its timings dict.
+        :return: Outcomes by device, in the order devices were given.
+        """
+
+        def run_one(kahlo: Kahlo) -> DeviceOutcome:
+            outcome = DeviceOutcome(kahlo.device_name)
+            try:
+                with _timed(outcome.timings, 'total'):
+                    outcome.result = step(kahlo, outcome.timings)
+            except Exception as e:
+                outcome.error = e
+            return outcome
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            outcomes = executor.map(run_one, self.kahlos.values())
+            return {outcome.device_name: outcome for outcome in outcomes}
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - started
@@ -0,0 +1,125 @@
+import hashlib
+import lzma
+import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Dict
+
+import frida
+from fcache import FileCache
+
+from .exceptions import InvalidFridaServerBuild
+
+ABI_TO_ARCH = {
+    'arm64-v8a': 'arm64',
+    'armeabi-v7a': 'arm',
+    'armeabi': 'arm',
+    'x86_64': 'x86_64',
+    'x86': 'x86',
+}
+RELEASE_URL = (
+    'https://github.com/frida/frida/releases/download/'
+    '{version}/{name}.xz'
+)
+# Builds are immutable per version, so a cached one is never downloaded
+# again. get() refreshes the build it returns, and builds left unused
+# for that long, e.g. of older versions, are purged on every download.
+SERVER_TTL = 60 * 60 * 24 * 30
+ELF_MAGIC = b'\x7fELF'
+
+
+def default_cache_directory() -> Path:
+    cache_home = os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache_home) / 'kahlo' / 'frida-server'
+
+
+class FridaServerRepository:
+    """
+    Local, fcache-backed store of frida-server binaries.
+    """
+
+    def __init__(
+        self,
+        cache_directory: str | None = None,
+        version: str = frida.__version__,
+    ) -> None:
+        """
+        :param cache_directory: Where binaries are kept. Defaults to
+                                $XDG_CACHE_HOME/kahlo/frida-server.
+        :param version: The frida-server version, which must match the
+                        installed frida bindings.
+        """
+        directory = Path(cache_directory or default_cache_directory())
+        directory.mkdir(parents=True, exist_ok=True)
+
+        self.version = version
+        self._cache = FileCache(str(directory), SERVER_TTL)
+        self._digests: Dict[Path, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def arch_for(abi: str) -> str | None:
+        return ABI_TO_ARCH.get(abi)
+
+    def binary_name(self, arch: str) -> str:
+        return f'frida-server-{self.version}-android-{arch}'
+
+    def get(self, arch: str) -> Path:
+        """
+        Get the local path of a frida-server build, downloading it once.
+
+        :param arch: The frida architecture name (e.g. 'arm64').
+        :return: The Path of the cached, uncompressed binary.
+        """
+        name = self.binary_name(arch)
+        with self._lock:
+            cached = self._cache.root_directory / name
+            if cached.is_file():
+                return self._cache.cache_file(str(cached))
+
+            binary = self._download(name)
+            self._cache.purge_expired()
+            return binary
+
+    def sha256(self, path: Path) -> str:
+        """
+        Hash a cached binary, memoizing the digest.
+
+        :param path: The Path returned by get().
+        :return: The hex encoded SHA-256 of the file.
+        """
+        digest = self._digests.get(path)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b''):
+                    sha256.update(chunk)
+            digest = self._digests[path] = sha256.hexdigest()
+        return digest
+
+    def _download(self, name: str) -> Path:
+        """
+        Fetch and decompress a build from the frida GitHub releases.
+
+        :param name: The binary name, without the .xz suffix.
+        :return: The Path of the binary inside the cache.
+        :raise InvalidFridaServerBuild: If the download is not an ELF.
+        """
+        url = RELEASE_URL.format(version=self.version, name=name)
+        staging = Path(tempfile.mkdtemp(prefix='kahlo-'))
+        try:
+            binary = staging / name
+            with urllib.request.urlopen(url, timeout=60) as response:  # nosec
+                with lzma.open(response) as xz, open(binary, 'wb') as out:
+                    shutil.copyfileobj(xz, out)
+
+            # Also rejects an empty file, before it reaches the device.
+            with open(binary, 'rb') as file:
+                if file.read(len(ELF_MAGIC)) != ELF_MAGIC:
+                    raise InvalidFridaServerBuild(url)
+            return self._cache.cache_file(str(binary))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
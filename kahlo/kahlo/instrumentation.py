@@ -0,0 +1,15 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from frida.core import Script, Session
+
+
+@dataclass
+class Instrumentation:
+    """
+    A process Kahlo spawned and instrumented before it started running.
+    """
+
+    pid: int
+    session: Session
+    scripts: List[Script] = field(default_factory=list)
@@ -1,68 +1,585 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Callable, Dict, List, Tuple
+
 import frida
-from frida.core import Device
+from frida.core import Device, Script, Session
 from py_adb import Adb
 
+from .channel import MessageChannel, MessageHandler
+from .device_state import DeviceState
 from .exceptions import (
     DeviceDoesNotExists,
     DeviceIsNotConnceted,
     DeviceIsNotRooted,
     FridaIsAlreadyRunning,
-    FridaIsNotRunning
+    FridaIsNotRunning,
+    FridaServerDidNotStart,
+    UnsupportedAbi,
 )
+from .frida_server import FridaServerRepository
+from .instrumentation import Instrumentation
+from .profiler import Profiler
+
+FRIDA_SERVER_NAME = 'frida-server'
+FRIDA_SERVER_PATH = f'/data/local/tmp/{FRIDA_SERVER_NAME}'
+POLL_INTERVAL = 0.1
+# Seconds the health probe gives frida to find the device.
+PROBE_TIMEOUT = 1
 
 
 class Kahlo:
-    def __init__(self, device_name: str):
+    def __init__(
+        self,
+        device_name: str,
+        state_ttl: float = 30.0,
+        server_repository: FridaServerRepository | None = None,
+        adb: Adb | None = None,
+        device_factory: Callable[[str], Device] | None = None,
+    ):
         """
         Initialize the Kahlo wrapper with a specific device.
 
         :param device_name: The identifier of the device to be used.
+        :param state_ttl: Seconds during which the device capabilities
+                          (presence, root, ABI and frida-server pid) are
+                          trusted before being checked again through adb.
+        :param server_repository: Local store of frida-server builds,
+                                  created on first use if omitted.
+        :param adb: The adb backend, a new Adb if omitted.
+        :param device_factory: Resolves a device name into a frida
+                               Device, frida.get_device if omitted.
         """
         self.device_name: str = device_name
-        self._sessions = set()
+        self.state_ttl: float = state_ttl
+        self._sessions: Dict[int, Session] = {}
+        self._sessions_lock = threading.Lock()
+        self._compiled_scripts: Dict[str, bytes] = {}
+        self._gated_sources: Dict[int, Tuple[List[str], MessageHandler]] = {}
+        # Gated children are handled away from frida's signal thread, as
+        # instrumenting them calls blocking frida APIs.
+        self._children = ThreadPoolExecutor(1, 'kahlo-children')
         self._device: Device | None = None
         self._is_connected: bool = False
-        self._adb: Adb = Adb()
+        self._adb: Adb = adb or Adb()
+        self._device_factory = device_factory
+        self._state: DeviceState | None = None
+        self._state_lock = threading.Lock()
+        self._server_repository = server_repository
+
+    @property
+    def state(self) -> DeviceState:
+        """
+        The device capabilities, probed through adb at most once per TTL.
+        """
+        with self._state_lock:
+            if self._state is None or self._state.is_stale(self.state_ttl):
+                self._state = self._probe_state()
+            return self._state
+
+    def refresh(self) -> DeviceState:
+        """
+        Probe the device capabilities again, ignoring the TTL.
+
+        :return: The fresh device state.
+        """
+        with self._state_lock:
+            self._state = self._probe_state()
+            return self._state
+
+    def invalidate(self) -> None:
+        """
+        Forget the device capabilities, so the next check probes again.
+        """
+        with self._state_lock:
+            self._state = None
+
+    @property
+    def device(self) -> Device:
+        """
+        The frida device, available once connect() succeeded.
+        """
+        self._enforce_device_connection()
+        return self._device
 
-    def kill_frida_server(self) -> None:
+    def attach(self, target: int | str) -> Session:
+        """
+        Attach to a running process, reusing the pooled session if this
+        process was already attached to and is still alive.
+
+        :param target: The pid or the process name.
+        :return: The frida session.
+        """
+        pid = target
+        if not isinstance(target, int):
+            pid = self.device.get_process(target).pid
+
+        with self._sessions_lock:
+            pooled = self._sessions.get(pid)
+        if pooled is not None and not pooled.is_detached():
+            return pooled
+
+        # Attaching blocks, and frida's signal thread takes the lock to
+        # forget detached sessions, so it must not be held meanwhile.
+        session = self.device.attach(pid)
+        session.on(
+            'detached',
+            lambda reason, crash: self._forget_session(pid, session),
+        )
+
+        with self._sessions_lock:
+            pooled = self._sessions.get(pid)
+            if pooled is None or pooled.is_detached():
+                self._sessions[pid] = session
+                return session
+
+        # Another thread attached first, keep its session.
+        session.detach()
+        return pooled
+
+    def detach_all(self) -> None:
+        """
+        Detach every pooled session.
+        """
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+
+        for session in sessions:
+            if not session.is_detached():
+                session.detach()
+
+    def spawn_and_instrument(
+        self,
+        package: str,
+        sources: List[str],
+        on_message: MessageHandler | None = None,
+        child_gating: bool = False,
+    ) -> Instrumentation:
+        """
+        Spawn an app suspended, load scripts and only then resume it, so
+        hooks are in place before its first instruction runs.
+
+        :param package: The package name of the app.
+        :param sources: JavaScript sources to be loaded, in order.
+        :param on_message: Optional handler for messages sent by them.
+        :param child_gating: If True, every child process the app
+                             spawns is suspended, receives the same
+                             scripts and is then resumed.
+        :return: The spawned pid, its session and loaded scripts.
+        """
+        pid = self.device.spawn(package)
+        try:
+            instrumentation = self._instrument_suspended(
+                pid, sources, on_message, child_gating
+            )
+        except Exception:
+            self.device.kill(pid)
+            raise
+
+        self.device.resume(pid)
+        return instrumentation
+
+    def load_script(
+        self,
+        session: Session,
+        source: str,
+        on_message: MessageHandler | None = None,
+        channel: MessageChannel | None = None,
+    ) -> Script:
+        """
+        Create and load a script in a session.
+
+        Sources are compiled to bytecode once and the bytecode is reused
+        for every later load of the same source, on any session.
+
+        :param session: The session returned by attach().
+        :param source: The JavaScript source of the agent.
+        :param on_message: Optional handler for messages sent by it.
+        :param channel: Optional MessageChannel exposed to the agent.
+                        Batches go to the channel, every other message
+                        to on_message.
+        :return: The loaded frida script.
+        """
+        if channel is not None:
+            source = channel.wrap(source)
+            on_message = channel.handler(on_message)
+
+        script = self._create_script(session, source)
+        if on_message is not None:
+            script.on('message', on_message)
+        if channel is not None:
+            channel.bind(script)
+        script.load()
+        return script
+
+    def profile(
+        self,
+        session: Session,
+        selectors: List[str],
+        flush_interval: int = 1000,
+        on_message: MessageHandler | None = None,
+        timeout: float = 10.0,
+    ) -> Profiler:
+        """
+        Install profiling hooks in a session.
+
+        :param session: The session returned by attach().
+        :param selectors: 'java:<class>.<method>' or
+                          'native:[<module>!]<export>' selectors.
+        :param flush_interval: Milliseconds between two summaries.
+        :param on_message: Optional handler for every other message.
+        :param timeout: Seconds to wait for the hooks to be installed.
+        :return: The Profiler, whose report() lists the hot spots.
+            Selectors that could not be hooked are in its errors.
+        """
+        profiler = Profiler(selectors, flush_interval)
+        profiler.script = self.load_script(
+            session, profiler.source(), profiler.handler(on_message)
+        )
+        profiler.wait_until_ready(timeout)
+        return profiler
+
+    def ensure_frida_server(self, timeout: float = 10.0) -> int:
+        """
+        Make sure a healthy frida-server is running on the device.
+
+        Idempotent: a running server is left untouched, otherwise the
+        right build is deployed if needed and started.
+
+        :param timeout: Seconds to wait for the server to become ready.
+        :return: The pid of frida-server.
+        """
+        state = self._enforce_dependencies()
+        if state.is_frida_server_running:
+            # The pid may be up to state_ttl old, and the server dead since.
+            if self._is_frida_server_healthy():
+                return state.frida_server_pid
+
+            self.invalidate()
+            state = self._enforce_dependencies()
+            if state.is_frida_server_running:
+                pid = self._wait_for_frida_server(timeout)
+                self._update_state(frida_server_pid=pid)
+                return pid
+
+        self._deploy_frida_server(state)
+        return self._start_frida_server(state, timeout)
+
+    def deploy_frida_server(self) -> bool:
+        """
+        Push the frida-server build matching the device ABI, unless the
+        one already on the device has the same SHA-256.
+
+        :return: True if the binary was pushed, False if it was current.
+        :raise UnsupportedAbi: If frida has no build for the device ABI.
+        """
+        return self._deploy_frida_server(self._enforce_dependencies())
+
+    def start_frida_server(self, timeout: float = 10.0) -> int:
+        """
+        Start the deployed frida-server as root in the background and
+        wait until it answers.
+
+        :param timeout: Seconds to wait for the server to become ready.
+        :return: The pid of frida-server.
+        :raise FridaIsAlreadyRunning: If frida-server is already running.
+        :raise FridaServerDidNotStart: If it is not ready within timeout.
+        """
+        state = self._enforce_dependencies()
+        return self._start_frida_server(state, timeout)
+
+    def kill_frida_server(self, timeout: float = 5.0) -> None:
+        """
+        Kill frida-server as root and wait for it to exit.
+
+        :param timeout: Seconds to wait for the process to go away.
+        :raise FridaIsNotRunning: If frida-server is not running.
+        """
         self._enforce_dependencies()
-        if not self.is_frida_server_running():
+        pids = self._adb.pgrep(self.device_name, FRIDA_SERVER_NAME)
+        if not pids:
+            self._update_state(frida_server_pid=0)
             raise FridaIsNotRunning(self.device_name)
 
-        # TODO: Literally kill the frida-server proccess as root.
+        self._adb.shell(
+            self.device_name, ['kill'] + [str(pid) for pid in pids], True
+        )
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self._adb.pgrep(self.device_name, FRIDA_SERVER_NAME):
+                break
+            time.sleep(POLL_INTERVAL)
+
+        self._update_state(frida_server_pid=0)
 
     def is_frida_server_running(self) -> bool:
         self._enforce_device_connection()
-
-        pids = self._adb.pgrep(self.device_name, 'frida-server')
-        return len(pids) >= 1
+        return self.state.is_frida_server_running
 
     def is_device_rooted(self) -> bool:
-        self._enforce_device_availability()
-        return self._adb.is_device_rooted(self.device_name)
+        return self._enforce_device_availability().rooted
 
     def connect(self) -> None:
         self._enforce_dependencies()
-        self._device = frida.get_device(self.device_name)
+        device = self._get_device()
+        if device is not self._device:
+            device.on('lost', self._on_device_lost)
+            device.on('child-added', self._on_child_added)
+            self._device = device
+        self._is_connected = True
 
     def is_device_available(self) -> bool:
-        devices = self._adb.list_devices()
-        return self.device_name in devices
+        return self.state.present
+
+    def _probe_state(self) -> DeviceState:
+        """
+        Query adb for every device capability at once.
+
+        :return: A new DeviceState.
+        """
+        if self.device_name not in self._adb.get_devices():
+            return DeviceState()
 
-    def _enforce_dependencies(self):
-        self._enforce_device_availability()
-        self._enforce_device_is_rooted()
+        pids = self._adb.pgrep(self.device_name, FRIDA_SERVER_NAME)
+        return DeviceState(
+            present=True,
+            rooted=self._adb.is_rooted(self.device_name),
+            abi=self._adb.get_abi(self.device_name),
+            frida_server_pid=pids[0] if pids else 0,
+        )
 
-    def _enforce_device_is_rooted(self) -> None:
-        if self._adb.is_device_rooted(self.device_name):
-            return
+    def _deploy_frida_server(self, state: DeviceState) -> bool:
+        """
+        Push the frida-server build matching the device ABI if needed.
+
+        :param state: The snapshot the preconditions were checked on.
+        :return: True if the binary was pushed, False if it was current.
+        :raise UnsupportedAbi: If frida has no build for the device ABI.
+        """
+        arch = FridaServerRepository.arch_for(state.abi)
+        if arch is None:
+            raise UnsupportedAbi(self.device_name, state.abi)
+
+        repository = self._get_server_repository()
+        binary = repository.get(arch)
+        if self._remote_sha256(FRIDA_SERVER_PATH) == repository.sha256(
+            binary
+        ):
+            return False
+
+        self._adb.push(
+            self.device_name, str(binary), FRIDA_SERVER_PATH, overwrite=True
+        )
+        self._adb.shell(
+            self.device_name, ['chmod', '755', FRIDA_SERVER_PATH], True
+        )
+        return True
+
+    def _start_frida_server(self, state: DeviceState, timeout: float) -> int:
+        """
+        Start the deployed frida-server and wait until it answers.
+
+        :param state: The snapshot the preconditions were checked on.
+        :param timeout: Seconds to wait for the server to become ready.
+        :return: The pid of frida-server.
+        :raise FridaIsAlreadyRunning: If frida-server is already running.
+        :raise FridaServerDidNotStart: If it is not ready within timeout.
+        """
+        if state.is_frida_server_running:
+            raise FridaIsAlreadyRunning(self.device_name)
+
+        # In a session of its own, so it outlives the adb shell.
+        self._adb.shell(
+            self.device_name,
+            [
+                'sh',
+                '-c',
+                f"'setsid {FRIDA_SERVER_PATH} </dev/null >/dev/null 2>&1 &'",
+            ],
+            True,
+        )
+
+        pid = self._wait_for_frida_server(timeout)
+        self._update_state(frida_server_pid=pid)
+        return pid
+
+    def _instrument_suspended(
+        self,
+        pid: int,
+        sources: List[str],
+        on_message: MessageHandler | None,
+        child_gating: bool,
+    ) -> Instrumentation:
+        """
+        Attach to a suspended process and load scripts into it.
+
+        :param pid: The suspended process.
+        :param sources: JavaScript sources to be loaded, in order.
+        :param on_message: Optional handler for messages sent by them.
+        :param child_gating: If True, children are instrumented too.
+        :return: The pid, its session and loaded scripts.
+        """
+        session = self.attach(pid)
+        if child_gating:
+            with self._sessions_lock:
+                self._gated_sources[pid] = (sources, on_message)
+            session.enable_child_gating()
+
+        scripts = [
+            self.load_script(session, source, on_message)
+            for source in sources
+        ]
+        return Instrumentation(pid, session, scripts)
+
+    def _on_child_added(self, child) -> None:
+        """
+        Hand a gated child over to the children worker, as frida signals
+        must not block.
+
+        :param child: The frida Child that was just gated.
+        """
+        self._children.submit(self._instrument_child, child)
+
+    def _instrument_child(self, child) -> None:
+        """
+        Instrument and resume a child of a process with child gating. A
+        child whose parent is no longer instrumented is only resumed.
 
-        raise DeviceIsNotRooted
+        :param child: The frida Child that was just gated.
+        """
+        with self._sessions_lock:
+            gated = self._gated_sources.get(child.parent_pid)
+
+        try:
+            if gated is not None:
+                sources, on_message = gated
+                self._instrument_suspended(
+                    child.pid, sources, on_message, True
+                )
+        finally:
+            self._device.resume(child.pid)
+
+    def _create_script(self, session: Session, source: str) -> Script:
+        """
+        Create a script from cached bytecode, compiling it on a miss.
+
+        :param session: The session hosting the script.
+        :param source: The JavaScript source of the agent.
+        :return: The created, not yet loaded, script.
+        """
+        digest = hashlib.sha256(source.encode()).hexdigest()
+        bytecode = self._compiled_scripts.get(digest)
+        if bytecode is None:
+            try:
+                bytecode = session.compile_script(source)
+            except frida.NotSupportedError:
+                # Runtimes other than QuickJS cannot compile ahead of time.
+                return session.create_script(source)
+            self._compiled_scripts[digest] = bytecode
+
+        return session.create_script_from_bytes(bytecode)
+
+    def _forget_session(self, pid: int, session: Session) -> None:
+        with self._sessions_lock:
+            if self._sessions.get(pid) is session:
+                del self._sessions[pid]
+                self._gated_sources.pop(pid, None)
+
+    def _update_state(self, **changes) -> None:
+        """
+        Record a capability change caused by Kahlo itself, without
+        probing the device again.
+
+        :param changes: DeviceState fields to be replaced.
+        """
+        with self._state_lock:
+            if self._state is not None:
+                self._state = replace(self._state, **changes)
+
+    def _get_server_repository(self) -> FridaServerRepository:
+        if self._server_repository is None:
+            self._server_repository = FridaServerRepository()
+        return self._server_repository
+
+    def _remote_sha256(self, path: str) -> str | None:
+        result = self._adb.shell(self.device_name, ['sha256sum', path], True)
+        if result.exit_code != 0 or not result.stdout:
+            return None
+
+        return result.stdout[0].split()[0]
 
-    def _enforce_device_availability(self) -> None:
-        if self.is_device_available():
+    def _wait_for_frida_server(self, timeout: float) -> int:
+        """
+        Poll until frida-server has a pid and answers a frida request.
+
+        :param timeout: Seconds to wait before giving up.
+        :return: The pid of frida-server.
+        :raise FridaServerDidNotStart: If it is not ready within timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            pids = self._adb.pgrep(self.device_name, FRIDA_SERVER_NAME)
+            if pids and self._is_frida_server_healthy():
+                return pids[0]
+            time.sleep(POLL_INTERVAL)
+
+        raise FridaServerDidNotStart(self.device_name, timeout)
+
+    def _is_frida_server_healthy(self) -> bool:
+        try:
+            device = self._device or self._get_device(PROBE_TIMEOUT)
+            device.query_system_parameters()
+        except (
+            frida.InvalidArgumentError,
+            frida.ServerNotRunningError,
+            frida.TransportError,
+        ):
+            return False
+
+        return True
+
+    def _get_device(self, timeout: float = 0) -> Device:
+        """
+        Resolve the frida device through the factory, if any.
+
+        :param timeout: Seconds frida.get_device waits for the device to
+                        appear, a custom factory decides on its own.
+        :return: The frida Device.
+        """
+        if self._device_factory is None:
+            return frida.get_device(self.device_name, timeout=timeout)
+        return self._device_factory(self.device_name)
+
+    def _on_device_lost(self) -> None:
+        self._is_connected = False
+        with self._sessions_lock:
+            self._sessions.clear()
+            self._gated_sources.clear()
+        self.invalidate()
+
+    def _enforce_dependencies(self) -> DeviceState:
+        # A single snapshot per operation: every read of self.state may
+        # probe the device again once the TTL has expired.
+        state = self._enforce_device_availability()
+        self._enforce_device_is_rooted(state)
+        return state
+
+    def _enforce_device_is_rooted(self, state: DeviceState) -> None:
+        if state.rooted:
             return
 
+        raise DeviceIsNotRooted(self.device_name)
+
+    def _enforce_device_availability(self) -> DeviceState:
+        state = self.state
+        if state.present:
+            return state
+
         raise DeviceDoesNotExists
 
     def _enforce_device_connection(self) -> None:
@@ -0,0 +1,177 @@
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from frida.core import Script
+
+from .agents import read_agent
+from .channel import MessageHandler
+
+HISTOGRAM_BUCKETS = 32
+
+
+@dataclass
+class HotSpot:
+    """
+    Aggregated timings of one hooked method or export.
+
+    Histogram bucket i counts calls that took [2^i, 2^(i+1)) ns.
+    """
+
+    selector: str
+    calls: int = 0
+    total_ns: int = 0
+    min_ns: int = 0
+    max_ns: int = 0
+    histogram: List[int] = field(
+        default_factory=lambda: [0] * HISTOGRAM_BUCKETS
+    )
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.calls if self.calls else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        """
+        Estimate a latency percentile from the histogram.
+
+        :param percentile: A value between 0 and 100.
+        :return: Upper bound, in ns, of the bucket holding it.
+        """
+        threshold = self.calls * percentile / 100
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= threshold:
+                return min(2 ** (bucket + 1), self.max_ns)
+        return self.max_ns
+
+    def merge(self, entry: dict) -> None:
+        if self.calls == 0:
+            self.min_ns = entry['min']
+        else:
+            self.min_ns = min(self.min_ns, entry['min'])
+
+        self.calls += entry['calls']
+        self.total_ns += entry['total']
+        self.max_ns = max(self.max_ns, entry['max'])
+        for bucket, count in enumerate(entry['histogram']):
+            self.histogram[bucket] += count
+
+
+class Profiler:
+    """
+    Hook-level profiler whose aggregation runs inside the agent.
+
+    Selectors are either 'java:<class>.<method>', which hooks every
+    overload, or 'native:[<module>!]<export>'.
+    """
+
+    def __init__(
+        self, selectors: Sequence[str], flush_interval: int = 1000
+    ) -> None:
+        """
+        :param selectors: The methods and exports to be profiled.
+        :param flush_interval: Milliseconds between two summaries sent
+                               by the agent.
+        """
+        self.selectors = list(selectors)
+        self.flush_interval = flush_interval
+        self.errors: Dict[str, str] = {}
+        self.script: Script | None = None
+        self._hot_spots: Dict[str, HotSpot] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def source(self) -> str:
+        """
+        :return: The agent source installing the hooks.
+        """
+        config = {
+            'selectors': self.selectors,
+            'flushInterval': self.flush_interval,
+        }
+        return (
+            f'const KAHLO_PROFILER = {json.dumps(config)};\n'
+            f'{read_agent("profiler.js")}'
+        )
+
+    def handler(
+        self, fallback: MessageHandler | None = None
+    ) -> MessageHandler:
+        """
+        Build the frida message handler collecting the summaries.
+
+        :param fallback: Handler for every other message.
+        :return: A callable to be passed to script.on('message').
+        """
+
+        def on_message(message: dict, data: bytes | None) -> None:
+            payload = message.get('payload')
+            kind = payload.get('type') if isinstance(payload, dict) else None
+            if kind == 'kahlo:profile':
+                self._merge(payload['entries'])
+            elif kind == 'kahlo:profile:ready':
+                self.errors = payload['errors']
+                self._ready.set()
+            elif fallback is not None:
+                fallback(message, data)
+
+        return on_message
+
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        """
+        Wait until the agent reported which hooks it installed.
+
+        :param timeout: Seconds to wait, None waits forever.
+        :return: True if the agent is ready.
+        """
+        return self._ready.wait(timeout)
+
+    def flush(self) -> None:
+        """
+        Ask the agent to send its pending summary right away.
+        """
+        if self.script is not None:
+            self.script.exports_sync.kahlo_flush_profile()
+
+    def report(
+        self, sort_by: str = 'total_ns', limit: int | None = None
+    ) -> List[HotSpot]:
+        """
+        List the hot spots collected so far, hottest first.
+
+        :param sort_by: HotSpot attribute to sort by, e.g. 'calls',
+                        'total_ns', 'mean_ns' or 'max_ns'.
+        :param limit: Maximum number of hot spots to be returned.
+        :return: Snapshots of the hot spots.
+        """
+        with self._lock:
+            hot_spots = [
+                HotSpot(
+                    spot.selector,
+                    spot.calls,
+                    spot.total_ns,
+                    spot.min_ns,
+                    spot.max_ns,
+                    list(spot.histogram),
+                )
+                for spot in self._hot_spots.values()
+            ]
+
+        hot_spots.sort(key=lambda spot: getattr(spot, sort_by), reverse=True)
+        return hot_spots[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hot_spots.clear()
+
+    def _merge(self, entries: List[dict]) -> None:
+        with self._lock:
+            for entry in entries:
+                selector = entry['selector']
+                spot = self._hot_spots.get(selector)
+                if spot is None:
+                    spot = self._hot_spots[selector] = HotSpot(selector)
+                spot.merge(entry)
@@ -0,0 +1,298 @@
+"""
+In-process fakes of adb and of the frida device, session and script
+objects Kahlo drives, so Kahlo can be exercised and benchmarked without
+a real device.
+"""
+
+import hashlib
+import itertools
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import frida
+from commons import CommandResult
+
+
+@dataclass
+class FakeAndroid:
+    """
+    What the fake adb knows about one device.
+    """
+
+    rooted: bool = True
+    abi: str = 'arm64-v8a'
+    files: Dict[str, str] = field(default_factory=dict)
+    processes: Dict[str, int] = field(default_factory=dict)
+
+
+class FakeAdb:
+    """
+    Stand-in for py_adb.Adb backed by FakeAndroid devices.
+
+    Every call sleeps for latency seconds, to emulate the cost of
+    spawning adb, and is counted in calls.
+    """
+
+    def __init__(
+        self, devices: Dict[str, FakeAndroid], latency: float = 0.0
+    ) -> None:
+        self.devices = devices
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._pids = itertools.count(1000)
+        self._lock = threading.Lock()
+
+    def get_devices(self) -> List[str]:
+        self._call('get_devices')
+        return list(self.devices)
+
+    def is_rooted(self, device: str) -> bool:
+        self._call('is_rooted')
+        return self.devices[device].rooted
+
+    def get_abi(self, device: str) -> str:
+        self._call('get_abi')
+        return self.devices[device].abi
+
+    def pgrep(self, device: str, process_name: str) -> List[int]:
+        self._call('pgrep')
+        pid = self.devices[device].processes.get(process_name)
+        return [pid] if pid else []
+
+    def pidof(self, device: str, package_name: str) -> int:
+        self._call('pidof')
+        return self.devices[device].processes.get(package_name, 0)
+
+    def push(
+        self,
+        device: str,
+        origin_file_path: str,
+        destination_path: str,
+        overwrite: bool = False,
+    ) -> None:
+        self._call('push')
+        with open(origin_file_path, 'rb') as file:
+            digest = hashlib.sha256(file.read()).hexdigest()
+        self.devices[device].files[destination_path] = digest
+
+    def shell(
+        self,
+        device: str,
+        command: List[str],
+        as_root: bool = False,
+        timeout: int | None = None,
+    ) -> CommandResult:
+        self._call('shell')
+        android = self.devices[device]
+        if as_root and not android.rooted:
+            return CommandResult(None, ['su: not found'], 1)
+
+        program = command[0]
+        if program == 'sha256sum':
+            digest = android.files.get(command[1])
+            if digest is None:
+                return CommandResult(None, ['No such file'], 1)
+            return CommandResult([f'{digest}  {command[1]}'], None, 0)
+
+        if program == 'kill':
+            pids = {int(pid) for pid in command[1:]}
+            for name, pid in list(android.processes.items()):
+                if pid in pids:
+                    del android.processes[name]
+            return CommandResult(None, None, 0)
+
+        if program == 'sh' and 'frida-server' in command[-1]:
+            # Like on a device, a server left in the session of the adb
+            # shell dies with it.
+            if 'setsid' in command[-1] or 'nohup' in command[-1]:
+                with self._lock:
+                    android.processes['frida-server'] = next(self._pids)
+            return CommandResult(None, None, 0)
+
+        return CommandResult(None, None, 0)
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class _Signals:
+    def __init__(self) -> None:
+        self._handlers: Dict[str, List[Callable]] = defaultdict(list)
+
+    def on(self, signal: str, callback: Callable) -> None:
+        self._handlers[signal].append(callback)
+
+    def off(self, signal: str, callback: Callable) -> None:
+        self._handlers[signal].remove(callback)
+
+    def emit(self, signal: str, *args) -> None:
+        for callback in list(self._handlers[signal]):
+            callback(*args)
+
+
+class FakeScript(_Signals):
+    """
+    A script that never runs JavaScript. Tests play the agent by calling
+    send() and inspect what Python posted back in posted.
+    """
+
+    def __init__(self, source: str) -> None:
+        super().__init__()
+        self.source = source
+        self.loaded = False
+        self.posted: List[dict] = []
+        self.exports_sync = SimpleNamespace(kahlo_flush_profile=lambda: None)
+
+    def load(self) -> None:
+        self.loaded = True
+
+    def unload(self) -> None:
+        self.loaded = False
+
+    def post(self, message: dict, data: bytes | None = None) -> None:
+        self.posted.append(message)
+
+    def send(self, payload, data: bytes | None = None) -> None:
+        """
+        Deliver a message as if the agent had called send().
+        """
+        self.emit('message', {'type': 'send', 'payload': payload}, data)
+
+
+class FakeSession(_Signals):
+    def __init__(self, device: 'FakeDevice', pid: int) -> None:
+        super().__init__()
+        self.device = device
+        self.pid = pid
+        self.scripts: List[FakeScript] = []
+        self.child_gating = False
+        self._detached = False
+
+    def is_detached(self) -> bool:
+        return self._detached
+
+    def detach(self, reason: str = 'application-requested') -> None:
+        if self._detached:
+            return
+
+        self._detached = True
+        self.emit('detached', reason, None)
+
+    def enable_child_gating(self) -> None:
+        self.child_gating = True
+
+    def compile_script(self, source: str, name: str | None = None) -> bytes:
+        self.device.compilations += 1
+        self.device.compiled[source.encode()] = source
+        return source.encode()
+
+    def create_script(self, source: str, name: str | None = None):
+        script = FakeScript(source)
+        self.scripts.append(script)
+        return script
+
+    def create_script_from_bytes(self, data: bytes, name: str | None = None):
+        return self.create_script(self.device.compiled[data])
+
+
+class FakeDevice(_Signals):
+    """
+    Stand-in for frida.core.Device. Spawned processes stay suspended
+    until resumed. Like frida, it emits child-added from a thread of its
+    own.
+    """
+
+    def __init__(self, id: str, latency: float = 0.0) -> None:
+        super().__init__()
+        self.id = id
+        self.latency = latency
+        self.processes: Dict[str, int] = {}
+        self.suspended: set = set()
+        self.sessions: List[FakeSession] = []
+        self.compiled: Dict[bytes, str] = {}
+        self.compilations = 0
+        self.resumes: Counter = Counter()
+        self._pids = itertools.count(5000)
+        self._resumed = threading.Condition()
+
+    def query_system_parameters(self) -> dict:
+        return {'os': {'id': 'android'}}
+
+    def get_process(self, name: str):
+        pid = self.processes.get(name)
+        if pid is None:
+            raise frida.ProcessNotFoundError(f'unable to find process {name}')
+        return SimpleNamespace(pid=pid, name=name)
+
+    def attach(self, pid: int) -> FakeSession:
+        if pid not in self.processes.values():
+            raise frida.ProcessNotFoundError(f'unable to find pid {pid}')
+        if self.latency:
+            time.sleep(self.latency)
+
+        session = FakeSession(self, pid)
+        self.sessions.append(session)
+        return session
+
+    def spawn(self, program: str) -> int:
+        pid = next(self._pids)
+        self.processes[program] = pid
+        self.suspended.add(pid)
+        return pid
+
+    def resume(self, pid: int) -> None:
+        with self._resumed:
+            self.suspended.discard(pid)
+            self.resumes[pid] += 1
+            self._resumed.notify_all()
+
+    def wait_for_resume(self, pid: int, timeout: float = 1.0) -> bool:
+        """
+        Wait until a process was resumed.
+
+        :return: True if it was resumed within timeout.
+        """
+        with self._resumed:
+            return self._resumed.wait_for(
+                lambda: pid not in self.suspended, timeout
+            )
+
+    def kill(self, pid: int) -> None:
+        for name, running in list(self.processes.items()):
+            if running == pid:
+                del self.processes[name]
+        self.suspended.discard(pid)
+        for session in self.sessions:
+            if session.pid == pid:
+                session.detach('process-terminated')
+
+    def spawn_child(self, parent_pid: int, name: str) -> int:
+        """
+        Emulate a gated child process being forked by parent_pid.
+        """
+        pid = next(self._pids)
+        self.processes[name] = pid
+        self.suspended.add(pid)
+        signal = threading.Thread(
+            target=self.emit,
+            args=(
+                'child-added',
+                SimpleNamespace(pid=pid, parent_pid=parent_pid),
+            ),
+        )
+        signal.start()
+        signal.join()
+        return pid
+
+    def lose(self) -> None:
+        """
+        Emulate the device being unplugged.
+        """
+        self.emit('lost')
@@ -6,20 +6,31 @@ from py_adb import Adb
 from kahlo import Kahlo
 
 
-@unittest.skipUnless(
-    (Adb._is_adb_available() and len(Adb().list_devices()) >= 1),
-    'Only run if adb is in available and Whatsapp is installed.',
-)
+def _first_device() -> str | None:
+    if not Adb._is_adb_available():
+        return None
+
+    devices = Adb().get_devices()
+    return devices[0] if devices else None
+
+
+DEVICE = _first_device()
+
+
+@unittest.skipUnless(DEVICE, 'Only run if adb is available with a device.')
 class TestIntegratedKahlo(TestCase):
     def test_validations(self):
-        device = Adb().list_devices()[0]
-        kahlo = Kahlo(device)
+        kahlo = Kahlo(DEVICE)
 
         self.assertTrue(kahlo.is_device_available())
 
     @unittest.skipUnless(
-        Kahlo(Adb().list_devices()[0]).is_device_rooted(),
+        DEVICE and Kahlo(DEVICE).is_device_rooted(),
         'Device is not rooted',
     )
     def test_frida_installation(self):
-        pass
+        kahlo = Kahlo(DEVICE)
+        pid = kahlo.ensure_frida_server()
+
+        self.assertTrue(pid > 0)
+        self.assertEqual(kahlo.ensure_frida_server(), pid)
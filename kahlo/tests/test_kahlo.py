@@ -0,0 +1,432 @@
+import asyncio
+import hashlib
+import lzma
+import shutil
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+import frida
+
+from kahlo import (
+    FridaServerRepository,
+    HotSpot,
+    Kahlo,
+    KahloFleet,
+    MessageChannel,
+    Profiler,
+)
+from kahlo.exceptions import (
+    DeviceDoesNotExists,
+    DeviceIsNotRooted,
+    InvalidFridaServerBuild,
+)
+from kahlo.testing import FakeAdb, FakeAndroid, FakeDevice, FakeScript
+
+SERIAL = 'emulator-5554'
+VERSION = '16.2.1'
+
+
+class TestOfflineKahlo(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.repository = FridaServerRepository(self.cache_dir, VERSION)
+        binary = Path(self.cache_dir) / self.repository.binary_name('arm64')
+        binary.write_bytes(b'frida-server')
+
+        self.android = FakeAndroid(processes={'com.example': 42})
+        self.adb = FakeAdb({SERIAL: self.android})
+        self.device = FakeDevice(SERIAL)
+        self.device.processes['com.example'] = 42
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def kahlo(self, **kwargs) -> Kahlo:
+        return Kahlo(
+            SERIAL,
+            server_repository=self.repository,
+            adb=self.adb,
+            device_factory=lambda name: self.device,
+            **kwargs,
+        )
+
+    def test_preconditions_are_probed_once_per_ttl(self):
+        kahlo = self.kahlo()
+        kahlo.connect()
+        kahlo.is_device_rooted()
+        kahlo.is_frida_server_running()
+        self.assertEqual(self.adb.calls['get_devices'], 1)
+        self.assertEqual(self.adb.calls['is_rooted'], 1)
+
+        kahlo.refresh()
+        self.assertEqual(self.adb.calls['get_devices'], 2)
+
+        self.device.lose()
+        kahlo.is_device_available()
+        self.assertEqual(self.adb.calls['get_devices'], 3)
+
+    def test_state_is_probed_once_per_operation(self):
+        kahlo = self.kahlo(state_ttl=0)
+        for _ in range(10):
+            kahlo.is_device_rooted()
+        self.assertEqual(self.adb.calls['get_devices'], 10)
+        self.assertEqual(self.adb.calls['is_rooted'], 10)
+
+        kahlo.ensure_frida_server(timeout=1)
+        self.assertEqual(self.adb.calls['get_devices'], 11)
+
+    def test_preconditions_are_enforced(self):
+        self.android.rooted = False
+        with self.assertRaises(DeviceIsNotRooted):
+            self.kahlo().connect()
+
+        self.adb.devices.clear()
+        with self.assertRaises(DeviceDoesNotExists):
+            self.kahlo().connect()
+
+    def test_frida_server_lifecycle(self):
+        kahlo = self.kahlo()
+        pid = kahlo.ensure_frida_server(timeout=1)
+        self.assertEqual(self.android.processes['frida-server'], pid)
+        self.assertEqual(self.adb.calls['push'], 1)
+
+        self.assertEqual(kahlo.ensure_frida_server(timeout=1), pid)
+        kahlo.kill_frida_server(timeout=1)
+        self.assertNotIn('frida-server', self.android.processes)
+
+        kahlo.ensure_frida_server(timeout=1)
+        self.assertEqual(self.adb.calls['push'], 1)
+        self.assertEqual(
+            self.android.files['/data/local/tmp/frida-server'],
+            hashlib.sha256(b'frida-server').hexdigest(),
+        )
+
+    def test_crashed_frida_server_is_restarted(self):
+        kahlo = self.kahlo()
+        pid = kahlo.ensure_frida_server(timeout=1)
+
+        def query_system_parameters():
+            if 'frida-server' not in self.android.processes:
+                raise frida.ServerNotRunningError('unable to connect')
+            return {}
+
+        self.device.query_system_parameters = query_system_parameters
+        del self.android.processes['frida-server']
+
+        self.assertNotEqual(kahlo.ensure_frida_server(timeout=1), pid)
+        self.assertIn('frida-server', self.android.processes)
+
+    def test_health_probe_waits_for_the_device(self):
+        kahlo = Kahlo(SERIAL, server_repository=self.repository, adb=self.adb)
+        with patch('frida.get_device', return_value=self.device) as get:
+            self.assertTrue(kahlo._is_frida_server_healthy())
+
+        get.assert_called_once_with(SERIAL, timeout=1)
+
+    def test_downloaded_builds_must_be_elf(self):
+        releases = Path(self.cache_dir) / 'releases'
+        releases.mkdir()
+        url = f'{releases.as_uri()}/{{name}}.xz'
+        for arch, content in (('x86', b'<html>'), ('arm', b'\x7fELF...')):
+            name = self.repository.binary_name(arch)
+            (releases / f'{name}.xz').write_bytes(lzma.compress(content))
+
+        with patch('kahlo.frida_server.RELEASE_URL', url):
+            with self.assertRaises(InvalidFridaServerBuild):
+                self.repository.get('x86')
+            binary = self.repository.get('arm')
+
+        self.assertEqual(binary.read_bytes(), b'\x7fELF...')
+        name = self.repository.binary_name('x86')
+        self.assertFalse((Path(self.cache_dir) / name).exists())
+
+    def test_sessions_and_compiled_scripts_are_reused(self):
+        kahlo = self.kahlo()
+        kahlo.connect()
+
+        session = kahlo.attach('com.example')
+        self.assertIs(kahlo.attach(42), session)
+        kahlo.load_script(session, 'console.log(1);')
+        kahlo.load_script(session, 'console.log(1);')
+        self.assertEqual(self.device.compilations, 1)
+
+        self.device.kill(42)
+        self.device.processes['com.example'] = 42
+        self.assertIsNot(kahlo.attach(42), session)
+
+    def test_attach_does_not_block_detached_signals(self):
+        kahlo = self.kahlo()
+        kahlo.connect()
+        first = kahlo.attach(42)
+        self.device.processes['com.other'] = 43
+        attach = self.device.attach
+
+        def attach_while_detaching(pid):
+            # Frida emits detached from its own thread.
+            signal = threading.Thread(target=first.detach)
+            signal.start()
+            signal.join(1)
+            self.assertFalse(signal.is_alive())
+            return attach(pid)
+
+        with patch.object(self.device, 'attach', attach_while_detaching):
+            second = kahlo.attach(43)
+
+        self.assertNotIn(42, kahlo._sessions)
+        self.assertIs(kahlo.attach(43), second)
+
+    def test_concurrent_attaches_share_a_session(self):
+        kahlo = self.kahlo()
+        kahlo.connect()
+        attach = self.device.attach
+        raced = []
+
+        def attach_after_another(pid):
+            if not raced:
+                raced.append(None)
+                other = threading.Thread(
+                    target=lambda: raced.append(kahlo.attach(pid))
+                )
+                other.start()
+                other.join(1)
+            return attach(pid)
+
+        with patch.object(self.device, 'attach', attach_after_another):
+            session = kahlo.attach(42)
+
+        self.assertIs(session, raced[1])
+        extra = self.device.sessions[1]
+        self.assertTrue(extra.is_detached())
+        self.assertIs(kahlo.attach(42), session)
+
+    def test_spawn_and_instrument(self):
+        kahlo = self.kahlo()
+        kahlo.connect()
+
+        instrumentation = kahlo.spawn_and_instrument(
+            'com.other', ['console.log(1);'], child_gating=True
+        )
+        self.assertNotIn(instrumentation.pid, self.device.suspended)
+        self.assertTrue(instrumentation.scripts[0].loaded)
+        self.assertTrue(instrumentation.session.child_gating)
+
+        child = self.device.spawn_child(instrumentation.pid, 'com.other:x')
+        self.assertTrue(self.device.wait_for_resume(child))
+        self.assertEqual(len(self.device.sessions), 2)
+
+    def test_children_are_instrumented_once(self):
+        kahlo = self.kahlo()
+        kahlo.connect()
+
+        first = kahlo.spawn_and_instrument(
+            'com.first', ['console.log(1);'], child_gating=True
+        )
+        first.session.detach()
+        second = kahlo.spawn_and_instrument(
+            'com.second', ['console.log(2);'], child_gating=True
+        )
+        kahlo.connect()
+
+        child = self.device.spawn_child(second.pid, 'com.second:x')
+        self.assertTrue(self.device.wait_for_resume(child))
+        kahlo._children.submit(lambda: None).result(timeout=1)
+
+        self.assertEqual(self.device.resumes[child], 1)
+        self.assertEqual(
+            [session.pid for session in self.device.sessions].count(child), 1
+        )
+
+    def test_message_channel(self):
+        kahlo = self.kahlo()
+        kahlo.connect()
+        session = kahlo.attach(42)
+        others = []
+        channel = MessageChannel('<IQd', capacity=2, batch_size=4)
+        script = kahlo.load_script(
+            session,
+            'events.push(1, 2, 3);',
+            lambda message, data: others.append(message),
+            channel,
+        )
+        self.assertIn('class KahloChannel', script.source)
+
+        records = [(index, index * 2, index / 2) for index in range(4)]
+        data = b''.join(struct.pack('<IQd', *record) for record in records)
+        for _ in range(3):
+            script.send(
+                {'type': 'kahlo:batch', 'channel': 'events', 'count': 4},
+                data,
+            )
+        script.send('hello')
+        channel.close()
+
+        self.assertEqual(list(channel), records * 2)
+        self.assertEqual(channel.stats.dropped_locally, 4)
+        self.assertEqual(len(script.posted), 3)
+        self.assertEqual(len(others), 1)
+
+    def test_cancelled_stream_loses_no_batch(self):
+        channel = MessageChannel('<I', capacity=2)
+        script = FakeScript('')
+        channel.bind(script)
+
+        async def consume():
+            waiting = asyncio.create_task(anext(channel.stream()))
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+
+            channel.feed(struct.pack('<I', 7), 1)
+            async for batch in channel.stream():
+                return list(batch)
+
+        self.assertEqual(asyncio.run(consume()), [(7,)])
+        self.assertEqual(len(script.posted), 1)
+
+    def test_close_stops_every_consumer(self):
+        channel = MessageChannel('<I')
+        channel.close()
+
+        async def consume():
+            return [batch async for batch in channel.stream()]
+
+        self.assertEqual(list(channel.batches(timeout=1)), [])
+        self.assertEqual(list(channel.batches(timeout=1)), [])
+        self.assertEqual(asyncio.run(consume()), [])
+
+    def test_batch_without_data_is_dropped(self):
+        channel = MessageChannel('<I')
+        script = FakeScript('')
+        channel.bind(script)
+
+        channel.handler()(
+            {
+                'type': 'send',
+                'payload': {
+                    'type': 'kahlo:batch',
+                    'channel': 'events',
+                    'count': 3,
+                },
+            },
+            None,
+        )
+
+        self.assertEqual(channel.stats.dropped_locally, 3)
+        self.assertEqual(len(script.posted), 1)
+
+    def test_fleet(self):
+        devices = {f'emulator-{index}': FakeAndroid() for index in range(4)}
+        frida_devices = {name: FakeDevice(name) for name in devices}
+        for device in frida_devices.values():
+            device.processes['com.example'] = 42
+
+        fleet = KahloFleet(
+            devices,
+            max_workers=4,
+            server_repository=self.repository,
+            adb=FakeAdb(devices),
+            device_factory=frida_devices.__getitem__,
+        )
+        outcomes = fleet.prepare(timeout=1)
+        self.assertTrue(all(outcome.ok for outcome in outcomes.values()))
+        self.assertIn('frida_server', outcomes['emulator-0'].timings)
+
+        outcomes = fleet.instrument('com.example', ['console.log(1);'])
+        for outcome in outcomes.values():
+            self.assertTrue(outcome.ok)
+            self.assertTrue(outcome.result[0].loaded)
+
+
+def _profile_entry(selector: str, *samples: int) -> dict:
+    histogram = [0] * 32
+    for sample in samples:
+        histogram[max(sample, 1).bit_length() - 1] += 1
+    return {
+        'selector': selector,
+        'calls': len(samples),
+        'total': sum(samples),
+        'min': min(samples),
+        'max': max(samples),
+        'histogram': histogram,
+    }
+
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        self.profiler = Profiler(['native:open', 'native:read'])
+        self.on_message = self.profiler.handler()
+
+    def send(self, payload: dict) -> None:
+        self.on_message({'type': 'send', 'payload': payload}, None)
+
+    def test_samples_are_merged_across_batches(self):
+        self.send(
+            {
+                'type': 'kahlo:profile',
+                'entries': [_profile_entry('native:open', 100, 300)],
+            }
+        )
+        self.send(
+            {
+                'type': 'kahlo:profile',
+                'entries': [_profile_entry('native:open', 50, 2000)],
+            }
+        )
+
+        (spot,) = self.profiler.report()
+        self.assertEqual(spot.calls, 4)
+        self.assertEqual(spot.total_ns, 2450)
+        self.assertEqual((spot.min_ns, spot.max_ns), (50, 2000))
+        self.assertEqual(sum(spot.histogram), 4)
+        self.assertEqual(spot.histogram[5], 1)
+
+    def test_percentile_edge_cases(self):
+        empty = HotSpot('native:open')
+        self.assertEqual(empty.percentile(50), 0)
+        self.assertEqual(empty.mean_ns, 0.0)
+
+        single = HotSpot('native:open')
+        single.merge(_profile_entry('native:open', 100))
+        for percentile in (0, 50, 99, 100):
+            self.assertEqual(single.percentile(percentile), 100)
+
+        spread = HotSpot('native:open')
+        spread.merge(_profile_entry('native:open', *[10] * 99, 5000))
+        self.assertEqual(spread.percentile(50), 16)
+        self.assertEqual(spread.percentile(100), 5000)
+
+    def test_report_is_sorted_and_limited(self):
+        self.send(
+            {
+                'type': 'kahlo:profile',
+                'entries': [
+                    _profile_entry('native:open', 1000),
+                    _profile_entry('native:read', 10, 10, 10),
+                ],
+            }
+        )
+
+        by_total = [spot.selector for spot in self.profiler.report()]
+        by_calls = [spot.selector for spot in self.profiler.report('calls')]
+        self.assertEqual(by_total, ['native:open', 'native:read'])
+        self.assertEqual(by_calls, ['native:read', 'native:open'])
+        self.assertEqual(len(self.profiler.report(limit=1)), 1)
+
+        self.profiler.report()[0].calls = 0
+        self.assertEqual(self.profiler.report()[0].calls, 1)
+
+    def test_ready_reports_errors(self):
+        self.assertFalse(self.profiler.wait_until_ready(0))
+        self.send(
+            {
+                'type': 'kahlo:profile:ready',
+                'errors': {'java:a.B.c': 'the Java runtime is not available'},
+            }
+        )
+
+        self.assertTrue(self.profiler.wait_until_ready(0))
+        self.assertIn('java:a.B.c', self.profiler.errors)
@@ -0,0 +1,159 @@
+"""
+Load test of the mailer senders against the local SMTP sink in
+mailer.testing.
+
+Run from the package root with:
+
+    python -m benchmarks.bench_mailer --messages 1000 --latency 0.005
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+
+from mailer.bulk import BulkSender, Outcome, SmtpSession
+from mailer.dispatcher import AsyncDispatcher
+from mailer.message import OutgoingMessage, build_message
+from mailer.metrics import LatencyRecorder
+from mailer.testing import FakeSmtpServer, ServerThread
+
+SENDER = 'bench@host.com'
+
+
+def single(port: int, messages, connections: int, hook) -> List[Outcome]:
+    """
+    One connection per message, like a loop over the CLI.
+    """
+    outcomes = []
+    for index, message in enumerate(messages):
+        session = SmtpSession('127.0.0.1', port, on_stage=hook)
+        outcome = Outcome(index, message.recipient, ok=False, attempts=1)
+        started = time.perf_counter()
+        try:
+            session.sendmail(
+                SENDER,
+                message.recipient,
+                build_message(
+                    SENDER, message.recipient, message.subject, message.message
+                ),
+            )
+            outcome.ok = True
+        except OSError as e:
+            outcome.error = str(e)
+        finally:
+            session.close()
+        outcome.elapsed = time.perf_counter() - started
+        outcomes.append(outcome)
+    return outcomes
+
+
+def bulk(port: int, messages, connections: int, hook) -> List[Outcome]:
+    sender = BulkSender(
+        '127.0.0.1', port, SENDER, connections=connections, on_stage=hook
+    )
+    return list(sender.send(messages))
+
+
+def dispatcher(**options) -> Callable:
+    def run(port: int, messages, connections: int, hook) -> List[Outcome]:
+        async def send() -> List[Outcome]:
+            async with AsyncDispatcher(
+                '127.0.0.1',
+                port,
+                SENDER,
+                connections=connections,
+                retries=0,
+                on_stage=hook,
+                **options,
+            ) as dispatcher:
+                return await dispatcher.send(messages)
+
+        return asyncio.run(send())
+
+    return run
+
+
+MODES = {
+    'single': single,
+    'bulk': bulk,
+    'async': dispatcher(pipelining=False),
+    'async-pipelined': dispatcher(),
+    'async-batched': dispatcher(max_recipients=50),
+}
+
+
+def bench(mode: str, arguments: argparse.Namespace) -> None:
+    messages = [
+        OutgoingMessage(f'user{index}@host.com', 'Benchmark message.')
+        for index in range(arguments.messages)
+    ]
+    server = FakeSmtpServer(
+        latency=arguments.latency,
+        error_rate=arguments.error_rate,
+        seed=0,
+    )
+    stages = LatencyRecorder() if arguments.stages else None
+
+    with ServerThread(server):
+        started = time.perf_counter()
+        outcomes = MODES[mode](
+            server.port, messages, arguments.connections, stages
+        )
+        elapsed = time.perf_counter() - started
+
+    latencies = LatencyRecorder()
+    for outcome in outcomes:
+        latencies('send', outcome.elapsed)
+    summary = latencies.summary()['send']
+    failed = sum(not outcome.ok for outcome in outcomes)
+    print(
+        f'{mode:>15}: {len(outcomes) / elapsed:9,.0f} msgs/s, '
+        f'p50 {summary["p50"] * 1000:7.2f}ms, '
+        f'p99 {summary["p99"] * 1000:7.2f}ms, '
+        f'{server.connections:4} connections, {failed} failed'
+    )
+
+    if stages is None:
+        return
+
+    for stage, summary in stages.summary().items():
+        print(
+            f'{"":>17}{stage:>8}: {summary["count"]:6} calls, '
+            f'p50 {summary["p50"] * 1000:7.2f}ms, '
+            f'p99 {summary["p99"] * 1000:7.2f}ms'
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.002,
+        help='One-way delay of the sink replies, in seconds',
+    )
+    parser.add_argument(
+        '--error-rate',
+        type=float,
+        default=0.0,
+        help='Probability of the sink refusing a recipient with 451',
+    )
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument(
+        '--mode', choices=tuple(MODES), action='append', dest='modes'
+    )
+    parser.add_argument(
+        '--stages',
+        action='store_true',
+        help='Report the connect, ehlo, mail and data timings',
+    )
+    arguments = parser.parse_args()
+
+    for mode in arguments.modes or MODES:
+        bench(mode, arguments)
+
+
+if __name__ == '__main__':
+    main()
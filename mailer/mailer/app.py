@@ -1,13 +1,20 @@
 import argparse
 import re
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import sys
 from socket import inet_aton
-from typing import Tuple
+from typing import TextIO, Tuple
 
 from printer.console import err, inf, sanitize, suc
 
+from .bulk import BulkSender, read_messages
+from .message import (
+    DEFAULT_SUBJECT,
+    OutgoingMessage,
+    build_message,
+    is_valid_email,
+)
+
 
 def send_email(
     smtp_server: str,
@@ -15,7 +22,7 @@ def send_email(
     sender: str,
     recipient: str,
     message: str,
-    subject: str = 'Message Sent via CLI',
+    subject: str = DEFAULT_SUBJECT,
 ) -> None:
     """
     Sends an email using an SMTP server without authentication.
@@ -29,32 +36,16 @@ def send_email(
     """
     try:
         # Create the message
-        msg = MIMEMultipart()
-        msg['From'] = sender
-        msg['To'] = recipient
-        msg['Subject'] = subject
-        msg.attach(MIMEText(message, 'plain'))
+        msg = build_message(sender, recipient, subject, message)
 
         # Send the email
         with smtplib.SMTP(smtp_server, port) as server:
-            server.sendmail(sender, recipient, msg.as_string())
+            server.sendmail(sender, recipient, msg)
             suc('Email sent successfully!')
     except Exception as e:
         err(f'Failed to send email: [b]{e}[/b].')
 
 
-def is_valid_email(email: str) -> bool:
-    """
-    Validates an email address based on a simple regex pattern.
-
-    :param email: str, the email address to validate.
-    :return: bool, True if the email address is valid, False otherwise.
-    """
-    # Simple regex for validating an email address (basic validation)
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
-
-
 def is_valid_smtp_server(server: str) -> Tuple[bool, str]:
     """
     Validates an SMTP server address (hostname or IP).
@@ -95,6 +86,16 @@ def validate_arguments(args: argparse.Namespace) -> None:
         )
         exit(1)
 
+    if args.bulk is not None:
+        if args.recipient is not None or args.message is not None:
+            err('The recipient and message come from the bulk file.')
+            exit(1)
+        return
+
+    if args.recipient is None or args.message is None:
+        err('A recipient and a message are required without --bulk.')
+        exit(1)
+
     if not is_valid_email(args.recipient):
         err(
             f'The [b]{sanitize(args.recipient)}[/b] is an invalid '
@@ -103,6 +104,160 @@ def validate_arguments(args: argparse.Namespace) -> None:
         exit(1)
 
 
+def bulk_format(args: argparse.Namespace) -> str:
+    """
+    :param args: The parsed command line arguments.
+    :return: str, the format of the bulk file, guessed if not given.
+    """
+    if args.format is not None:
+        return args.format
+    return 'csv' if args.bulk.endswith('.csv') else 'jsonl'
+
+
+def open_bulk(args: argparse.Namespace) -> TextIO:
+    """
+    :param args: The parsed command line arguments.
+    :return: TextIO, the bulk file, or stdin for '-'.
+    """
+    if args.bulk == '-':
+        return sys.stdin
+
+    try:
+        return open(args.bulk, newline='')
+    except OSError as e:
+        err(
+            f'Unable to open the bulk file [b]{sanitize(args.bulk)}[/b]: '
+            f'{sanitize(e.strerror or str(e))}.'
+        )
+        exit(1)
+
+
+def invalid_bulk(error: ValueError) -> None:
+    """
+    Reports an invalid bulk record and exits.
+
+    :param error: ValueError, raised by read_messages.
+    """
+    err(f'Invalid bulk file: {sanitize(str(error))}')
+    exit(1)
+
+
+def send_through_outbox(args: argparse.Namespace) -> None:
+    """
+    Spools the email(s) in the outbox, then delivers every due message,
+    including those left behind by an interrupted run.
+
+    :param args: The parsed command line arguments.
+    """
+    # asyncio and sqlite3 are only worth importing in outbox mode.
+    from .dispatcher import AsyncDispatcher
+    from .outbox import PENDING, Outbox, OutboxWorker
+
+    with Outbox(args.outbox) as outbox:
+        if outbox.recovered:
+            inf(f'Recovered [b]{outbox.recovered}[/b] interrupted email(s).')
+
+        if args.bulk is None:
+            outbox.enqueue(
+                OutgoingMessage(args.recipient, args.message, args.subject)
+            )
+        else:
+            source = open_bulk(args)
+            try:
+                # A single transaction, so nothing is spooled if a record
+                # is invalid.
+                outbox.enqueue_many(
+                    read_messages(source, bulk_format(args), args.subject)
+                )
+            except ValueError as e:
+                invalid_bulk(e)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+
+        inf('Sending emails from the outbox...')
+        worker = OutboxWorker(
+            outbox,
+            lambda: AsyncDispatcher(
+                args.smtp_server,
+                args.port,
+                args.sender,
+                connections=args.connections,
+                retries=args.retries,
+            ),
+        )
+        sent, failed = worker.drain()
+        pending = outbox.counts()[PENDING]
+
+    if pending:
+        inf(f'[b]{pending}[/b] email(s) will be retried later.')
+
+    # Failures of earlier runs stay in the outbox, only report ours.
+    if failed:
+        err(f'[b]{failed}[/b] email(s) failed, [b]{sent}[/b] sent.')
+        exit(1)
+
+    suc(f'[b]{sent}[/b] email(s) sent successfully!')
+
+
+def send_bulk(args: argparse.Namespace) -> None:
+    """
+    Sends every message of the bulk file through persistent connections.
+
+    :param args: The parsed command line arguments.
+    """
+    source = open_bulk(args)
+    try:
+        report = open(args.report, 'w') if args.report else None
+    except OSError as e:
+        if source is not sys.stdin:
+            source.close()
+        err(
+            f'Unable to open the report [b]{sanitize(args.report)}[/b]: '
+            f'{sanitize(e.strerror or str(e))}.'
+        )
+        exit(1)
+    sender = BulkSender(
+        args.smtp_server,
+        args.port,
+        args.sender,
+        connections=args.connections,
+        retries=args.retries,
+    )
+
+    sent = failed = 0
+    try:
+        messages = read_messages(source, bulk_format(args), args.subject)
+        for outcome in sender.send(messages):
+            if report is not None:
+                report.write(outcome.to_json() + '\n')
+            if outcome.ok:
+                sent += 1
+                continue
+
+            failed += 1
+            err(
+                f'Failed to send email to '
+                f'[b]{sanitize(outcome.recipient)}[/b]: '
+                f'{sanitize(outcome.error)}.'
+            )
+    except ValueError as e:
+        if sent or failed:
+            inf(f'[b]{sent + failed}[/b] email(s) were processed before.')
+        invalid_bulk(e)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if report is not None:
+            report.close()
+
+    if failed:
+        err(f'[b]{failed}[/b] email(s) failed, [b]{sent}[/b] sent.')
+        exit(1)
+
+    suc(f'[b]{sent}[/b] email(s) sent successfully!')
+
+
 def main() -> None:
     """
     Parses command line arguments and sends the email after validation.
@@ -111,26 +266,73 @@ def main() -> None:
         description='Sends emails using an SMTP '
         'server without authentication.',
         epilog='Example: mailer smtp.host.net sender@host.com '
-        'recipient@host.com "message" --subject "pwned" --port 1337',
+        'recipient@host.com "message" --subject "pwned" --port 1337\n'
+        '         mailer smtp.host.net sender@host.com --bulk list.csv',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     parser.add_argument('smtp_server', type=str, help='SMTP server address')
     parser.add_argument('sender', type=str, help='Sender email address')
-    parser.add_argument('recipient', type=str, help='Recipient email address')
-    parser.add_argument('message', type=str, help='Message to be sent')
+    parser.add_argument(
+        'recipient', type=str, nargs='?', help='Recipient email address'
+    )
+    parser.add_argument(
+        'message', type=str, nargs='?', help='Message to be sent'
+    )
     parser.add_argument(
         '--subject',
         type=str,
-        default='Message Sent via CLI',
-        help='Email subject (default: "Message Sent via CLI")',
+        default=DEFAULT_SUBJECT,
+        help=f'Email subject (default: "{DEFAULT_SUBJECT}")',
     )
     parser.add_argument(
         '--port', type=int, default=25, help='SMTP server port (default: 25)'
     )
+    parser.add_argument(
+        '--bulk',
+        type=str,
+        help='CSV or JSON lines file with recipient, message and optional '
+        'subject columns, "-" reads from stdin',
+    )
+    parser.add_argument(
+        '--format',
+        choices=('csv', 'jsonl'),
+        help='Bulk file format (default: guessed from the extension)',
+    )
+    parser.add_argument(
+        '--connections',
+        type=int,
+        default=1,
+        help='Persistent SMTP connections used in bulk mode (default: 1)',
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=1,
+        help='Retries after a connection failure (default: 1)',
+    )
+    parser.add_argument(
+        '--report', type=str, help='Write a JSON lines outcome report'
+    )
+    parser.add_argument(
+        '--outbox',
+        type=str,
+        help='Spool emails in this SQLite outbox before sending them, '
+        'resuming what a previous run left behind',
+    )
 
     args = parser.parse_args()
     inf('Validating arguments...')
 
     validate_arguments(args)
+    if args.outbox is not None:
+        send_through_outbox(args)
+        return
+
+    if args.bulk is not None:
+        inf('Sending emails...')
+        send_bulk(args)
+        return
+
     inf('Sending email...')
 
     send_email(
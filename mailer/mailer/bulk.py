@@ -0,0 +1,310 @@
+import csv
+import json
+import queue
+import smtplib
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, TextIO, Tuple
+
+from .message import (
+    DEFAULT_SUBJECT,
+    OutgoingMessage,
+    build_message,
+    is_valid_email,
+)
+from .metrics import StageHook, timed
+
+_DONE = object()
+
+
+@dataclass
+class Outcome:
+    """
+    Delivery result of one message of a bulk run.
+    """
+
+    index: int
+    recipient: str
+    ok: bool
+    error: str | None = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    transient: bool = False
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+
+def read_messages(
+    stream: TextIO, format: str, subject: str = DEFAULT_SUBJECT
+) -> Iterator[OutgoingMessage]:
+    """
+    Lazily parses messages from CSV or JSON lines.
+
+    Every record must have a valid recipient and a message, and may
+    override the subject.
+
+    :param stream: TextIO, the file (or stdin) to read from.
+    :param format: str, either 'csv' (with a header row) or 'jsonl'.
+    :param subject: str, the subject of records without one.
+    :return: Iterator[OutgoingMessage], the parsed messages.
+    :raise ValueError: If the format is unknown, or when reaching an
+                       invalid record, naming its line.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        records = ((reader.line_num, record) for record in reader)
+    elif format == 'jsonl':
+        records = _json_records(stream)
+    else:
+        raise ValueError(f'Unknown bulk format: {format}')
+
+    for line, record in records:
+        recipient = record.get('recipient')
+        message = record.get('message')
+        if not isinstance(recipient, str) or not recipient:
+            raise ValueError(f'line {line} has no recipient.')
+        if not isinstance(message, str):
+            raise ValueError(f'line {line} has no message.')
+        if not is_valid_email(recipient):
+            raise ValueError(
+                f'line {line} has the invalid recipient {recipient}.'
+            )
+
+        yield OutgoingMessage(
+            recipient, message, record.get('subject') or subject
+        )
+
+
+def _json_records(stream: TextIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'line {line} is not valid JSON: {e.msg}.')
+        if not isinstance(record, dict):
+            raise ValueError(f'line {line} is not a JSON object.')
+        yield line, record
+
+
+class SmtpSession:
+    """
+    A persistent SMTP connection that reconnects when it is dropped.
+    """
+
+    def __init__(
+        self,
+        smtp_server: str,
+        port: int,
+        timeout: float = 30.0,
+        on_stage: StageHook | None = None,
+    ) -> None:
+        """
+        :param smtp_server: str, the address of the SMTP server.
+        :param port: int, the port of the SMTP server.
+        :param timeout: float, socket timeout in seconds.
+        :param on_stage: StageHook, called with the name and duration of
+                         every stage: connect, ehlo and sendmail, smtplib
+                         running the whole transaction at once.
+        """
+        self.smtp_server = smtp_server
+        self.port = port
+        self.timeout = timeout
+        self.on_stage = on_stage
+        self.connections = 0
+        self._server: smtplib.SMTP | None = None
+
+    def sendmail(self, sender: str, recipients, msg: str) -> dict:
+        """
+        Sends one message, opening the connection if needed.
+
+        :return: dict, the recipients refused by the server.
+        """
+        server = self._connect()
+        try:
+            with timed(self.on_stage, 'sendmail'):
+                return server.sendmail(sender, recipients, msg)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            raise
+        except smtplib.SMTPException:
+            # sendmail already sent RSET, unless the connection is gone.
+            if not self._is_alive(server):
+                self.close()
+            raise
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._server is None:
+            with timed(self.on_stage, 'connect'):
+                server = smtplib.SMTP(
+                    self.smtp_server, self.port, timeout=self.timeout
+                )
+            self.connections += 1
+            try:
+                with timed(self.on_stage, 'ehlo'):
+                    server.ehlo_or_helo_if_needed()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+                raise
+            self._server = server
+        return self._server
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        return server.sock is not None
+
+
+class BulkSender:
+    """
+    Streams messages through one or more persistent SMTP connections.
+    """
+
+    def __init__(
+        self,
+        smtp_server: str,
+        port: int,
+        sender: str,
+        connections: int = 1,
+        retries: int = 1,
+        timeout: float = 30.0,
+        on_stage: StageHook | None = None,
+    ) -> None:
+        """
+        :param smtp_server: str, the address of the SMTP server.
+        :param port: int, the port of the SMTP server.
+        :param sender: str, the email address of the sender.
+        :param connections: int, number of parallel SMTP connections.
+        :param retries: int, extra attempts after a connection failure.
+        :param timeout: float, socket timeout in seconds.
+        :param on_stage: StageHook, see SmtpSession.
+        """
+        self.smtp_server = smtp_server
+        self.port = port
+        self.sender = sender
+        self.connections = max(1, connections)
+        self.retries = retries
+        self.timeout = timeout
+        self.on_stage = on_stage
+
+    def send(self, messages: Iterable[OutgoingMessage]) -> Iterator[Outcome]:
+        """
+        Delivers every message, yielding outcomes as they complete.
+
+        With several connections, outcomes are not in input order, use
+        Outcome.index to match them.
+
+        :param messages: Iterable[OutgoingMessage], read lazily.
+        :return: Iterator[Outcome], one outcome per message.
+        """
+        if self.connections == 1:
+            session = self._new_session()
+            try:
+                for index, message in enumerate(messages):
+                    yield self._deliver(session, index, message)
+            finally:
+                session.close()
+            return
+
+        yield from self._send_in_parallel(messages)
+
+    def _send_in_parallel(
+        self, messages: Iterable[OutgoingMessage]
+    ) -> Iterator[Outcome]:
+        pending: queue.Queue = queue.Queue(maxsize=self.connections * 4)
+        outcomes: queue.Queue = queue.Queue()
+
+        def worker() -> None:
+            session = self._new_session()
+            try:
+                while (item := pending.get()) is not _DONE:
+                    outcomes.put(self._deliver(session, *item))
+            finally:
+                session.close()
+                outcomes.put(_DONE)
+
+        workers = [
+            threading.Thread(target=worker, daemon=True)
+            for _ in range(self.connections)
+        ]
+        for thread in workers:
+            thread.start()
+
+        errors = []
+
+        def feed() -> None:
+            try:
+                for item in enumerate(messages):
+                    pending.put(item)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                for _ in workers:
+                    pending.put(_DONE)
+
+        threading.Thread(target=feed, daemon=True).start()
+
+        running = len(workers)
+        while running:
+            outcome = outcomes.get()
+            if outcome is _DONE:
+                running -= 1
+                continue
+            yield outcome
+
+        if errors:
+            raise errors[0]
+
+    def _new_session(self) -> SmtpSession:
+        return SmtpSession(
+            self.smtp_server, self.port, self.timeout, self.on_stage
+        )
+
+    def _deliver(
+        self, session: SmtpSession, index: int, message: OutgoingMessage
+    ) -> Outcome:
+        """
+        Sends a message, reconnecting and retrying on connection errors.
+        """
+        outcome = Outcome(index, message.recipient, ok=False)
+        started = time.perf_counter()
+        msg = build_message(
+            self.sender, message.recipient, message.subject, message.message
+        )
+
+        while outcome.attempts <= self.retries:
+            outcome.attempts += 1
+            try:
+                refused = session.sendmail(self.sender, message.recipient, msg)
+                outcome.ok = not refused
+                outcome.error = str(refused) if refused else None
+                break
+            except (
+                smtplib.SMTPServerDisconnected,
+                smtplib.SMTPConnectError,
+            ) as e:
+                outcome.error = str(e)
+            except smtplib.SMTPException as e:
+                outcome.error = str(e)
+                break
+            except OSError as e:
+                outcome.error = str(e)
+
+        outcome.elapsed = time.perf_counter() - started
+        return outcome
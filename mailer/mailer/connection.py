@@ -0,0 +1,254 @@
+import asyncio
+import smtplib
+import socket
+from typing import Dict, List, Tuple
+
+from .metrics import StageHook, timed
+
+Reply = Tuple[int, str]
+
+
+class AsyncSmtpConnection:
+    """
+    A minimal asyncio SMTP client, speaking just enough ESMTP to relay
+    messages without authentication.
+
+    Failures are raised as the usual smtplib exceptions, so callers can
+    handle both the blocking and the asyncio senders alike.
+    """
+
+    def __init__(
+        self,
+        smtp_server: str,
+        port: int,
+        timeout: float = 30.0,
+        local_hostname: str | None = None,
+        pipelining: bool = True,
+        on_stage: StageHook | None = None,
+    ) -> None:
+        """
+        :param smtp_server: str, the address of the SMTP server.
+        :param port: int, the port of the SMTP server.
+        :param timeout: float, seconds to wait for every reply.
+        :param local_hostname: str, the name sent with EHLO, defaults to
+                               the fully qualified domain name.
+        :param pipelining: bool, use PIPELINING when it is advertised.
+        :param on_stage: StageHook, called with the name and duration of
+                         every stage: connect, ehlo, mail (MAIL, RCPT and
+                         DATA commands) and data (the message itself).
+        """
+        self.smtp_server = smtp_server
+        self.port = port
+        self.timeout = timeout
+        self.local_hostname = local_hostname or socket.getfqdn()
+        self.pipelining = pipelining
+        self.on_stage = on_stage
+        self.extensions: Dict[str, str] = {}
+        self.round_trips = 0
+        self._flushed = False
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    @property
+    def pipelined(self) -> bool:
+        return self.pipelining and 'PIPELINING' in self.extensions
+
+    async def connect(self) -> None:
+        """
+        Opens the connection and greets the server.
+
+        :raise smtplib.SMTPConnectError: If the server refuses us.
+        :raise smtplib.SMTPHeloError: If both EHLO and HELO fail.
+        """
+        with timed(self.on_stage, 'connect'):
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.smtp_server, self.port),
+                self.timeout,
+            )
+            code, message = await self._read_reply()
+
+        if code != 220:
+            self.close()
+            raise smtplib.SMTPConnectError(code, message)
+
+        with timed(self.on_stage, 'ehlo'):
+            code, message = await self.command(f'EHLO {self.local_hostname}')
+            if code == 250:
+                self.extensions = _parse_extensions(message)
+                return
+
+            code, message = await self.command(f'HELO {self.local_hostname}')
+
+        if code != 250:
+            self.close()
+            raise smtplib.SMTPHeloError(code, message)
+        self.extensions = {}
+
+    async def sendmail(
+        self, sender: str, recipients: List[str], data: bytes
+    ) -> Dict[str, Reply]:
+        """
+        Runs one mail transaction.
+
+        :param sender: str, the envelope sender.
+        :param recipients: List[str], the envelope recipients.
+        :param data: bytes, the payload built by encode_message().
+        :return: Dict[str, Reply], the recipients refused by the server.
+        :raise smtplib.SMTPSenderRefused: If MAIL FROM is refused.
+        :raise smtplib.SMTPRecipientsRefused: If every RCPT TO is refused.
+        :raise smtplib.SMTPDataError: If the message is not accepted.
+        """
+        commands = [
+            f'MAIL FROM:<{sender}>',
+            *(f'RCPT TO:<{recipient}>' for recipient in recipients),
+            'DATA',
+        ]
+        with timed(self.on_stage, 'mail'):
+            replies = await self._envelope(commands)
+
+        (code, message), *recipient_replies = replies
+        if code != 250:
+            await self._abort(replies)
+            raise smtplib.SMTPSenderRefused(code, message, sender)
+
+        refused = {
+            recipient: reply
+            for recipient, reply in zip(recipients, recipient_replies)
+            if reply[0] not in (250, 251)
+        }
+        if len(refused) == len(recipients):
+            await self._abort(replies)
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, message = replies[-1]
+        if code != 354:
+            await self.reset()
+            raise smtplib.SMTPDataError(code, message)
+
+        with timed(self.on_stage, 'data'):
+            await self._write(data)
+            code, message = await self._read_reply()
+
+        if code != 250:
+            raise smtplib.SMTPDataError(code, message)
+
+        return refused
+
+    async def _envelope(self, commands: List[str]) -> List[Reply]:
+        if self.pipelined:
+            # RFC 2920, the whole envelope goes in a single round trip.
+            await self._write(
+                b''.join(command.encode() + b'\r\n' for command in commands)
+            )
+            return [await self._read_reply() for _ in commands]
+
+        replies = [await self.command(commands[0])]
+        if replies[0][0] == 250:
+            for command in commands[1:-1]:
+                replies.append(await self.command(command))
+            if any(code in (250, 251) for code, _ in replies[1:]):
+                replies.append(await self.command('DATA'))
+        return replies
+
+    async def command(self, line: str) -> Reply:
+        """
+        Sends one command and waits for its reply.
+
+        :param line: str, the command without the line terminator.
+        :return: Reply, the reply code and text.
+        """
+        if self._writer is None:
+            raise smtplib.SMTPServerDisconnected('Not connected')
+
+        await self._write(line.encode('utf-8') + b'\r\n')
+        return await self._read_reply()
+
+    async def reset(self) -> None:
+        """
+        Aborts the current transaction, ignoring a dead connection, so
+        a reset while handling a failure never replaces it.
+        """
+        try:
+            await self.command('RSET')
+        except (smtplib.SMTPException, OSError, asyncio.TimeoutError):
+            self.close()
+
+    async def _abort(self, replies: List[Reply]) -> None:
+        """
+        Resets a transaction refused before DATA. A pipelined DATA
+        accepted regardless must still be terminated, with an empty body.
+        """
+        if replies[-1][0] == 354:
+            await self._write(b'.\r\n')
+            await self._read_reply()
+        await self.reset()
+
+    async def quit(self) -> None:
+        if self._writer is None:
+            return
+
+        try:
+            await self.command('QUIT')
+        except (smtplib.SMTPException, OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        writer, self._writer, self._reader = self._writer, None, None
+        if writer is not None:
+            writer.close()
+
+    async def _write(self, data: bytes) -> None:
+        self._flushed = True
+        try:
+            self._writer.write(data)
+            await self._writer.drain()
+        except OSError:
+            self.close()
+            raise
+
+    async def _read_reply(self) -> Reply:
+        # Only the first reply awaited after a write costs a round trip,
+        # the other replies to a pipelined write are already on the way.
+        if self._flushed:
+            self._flushed = False
+            self.round_trips += 1
+
+        lines = []
+        while True:
+            try:
+                line = await asyncio.wait_for(
+                    self._reader.readline(), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                self.close()
+                raise
+
+            if not line:
+                self.close()
+                raise smtplib.SMTPServerDisconnected(
+                    'Connection unexpectedly closed'
+                )
+
+            lines.append(line[4:].strip().decode('utf-8', 'replace'))
+            if line[3:4] != b'-':
+                try:
+                    return int(line[:3]), '\n'.join(lines)
+                except ValueError:
+                    self.close()
+                    raise smtplib.SMTPResponseException(
+                        -1, f'Malformed reply: {line!r}'
+                    )
+
+
+def _parse_extensions(message: str) -> Dict[str, str]:
+    extensions = {}
+    for line in message.splitlines()[1:]:
+        name, _, parameters = line.partition(' ')
+        extensions[name.upper()] = parameters
+    return extensions
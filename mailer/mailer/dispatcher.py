@@ -0,0 +1,396 @@
+import asyncio
+import itertools
+import smtplib
+import time
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+
+from .bulk import Outcome
+from .connection import AsyncSmtpConnection, Reply
+from .message import UNDISCLOSED_RECIPIENTS, OutgoingMessage, build_payload
+from .metrics import StageHook
+
+_DONE = object()
+
+
+class TokenBucket:
+    """
+    Limits how many messages per second are handed to a server, allowing
+    short bursts.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        """
+        :param rate: float, tokens added per second.
+        :param burst: int, maximum number of tokens saved up, defaults to
+                      one second worth of tokens.
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available and takes it.
+        """
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+
+class AsyncDispatcher:
+    """
+    Delivers messages through a pool of persistent asyncio SMTP
+    connections fed from a shared work queue.
+
+    Each connection is owned by one worker, so the throughput grows with
+    the pool size until the relay, or the rate limit, becomes the
+    bottleneck. Transient failures, 4xx replies and dropped connections,
+    are retried with an exponential backoff.
+
+    The envelope of a message is pipelined when the server allows it,
+    and recipients of an identical message can share one transaction.
+
+    Usage:
+        async with AsyncDispatcher('smtp.host.com', 25, 'me@host.com') as d:
+            outcomes = await d.send(messages)
+    """
+
+    def __init__(
+        self,
+        smtp_server: str,
+        port: int,
+        sender: str,
+        connections: int = 4,
+        max_in_flight: int = 64,
+        rate: float | None = None,
+        burst: int | None = None,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 30.0,
+        max_recipients: int = 1,
+        pipelining: bool = True,
+        on_stage: StageHook | None = None,
+    ) -> None:
+        """
+        :param smtp_server: str, the address of the SMTP server.
+        :param port: int, the port of the SMTP server.
+        :param sender: str, the email address of the sender.
+        :param connections: int, number of pooled SMTP connections.
+        :param max_in_flight: int, messages submitted but not yet
+                              delivered, submit() waits past it.
+        :param rate: float, messages per second allowed on the server,
+                     None disables the rate limit.
+        :param burst: int, messages allowed at once above the rate.
+        :param retries: int, extra attempts after a transient failure.
+        :param backoff: float, seconds before the first retry, doubled
+                        at every further attempt.
+        :param max_backoff: float, upper bound of the backoff.
+        :param timeout: float, seconds to wait for every reply.
+        :param max_recipients: int, recipients of an identical message
+                               sent in one transaction by send() and
+                               stream(), 1 disables batching.
+        :param pipelining: bool, use PIPELINING when it is advertised.
+        :param on_stage: StageHook, see AsyncSmtpConnection.
+        """
+        self.smtp_server = smtp_server
+        self.port = port
+        self.sender = sender
+        self.connections = max(1, connections)
+        self.max_in_flight = max(1, max_in_flight)
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.max_recipients = max(1, max_recipients)
+        self.pipelining = pipelining
+        self.on_stage = on_stage
+        self.pool: List[AsyncSmtpConnection] = []
+        self._queue: asyncio.Queue | None = None
+        self._in_flight: asyncio.Semaphore | None = None
+        self._submitting: asyncio.Lock | None = None
+        self._limiter: TokenBucket | None = None
+        self._workers: List[asyncio.Task] = []
+        self._indexes = itertools.count()
+
+    async def __aenter__(self) -> 'AsyncDispatcher':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """
+        Starts the workers, connections are opened on first use.
+        """
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._submitting = asyncio.Lock()
+        if self.rate:
+            self._limiter = TokenBucket(self.rate, self.burst)
+
+        self.pool = [
+            AsyncSmtpConnection(
+                self.smtp_server,
+                self.port,
+                self.timeout,
+                pipelining=self.pipelining,
+                on_stage=self.on_stage,
+            )
+            for _ in range(self.connections)
+        ]
+        self._workers = [
+            asyncio.create_task(self._worker(connection))
+            for connection in self.pool
+        ]
+
+    async def submit(self, message: OutgoingMessage) -> asyncio.Future:
+        """
+        Queues a message, waiting while max_in_flight are pending.
+
+        :param message: OutgoingMessage, the message to be delivered.
+        :return: asyncio.Future, resolved with its Outcome.
+        """
+        (future,) = await self._submit([(next(self._indexes), message)])
+        return future
+
+    async def send(self, messages: Iterable[OutgoingMessage]) -> List[Outcome]:
+        """
+        Delivers every message.
+
+        :param messages: Iterable[OutgoingMessage], read lazily.
+        :return: List[Outcome], in the order of messages.
+        """
+        futures = []
+        for batch in self._batches(messages):
+            futures.extend(await self._submit(batch))
+
+        outcomes = await asyncio.gather(*futures)
+        return sorted(outcomes, key=lambda outcome: outcome.index)
+
+    async def stream(
+        self, messages: Iterable[OutgoingMessage]
+    ) -> AsyncIterator[Outcome]:
+        """
+        Delivers every message, yielding outcomes as they complete.
+
+        :param messages: Iterable[OutgoingMessage], read lazily.
+        :return: AsyncIterator[Outcome], use Outcome.index to match them.
+        """
+        outcomes: asyncio.Queue = asyncio.Queue()
+
+        async def feed() -> None:
+            total = 0
+            try:
+                for batch in self._batches(messages):
+                    for future in await self._submit(batch):
+                        future.add_done_callback(outcomes.put_nowait)
+                    total += len(batch)
+            finally:
+                outcomes.put_nowait(total)
+
+        feeder = asyncio.create_task(feed())
+        total, received = None, 0
+        try:
+            while total is None or received < total:
+                item = await outcomes.get()
+                if isinstance(item, int):
+                    total = item
+                    continue
+
+                received += 1
+                yield item.result()
+            await feeder
+        finally:
+            feeder.cancel()
+
+    async def close(self) -> None:
+        """
+        Delivers what is queued, then closes every connection.
+        """
+        if not self._workers:
+            return
+
+        for _ in self._workers:
+            self._queue.put_nowait(_DONE)
+        await asyncio.gather(*self._workers)
+        self._workers = []
+
+    def _batches(
+        self, messages: Iterable[OutgoingMessage]
+    ) -> Iterator[List[Tuple[int, OutgoingMessage]]]:
+        """
+        Groups messages sharing a subject and a body, looking ahead at
+        most max_in_flight messages, so each group is sent in a single
+        transaction.
+        """
+        size = min(self.max_recipients, self.max_in_flight)
+        indexed = ((next(self._indexes), message) for message in messages)
+        if size == 1:
+            yield from ([item] for item in indexed)
+            return
+
+        while window := list(itertools.islice(indexed, self.max_in_flight)):
+            groups: Dict[Tuple[str, str], list] = {}
+            for index, message in window:
+                key = (message.subject, message.message)
+                groups.setdefault(key, []).append((index, message))
+
+            for group in map(iter, groups.values()):
+                while batch := list(itertools.islice(group, size)):
+                    yield batch
+
+    async def _submit(
+        self, batch: List[Tuple[int, OutgoingMessage]]
+    ) -> List[asyncio.Future]:
+        # The permits of a batch are taken by one submitter at a time,
+        # otherwise concurrent ones could each hold part of what they
+        # need while no batch is in flight to release any.
+        async with self._submitting:
+            acquired = 0
+            try:
+                for _ in batch:
+                    await self._in_flight.acquire()
+                    acquired += 1
+            except BaseException:
+                for _ in range(acquired):
+                    self._in_flight.release()
+                raise
+
+        loop = asyncio.get_running_loop()
+        items = [
+            (index, message, loop.create_future()) for index, message in batch
+        ]
+        self._queue.put_nowait(items)
+        return [future for _, _, future in items]
+
+    async def _worker(self, connection: AsyncSmtpConnection) -> None:
+        try:
+            while (items := await self._queue.get()) is not _DONE:
+                batch = [(index, message) for index, message, _ in items]
+                try:
+                    outcomes = await self._deliver(connection, batch)
+                except Exception as e:
+                    for *_, future in items:
+                        if not future.cancelled():
+                            future.set_exception(e)
+                else:
+                    for (*_, future), outcome in zip(items, outcomes):
+                        if not future.cancelled():
+                            future.set_result(outcome)
+                finally:
+                    for _ in items:
+                        self._in_flight.release()
+        finally:
+            await connection.quit()
+
+    async def _deliver(
+        self,
+        connection: AsyncSmtpConnection,
+        batch: List[Tuple[int, OutgoingMessage]],
+    ) -> List[Outcome]:
+        """
+        Sends a batch in one transaction, retrying the recipients that
+        failed transiently with a backoff.
+
+        A batch of several recipients is addressed to undisclosed
+        recipients, so no recipient learns about the others.
+        """
+        started = time.perf_counter()
+        outcomes = [
+            Outcome(index, message.recipient, ok=False)
+            for index, message in batch
+        ]
+        first = batch[0][1]
+        data = build_payload(
+            self.sender,
+            first.recipient if len(batch) == 1 else UNDISCLOSED_RECIPIENTS,
+            first.subject,
+            first.message,
+        )
+
+        pending, attempt = outcomes, 0
+        while pending:
+            attempt += 1
+            if self._limiter is not None:
+                await self._limiter.acquire()
+
+            recipients = [outcome.recipient for outcome in pending]
+            try:
+                if not connection.connected:
+                    await connection.connect()
+                failures = _refusals(
+                    await connection.sendmail(self.sender, recipients, data)
+                )
+            except smtplib.SMTPRecipientsRefused as e:
+                failures = _refusals(e.recipients)
+            except (smtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+                failure = (str(e) or repr(e), is_transient(e))
+                failures = dict.fromkeys(recipients, failure)
+
+            retry = []
+            for outcome in pending:
+                outcome.attempts += 1
+                failure = failures.get(outcome.recipient)
+                if failure is None:
+                    outcome.ok, outcome.error = True, None
+                    outcome.transient = False
+                    continue
+
+                outcome.error, outcome.transient = failure
+                if outcome.transient:
+                    retry.append(outcome)
+
+            pending = retry
+            if not pending or attempt > self.retries:
+                break
+
+            await asyncio.sleep(
+                min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            )
+
+        elapsed = time.perf_counter() - started
+        for outcome in outcomes:
+            outcome.elapsed = elapsed
+        return outcomes
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Tells whether a failure is worth retrying later.
+
+    :param error: Exception, the failure to be classified.
+    :return: bool, True for 4xx replies and connection failures.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return not isinstance(error, smtplib.SMTPException)
+
+
+def _refusals(refused: Dict[str, Reply]) -> Dict[str, Tuple[str, bool]]:
+    return {
+        recipient: (f'{code} {message}', 400 <= code < 500)
+        for recipient, (code, message) in refused.items()
+    }
@@ -0,0 +1,79 @@
+import re
+import smtplib
+from dataclasses import dataclass
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from functools import lru_cache
+
+DEFAULT_SUBJECT = 'Message Sent via CLI'
+UNDISCLOSED_RECIPIENTS = 'undisclosed-recipients:;'
+
+
+@dataclass(frozen=True)
+class OutgoingMessage:
+    """
+    A single message to be delivered to one recipient.
+    """
+
+    recipient: str
+    message: str
+    subject: str = DEFAULT_SUBJECT
+
+
+def is_valid_email(email: str) -> bool:
+    """
+    Validates an email address based on a simple regex pattern.
+
+    :param email: str, the email address to validate.
+    :return: bool, True if the email address is valid, False otherwise.
+    """
+    # Simple regex for validating an email address (basic validation)
+    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return re.match(pattern, email) is not None
+
+
+def build_message(
+    sender: str, recipient: str, subject: str, message: str
+) -> str:
+    """
+    Serializes a plain text email.
+
+    :param sender: str, the email address of the sender.
+    :param recipient: str, the email address of the recipient.
+    :param subject: str, the subject of the email.
+    :param message: str, the message to be sent.
+    :return: str, the serialized MIME message.
+    """
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(message, 'plain'))
+    return msg.as_string()
+
+
+def encode_message(msg: str) -> bytes:
+    """
+    Prepares a serialized message for the DATA command, normalizing line
+    endings, dot-stuffing and appending the terminating line.
+
+    :param msg: str, the serialized MIME message.
+    :return: bytes, the payload to be written after DATA.
+    """
+    data = smtplib.quotedata(msg)
+    if not data.endswith('\r\n'):
+        data += '\r\n'
+    return (data + '.\r\n').encode('utf-8')
+
+
+@lru_cache(maxsize=64)
+def build_payload(
+    sender: str, recipient: str, subject: str, message: str
+) -> bytes:
+    """
+    Serializes and encodes a message for the DATA command, once for every
+    distinct set of arguments, so batches and retries reuse it.
+
+    :return: bytes, see encode_message().
+    """
+    return encode_message(build_message(sender, recipient, subject, message))
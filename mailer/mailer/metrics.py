@@ -0,0 +1,87 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List
+
+StageHook = Callable[[str, float], None]
+
+
+class LatencyRecorder:
+    """
+    Collects durations by name, e.g. the send stages reported by the
+    on_stage hooks of the senders.
+
+    Usage:
+        recorder = LatencyRecorder()
+        AsyncDispatcher(..., on_stage=recorder)
+        recorder.summary()
+    """
+
+    def __init__(self) -> None:
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __call__(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[name].append(seconds)
+
+    def percentile(self, name: str, percentile: float) -> float:
+        """
+        :param name: str, the stage or metric.
+        :param percentile: float, between 0 and 100.
+        :return: float, the nearest-rank percentile in seconds, 0.0 if
+                 nothing was recorded.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        return _nearest_rank(samples, percentile)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: Dict[str, Dict[str, float]], count, mean, p50 and p99 of
+                 every name, in seconds.
+        """
+        with self._lock:
+            samples = {
+                name: sorted(values) for name, values in self._samples.items()
+            }
+
+        return {
+            name: {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': _nearest_rank(values, 50),
+                'p99': _nearest_rank(values, 99),
+            }
+            for name, values in samples.items()
+            if values
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+@contextmanager
+def timed(hook: StageHook | None, name: str) -> Iterator[None]:
+    """
+    Reports the duration of the block to hook, when there is one, even
+    if the block fails.
+    """
+    if hook is None:
+        yield
+        return
+
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        hook(name, perf_counter() - started)
+
+
+def _nearest_rank(samples: List[float], percentile: float) -> float:
+    if not samples:
+        return 0.0
+    rank = max(1, -(-len(samples) * percentile // 100))
+    return samples[int(rank) - 1]
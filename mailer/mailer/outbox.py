@@ -0,0 +1,419 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from .bulk import Outcome
+from .dispatcher import AsyncDispatcher
+from .message import OutgoingMessage
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    message TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt_at);
+'''
+
+
+@dataclass(frozen=True)
+class Spooled:
+    """
+    A message claimed from the outbox for delivery.
+    """
+
+    id: int
+    message: OutgoingMessage
+    attempts: int
+
+
+class Outbox:
+    """
+    A durable SQLite spool of messages waiting for delivery.
+
+    Every message goes through pending, sending, then either sent or
+    failed, each transition being a single transaction, so a message is
+    settled exactly once. Messages left sending by a process that died
+    are put back to pending when the outbox is opened again, which
+    means one may be delivered twice if the crash happened between the
+    server accepting it and the outbox recording it. A spool must be
+    drained by a single process.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_attempts: int = 5,
+        backoff: float = 30.0,
+        max_backoff: float = 3600.0,
+    ) -> None:
+        """
+        :param path: str | Path, the SQLite database, created if needed.
+        :param max_attempts: int, deliveries tried before a transiently
+                             failing message is given up.
+        :param backoff: float, seconds before retrying a message, doubled
+                        at every further attempt.
+        :param max_backoff: float, upper bound of the backoff.
+        """
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._available = threading.Event()
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+        self.recovered = self.recover()
+
+    def __enter__(self) -> 'Outbox':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def enqueue(self, message: OutgoingMessage, delay: float = 0.0) -> int:
+        """
+        Spools a message, without waiting for any SMTP server.
+
+        :param message: OutgoingMessage, the message to be delivered.
+        :param delay: float, seconds before it may be delivered.
+        :return: int, the identifier of the spooled message.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                'INSERT INTO outbox (recipient, subject, message, state, '
+                'created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    message.recipient,
+                    message.subject,
+                    message.message,
+                    PENDING,
+                    now,
+                    now + delay,
+                ),
+            )
+        self._available.set()
+        return cursor.lastrowid
+
+    def enqueue_many(self, messages: Iterable[OutgoingMessage]) -> int:
+        """
+        Spools many messages in a single transaction.
+
+        :param messages: Iterable[OutgoingMessage], the messages.
+        :return: int, the number of spooled messages.
+        """
+        now = time.time()
+        rows = (
+            (m.recipient, m.subject, m.message, PENDING, now, now)
+            for m in messages
+        )
+        with self._lock, self._transaction():
+            cursor = self._connection.executemany(
+                'INSERT INTO outbox (recipient, subject, message, state, '
+                'created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+        self._available.set()
+        return cursor.rowcount
+
+    def claim(self, limit: int) -> List[Spooled]:
+        """
+        Marks the oldest due messages as being sent.
+
+        :param limit: int, the maximum number of messages claimed.
+        :return: List[Spooled], the claimed messages, oldest first.
+        """
+        with self._lock, self._transaction():
+            rows = self._connection.execute(
+                'SELECT id, recipient, subject, message, attempts '
+                'FROM outbox WHERE state = ? AND next_attempt_at <= ? '
+                'ORDER BY id LIMIT ?',
+                (PENDING, time.time(), limit),
+            ).fetchall()
+            self._connection.executemany(
+                'UPDATE outbox SET state = ? WHERE id = ?',
+                [(SENDING, row[0]) for row in rows],
+            )
+
+        return [
+            Spooled(id, OutgoingMessage(recipient, message, subject), tries)
+            for id, recipient, subject, message, tries in rows
+        ]
+
+    def settle(self, results: Iterable[Tuple[Spooled, Outcome]]) -> int:
+        """
+        Records the outcome of claimed messages. Transient failures are
+        rescheduled with a backoff until max_attempts is reached.
+
+        :param results: Iterable[Tuple[Spooled, Outcome]], the claimed
+                        messages with the outcome of their delivery.
+        :return: int, the number of messages given up on.
+        """
+        now = time.time()
+        sent, retried, failed = [], [], []
+        for spooled, outcome in results:
+            attempts = spooled.attempts + max(1, outcome.attempts)
+            if outcome.ok:
+                sent.append((SENT, attempts, now, spooled.id, SENDING))
+            elif outcome.transient and attempts < self.max_attempts:
+                delay = min(
+                    self.max_backoff, self.backoff * 2 ** (attempts - 1)
+                )
+                retried.append(
+                    (
+                        PENDING,
+                        attempts,
+                        outcome.error,
+                        now + delay,
+                        spooled.id,
+                        SENDING,
+                    )
+                )
+            else:
+                failed.append(
+                    (FAILED, attempts, outcome.error, spooled.id, SENDING)
+                )
+
+        with self._lock, self._transaction():
+            self._connection.executemany(
+                'UPDATE outbox SET state = ?, attempts = ?, error = NULL, '
+                'sent_at = ? WHERE id = ? AND state = ?',
+                sent,
+            )
+            self._connection.executemany(
+                'UPDATE outbox SET state = ?, attempts = ?, error = ?, '
+                'next_attempt_at = ? WHERE id = ? AND state = ?',
+                retried,
+            )
+            cursor = self._connection.executemany(
+                'UPDATE outbox SET state = ?, attempts = ?, error = ? '
+                'WHERE id = ? AND state = ?',
+                failed,
+            )
+        return cursor.rowcount
+
+    def recover(self) -> int:
+        """
+        Puts back messages left being sent by a previous process.
+
+        :return: int, the number of recovered messages.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                'UPDATE outbox SET state = ? WHERE state = ?',
+                (PENDING, SENDING),
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """
+        :return: Dict[str, int], the number of messages by state.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT state, COUNT(*) FROM outbox GROUP BY state'
+            ).fetchall()
+
+        counts = dict.fromkeys((PENDING, SENDING, SENT, FAILED), 0)
+        counts.update(rows)
+        return counts
+
+    def failures(self) -> List[Tuple[int, str, str]]:
+        """
+        :return: List[Tuple[int, str, str]], the identifier, recipient
+                 and last error of every message given up.
+        """
+        with self._lock:
+            return self._connection.execute(
+                'SELECT id, recipient, error FROM outbox WHERE state = ? '
+                'ORDER BY id',
+                (FAILED,),
+            ).fetchall()
+
+    def next_due(self) -> float | None:
+        """
+        :return: float, when the next pending message is due, None if
+                 there is none.
+        """
+        with self._lock:
+            (due,) = self._connection.execute(
+                'SELECT MIN(next_attempt_at) FROM outbox WHERE state = ?',
+                (PENDING,),
+            ).fetchone()
+        return due
+
+    def purge(self, older_than: float = 0.0) -> int:
+        """
+        Deletes delivered messages.
+
+        :param older_than: float, only those sent that many seconds ago.
+        :return: int, the number of deleted messages.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                'DELETE FROM outbox WHERE state = ? AND sent_at <= ?',
+                (SENT, time.time() - older_than),
+            )
+        return cursor.rowcount
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Waits until a message is enqueued.
+
+        :param timeout: float, seconds to wait, None waits forever.
+        :return: bool, True if a message was enqueued meanwhile.
+        """
+        available = self._available.wait(timeout)
+        self._available.clear()
+        return available
+
+    def notify(self) -> None:
+        """
+        Wakes up whoever waits for messages.
+        """
+        self._available.set()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _transaction(self) -> sqlite3.Connection:
+        # With isolation_level=None, the connection context manager only
+        # commits or rolls back, so the transaction is opened here.
+        self._connection.execute('BEGIN IMMEDIATE')
+        return self._connection
+
+
+class OutboxWorker:
+    """
+    Drains an outbox through an AsyncDispatcher, from a background thread
+    or from the calling one.
+
+    Usage:
+        outbox = Outbox('spool.db')
+        worker = OutboxWorker(
+            outbox, lambda: AsyncDispatcher('smtp.host.com', 25, 'me@host')
+        )
+        worker.start()
+        outbox.enqueue(OutgoingMessage('you@host.com', 'hello'))
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        dispatcher_factory: Callable[[], AsyncDispatcher],
+        batch_size: int = 64,
+        poll_interval: float = 1.0,
+    ) -> None:
+        """
+        :param outbox: Outbox, the spool to be drained.
+        :param dispatcher_factory: Callable[[], AsyncDispatcher], builds
+                                   the dispatcher delivering messages.
+        :param batch_size: int, messages claimed at once.
+        :param poll_interval: float, maximum seconds between two looks at
+                              the outbox while it is idle.
+        """
+        self.outbox = outbox
+        self.dispatcher_factory = dispatcher_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.delivered = 0
+        self.failed = 0
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """
+        Delivers messages in a background thread until stop() is called.
+        """
+        if self._thread is not None:
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=asyncio.run, args=(self._run(idle_exit=False),), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Stops the background thread once the claimed messages are settled.
+
+        :param timeout: float, seconds to wait for it, None waits forever.
+        """
+        self._stopping.set()
+        self.outbox.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def drain(self) -> Tuple[int, int]:
+        """
+        Delivers every due message from the calling thread, leaving those
+        scheduled for a later retry.
+
+        :return: Tuple[int, int], the number of messages delivered and of
+                 those given up on by this drain.
+        """
+        delivered, failed = self.delivered, self.failed
+        asyncio.run(self._run(idle_exit=True))
+        return self.delivered - delivered, self.failed - failed
+
+    async def _run(self, idle_exit: bool) -> None:
+        async with self.dispatcher_factory() as dispatcher:
+            while not self._stopping.is_set():
+                claimed = self.outbox.claim(self.batch_size)
+                if claimed:
+                    await self._deliver(dispatcher, claimed)
+                    continue
+
+                if idle_exit:
+                    return
+
+                await asyncio.to_thread(self._idle)
+
+    async def _deliver(
+        self, dispatcher: AsyncDispatcher, claimed: List[Spooled]
+    ) -> None:
+        try:
+            outcomes = await dispatcher.send(
+                [spooled.message for spooled in claimed]
+            )
+        except BaseException:
+            # Leave nothing stuck as being sent by a live process.
+            self.failed += self.outbox.settle(
+                (spooled, Outcome(0, '', ok=False, transient=True))
+                for spooled in claimed
+            )
+            raise
+
+        self.failed += self.outbox.settle(zip(claimed, outcomes))
+        self.delivered += sum(outcome.ok for outcome in outcomes)
+
+    def _idle(self) -> None:
+        timeout = self.poll_interval
+        due = self.outbox.next_due()
+        if due is not None:
+            timeout = min(timeout, max(0.0, due - time.time()))
+        self.outbox.wait(timeout)
@@ -0,0 +1,221 @@
+"""
+A local stand-in SMTP server, so the senders can be exercised and
+benchmarked without a real relay.
+"""
+
+import asyncio
+import random
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class ReceivedMessage:
+    sender: str
+    recipients: Tuple[str, ...]
+    data: bytes
+
+
+class FakeSmtpServer:
+    """
+    An in-process SMTP server accepting every message it is given.
+
+    Failures can be injected per command with fail(), or at random on
+    RCPT with error_rate. Replies are delivered latency seconds after
+    they are produced, emulating the link to a distant relay: commands
+    waiting for each other pay it every time, pipelined ones once.
+
+    Usage:
+        async with FakeSmtpServer() as server:
+            dispatcher = AsyncDispatcher('127.0.0.1', server.port, ...)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        extensions: Sequence[str] = ('8BITMIME', 'PIPELINING'),
+        error_rate: float = 0.0,
+        error_code: int = 451,
+        seed: int | None = None,
+    ) -> None:
+        """
+        :param latency: float, one-way delay of every reply, in seconds.
+        :param extensions: Sequence[str], advertised in the EHLO reply.
+        :param error_rate: float, probability of refusing a recipient.
+        :param error_code: int, the reply code of those refusals.
+        :param seed: int, seeds the random refusals.
+        """
+        self.latency = latency
+        self.extensions = list(extensions)
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self._random = random.Random(seed)
+        self.port = 0
+        self.connections = 0
+        self.messages: List[ReceivedMessage] = []
+        self.commands: Dict[str, int] = defaultdict(int)
+        self._failures: Dict[str, Deque[Tuple[int, str]]] = defaultdict(deque)
+        self._server: asyncio.AbstractServer | None = None
+
+    async def __aenter__(self) -> 'FakeSmtpServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        """
+        :param host: str, the address to listen on.
+        :param port: int, the port to listen on, 0 picks a free one.
+        :return: int, the port the server listens on.
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def fail(
+        self,
+        verb: str,
+        code: int,
+        message: str = 'Injected failure',
+        times: int = 1,
+    ) -> None:
+        """
+        Answer the next occurrences of a command with an error.
+
+        :param verb: str, the command to fail, e.g. 'RCPT' or 'DATA'.
+        :param code: int, the reply code, e.g. 451 or 550.
+        :param message: str, the reply text.
+        :param times: int, how many commands are answered this way.
+        """
+        self._failures[verb.upper()].extend([(code, message)] * times)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        sender, recipients = None, []
+
+        loop = asyncio.get_running_loop()
+
+        async def reply(code: int, *lines: str) -> None:
+            lines = lines or ('OK',)
+            payload = (
+                ''.join(f'{code}-{line}\r\n' for line in lines[:-1])
+                + f'{code} {lines[-1]}\r\n'
+            )
+            if self.latency:
+                loop.call_later(self.latency, writer.write, payload.encode())
+                return
+
+            writer.write(payload.encode())
+            await writer.drain()
+
+        try:
+            await reply(220, 'localhost ESMTP fake')
+            while line := await reader.readline():
+                command = line.decode('utf-8', 'replace').rstrip('\r\n')
+                verb = command[:4].upper()
+                self.commands[verb] += 1
+
+                failures = self._failures.get(verb)
+                if failures:
+                    await reply(*failures.popleft())
+                    continue
+
+                if verb == 'EHLO':
+                    await reply(250, 'localhost', *self.extensions)
+                elif verb in ('HELO', 'NOOP'):
+                    await reply(250)
+                elif verb == 'MAIL':
+                    sender, recipients = _address(command), []
+                    await reply(250)
+                elif verb == 'RCPT':
+                    if sender is None:
+                        await reply(503, 'Need MAIL command')
+                        continue
+                    if self._random.random() < self.error_rate:
+                        await reply(self.error_code, 'Injected refusal')
+                        continue
+                    recipients.append(_address(command))
+                    await reply(250)
+                elif verb == 'DATA':
+                    if not recipients:
+                        await reply(503, 'Need RCPT command')
+                        continue
+                    await reply(354, 'End data with <CR><LF>.<CR><LF>')
+                    data = await _read_data(reader)
+                    self.messages.append(
+                        ReceivedMessage(sender, tuple(recipients), data)
+                    )
+                    sender, recipients = None, []
+                    await reply(250)
+                elif verb == 'RSET':
+                    sender, recipients = None, []
+                    await reply(250)
+                elif verb == 'QUIT':
+                    await reply(221, 'Bye')
+                    break
+                else:
+                    await reply(500, 'Command not recognized')
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if self.latency:
+                # Let the replies still on the wire arrive.
+                await asyncio.sleep(self.latency)
+            writer.close()
+
+
+def _address(command: str) -> str:
+    return command.partition(':')[2].strip().split(' ')[0].strip('<>')
+
+
+async def _read_data(reader: asyncio.StreamReader) -> bytes:
+    lines = []
+    while (line := await reader.readline()) != b'.\r\n':
+        if not line:
+            raise asyncio.IncompleteReadError(b'', None)
+        lines.append(line[1:] if line.startswith(b'..') else line)
+    return b''.join(lines)
+
+
+class ServerThread:
+    """
+    Runs a FakeSmtpServer on an event loop of its own, so blocking
+    senders can talk to it like they would to a remote relay.
+
+    Usage:
+        with ServerThread(FakeSmtpServer()) as server:
+            BulkSender('127.0.0.1', server.port, ...)
+    """
+
+    def __init__(self, server: FakeSmtpServer) -> None:
+        self.server = server
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, daemon=True
+        )
+
+    def __enter__(self) -> FakeSmtpServer:
+        self._thread.start()
+        self._call(self.server.start())
+        return self.server
+
+    def __exit__(self, *_) -> None:
+        self._call(self.server.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
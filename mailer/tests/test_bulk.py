@@ -0,0 +1,101 @@
+import io
+import smtplib
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from mailer.bulk import BulkSender, read_messages
+from mailer.message import OutgoingMessage
+
+
+class TestBulk(TestCase):
+    def test_read_messages_csv(self):
+        stream = io.StringIO(
+            'recipient,message,subject\n'
+            'a@host.com,hello,\n'
+            'b@host.com,world,custom\n'
+        )
+        messages = list(read_messages(stream, 'csv', 'default'))
+        self.assertEqual(
+            messages,
+            [
+                OutgoingMessage('a@host.com', 'hello', 'default'),
+                OutgoingMessage('b@host.com', 'world', 'custom'),
+            ],
+        )
+
+    def test_read_messages_jsonl(self):
+        stream = io.StringIO(
+            '{"recipient": "a@host.com", "message": "hello"}\n\n'
+        )
+        messages = list(read_messages(stream, 'jsonl', 'default'))
+        self.assertEqual(
+            messages, [OutgoingMessage('a@host.com', 'hello', 'default')]
+        )
+
+    def test_invalid_records_name_their_line(self):
+        cases = [
+            ('csv', 'recipient,message\na@host.com,hi\nb@host.com\n', 3),
+            ('csv', 'recipient,message\nnot-an-email,hi\n', 2),
+            ('jsonl', '{"recipient": "a@host.com", "message": "hi"}\n\n{', 3),
+            ('jsonl', '{"message": "hi"}\n', 1),
+            ('jsonl', '["a@host.com", "hi"]\n', 1),
+        ]
+        for format, content, line in cases:
+            with self.subTest(format=format, content=content):
+                messages = read_messages(io.StringIO(content), format, 'x')
+                with self.assertRaisesRegex(ValueError, f'^line {line} '):
+                    list(messages)
+
+    @patch('smtplib.SMTP')
+    def test_connection_is_reused(self, smtp):
+        smtp.return_value.sendmail.return_value = {}
+        messages = [
+            OutgoingMessage(f'{index}@host.com', 'hello')
+            for index in range(5)
+        ]
+
+        outcomes = list(
+            BulkSender('smtp.host.com', 25, 'me@host.com').send(messages)
+        )
+
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        self.assertEqual(smtp.call_count, 1)
+        self.assertEqual(smtp.return_value.sendmail.call_count, 5)
+        smtp.return_value.quit.assert_called_once()
+
+    @patch('smtplib.SMTP')
+    def test_reconnects_after_disconnection(self, smtp):
+        server = MagicMock()
+        server.sendmail.side_effect = [
+            smtplib.SMTPServerDisconnected('gone'),
+            {},
+        ]
+        smtp.return_value = server
+
+        outcomes = list(
+            BulkSender('smtp.host.com', 25, 'me@host.com').send(
+                [OutgoingMessage('a@host.com', 'hello')]
+            )
+        )
+
+        self.assertTrue(outcomes[0].ok)
+        self.assertEqual(outcomes[0].attempts, 2)
+        self.assertEqual(smtp.call_count, 2)
+
+    @patch('smtplib.SMTP')
+    def test_parallel_connections(self, smtp):
+        smtp.return_value.sendmail.return_value = {}
+        messages = [
+            OutgoingMessage(f'{index}@host.com', 'hello')
+            for index in range(20)
+        ]
+
+        sender = BulkSender(
+            'smtp.host.com', 25, 'me@host.com', connections=3
+        )
+        outcomes = list(sender.send(messages))
+
+        self.assertEqual(
+            sorted(outcome.index for outcome in outcomes), list(range(20))
+        )
+        self.assertLessEqual(smtp.call_count, 3)
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from unittest import TestCase
+
+from mailer.connection import AsyncSmtpConnection
+from mailer.dispatcher import AsyncDispatcher
+from mailer.message import OutgoingMessage
+from mailer.metrics import LatencyRecorder
+from mailer.testing import FakeSmtpServer
+
+
+def _messages(count: int):
+    return [
+        OutgoingMessage(f'user{index}@host.com', f'hello {index}')
+        for index in range(count)
+    ]
+
+
+async def _send(server: FakeSmtpServer, messages, **kwargs):
+    async with AsyncDispatcher(
+        '127.0.0.1', server.port, 'me@host.com', **kwargs
+    ) as dispatcher:
+        return await dispatcher.send(messages)
+
+
+class TestAsyncDispatcher(TestCase):
+    def test_delivers_through_the_pool(self):
+        async def run():
+            async with FakeSmtpServer() as server:
+                outcomes = await _send(server, _messages(30), connections=3)
+                return server, outcomes
+
+        server, outcomes = asyncio.run(run())
+
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        self.assertEqual(len(server.messages), 30)
+        self.assertLessEqual(server.connections, 3)
+        self.assertEqual(
+            {message.recipients[0] for message in server.messages},
+            {message.recipient for message in _messages(30)},
+        )
+
+    def test_retries_transient_failures(self):
+        async def run():
+            async with FakeSmtpServer() as server:
+                server.fail('RCPT', 451, times=2)
+                outcomes = await _send(
+                    server, _messages(1), connections=1, backoff=0.01
+                )
+                return server, outcomes
+
+        server, outcomes = asyncio.run(run())
+
+        self.assertTrue(outcomes[0].ok)
+        self.assertEqual(outcomes[0].attempts, 3)
+        self.assertEqual(len(server.messages), 1)
+
+    def test_permanent_failures_are_not_retried(self):
+        async def run():
+            async with FakeSmtpServer() as server:
+                server.fail('DATA', 554, 'Rejected')
+                return await _send(
+                    server, _messages(2), connections=1, backoff=0.01
+                )
+
+        outcomes = asyncio.run(run())
+
+        self.assertFalse(outcomes[0].ok)
+        self.assertEqual(outcomes[0].attempts, 1)
+        self.assertIn('Rejected', outcomes[0].error)
+        self.assertTrue(outcomes[1].ok)
+
+    def test_rate_limit(self):
+        async def run():
+            async with FakeSmtpServer() as server:
+                started = time.perf_counter()
+                await _send(server, _messages(6), rate=50, burst=1)
+                return time.perf_counter() - started
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.09)
+
+    def test_stream(self):
+        async def run():
+            async with FakeSmtpServer() as server:
+                async with AsyncDispatcher(
+                    '127.0.0.1', server.port, 'me@host.com', max_in_flight=2
+                ) as dispatcher:
+                    return [
+                        outcome
+                        async for outcome in dispatcher.stream(_messages(10))
+                    ]
+
+        outcomes = asyncio.run(run())
+
+        self.assertEqual(
+            sorted(outcome.index for outcome in outcomes), list(range(10))
+        )
+
+    def test_pipelining_saves_round_trips(self):
+        async def run(extensions):
+            async with FakeSmtpServer(extensions=extensions) as server:
+                async with AsyncDispatcher(
+                    '127.0.0.1', server.port, 'me@host.com', connections=1
+                ) as dispatcher:
+                    await dispatcher.send(_messages(4))
+                    (connection,) = dispatcher.pool
+                    return connection.round_trips
+
+        pipelined = asyncio.run(run(('PIPELINING',)))
+        sequential = asyncio.run(run(()))
+
+        # EHLO, then the envelope and the body of every message.
+        self.assertEqual(pipelined, 1 + 4 * 2)
+        self.assertEqual(sequential, 1 + 4 * 4)
+
+    def test_concurrent_submitters_share_the_permits(self):
+        async def run():
+            async with FakeSmtpServer() as server:
+                async with AsyncDispatcher(
+                    '127.0.0.1',
+                    server.port,
+                    'me@host.com',
+                    connections=2,
+                    max_in_flight=4,
+                    max_recipients=4,
+                ) as dispatcher:
+                    sends = [
+                        dispatcher.send(
+                            OutgoingMessage(f'{name}{index}@host.com', name)
+                            for index in range(12)
+                        )
+                        for name in 'abcd'
+                    ]
+                    return await asyncio.wait_for(asyncio.gather(*sends), 5)
+
+        for outcomes in asyncio.run(run()):
+            self.assertEqual(len(outcomes), 12)
+            self.assertTrue(all(outcome.ok for outcome in outcomes))
+
+    def test_reset_ignores_a_closed_connection(self):
+        async def run():
+            async with FakeSmtpServer() as server:
+                connection = AsyncSmtpConnection('127.0.0.1', server.port)
+                await connection.reset()
+                await connection.connect()
+                await connection.command('QUIT')
+                await connection.reset()
+                return connection
+
+        self.assertFalse(asyncio.run(run()).connected)
+
+    def test_batches_identical_messages(self):
+        messages = [
+            OutgoingMessage(f'user{index}@host.com', 'same body')
+            for index in range(7)
+        ]
+
+        async def run():
+            async with FakeSmtpServer() as server:
+                server.fail('RCPT', 550, 'No such user')
+                outcomes = await _send(
+                    server, messages, connections=1, max_recipients=3
+                )
+                return server, outcomes
+
+        server, outcomes = asyncio.run(run())
+
+        self.assertEqual(
+            [outcome.index for outcome in outcomes], list(range(7))
+        )
+        self.assertEqual(
+            [len(message.recipients) for message in server.messages],
+            [2, 3, 1],
+        )
+        self.assertIn(b'undisclosed-recipients', server.messages[0].data)
+        self.assertFalse(outcomes[0].ok)
+        self.assertIn('No such user', outcomes[0].error)
+        self.assertTrue(all(outcome.ok for outcome in outcomes[1:]))
+
+    def test_stage_hooks(self):
+        recorder = LatencyRecorder()
+
+        async def run():
+            async with FakeSmtpServer() as server:
+                await _send(
+                    server, _messages(3), connections=1, on_stage=recorder
+                )
+
+        asyncio.run(run())
+        summary = recorder.summary()
+
+        self.assertEqual(
+            {stage: summary[stage]['count'] for stage in summary},
+            {'connect': 1, 'ehlo': 1, 'mail': 3, 'data': 3},
+        )
+        self.assertLessEqual(summary['mail']['p50'], summary['mail']['p99'])
@@ -0,0 +1,136 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+
+from mailer.bulk import Outcome
+from mailer.dispatcher import AsyncDispatcher
+from mailer.message import OutgoingMessage
+from mailer.outbox import (
+    FAILED,
+    PENDING,
+    SENDING,
+    SENT,
+    Outbox,
+    OutboxWorker,
+)
+from mailer.testing import FakeSmtpServer, ServerThread
+
+
+def _messages(count: int):
+    return [
+        OutgoingMessage(f'user{index}@host.com', f'hello {index}')
+        for index in range(count)
+    ]
+
+
+class TestOutbox(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'outbox.db'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_interrupted_deliveries_are_recovered(self):
+        with Outbox(self.path) as outbox:
+            outbox.enqueue_many(_messages(3))
+            self.assertEqual(len(outbox.claim(2)), 2)
+            self.assertEqual(len(outbox.claim(2)), 1)
+            self.assertEqual(outbox.claim(2), [])
+
+        with Outbox(self.path) as outbox:
+            self.assertEqual(outbox.recovered, 3)
+            self.assertEqual(outbox.counts()[PENDING], 3)
+
+    def test_settle_once(self):
+        with Outbox(self.path, max_attempts=2, backoff=0.0) as outbox:
+            outbox.enqueue_many(_messages(3))
+            first, second, third = outbox.claim(3)
+            outbox.settle(
+                [
+                    (first, Outcome(0, '', ok=True, attempts=1)),
+                    (second, Outcome(1, '', ok=False, transient=True)),
+                    (third, Outcome(2, '', ok=False, error='550 Nope')),
+                ]
+            )
+            # Settling again must not change anything.
+            outbox.settle([(first, Outcome(0, '', ok=False))])
+
+            self.assertEqual(
+                outbox.counts(),
+                {PENDING: 1, SENDING: 0, SENT: 1, FAILED: 1},
+            )
+            self.assertEqual(
+                outbox.failures(),
+                [(third.id, third.message.recipient, '550 Nope')],
+            )
+
+            (second,) = outbox.claim(3)
+            self.assertEqual(second.attempts, 1)
+            outbox.settle([(second, Outcome(1, '', ok=False, transient=True))])
+            self.assertEqual(outbox.counts()[FAILED], 2)
+
+    def test_worker_drains_in_the_background(self):
+        with ServerThread(FakeSmtpServer()) as server, Outbox(
+            self.path
+        ) as outbox:
+            worker = OutboxWorker(
+                outbox,
+                lambda: AsyncDispatcher(
+                    '127.0.0.1', server.port, 'me@host.com', connections=2
+                ),
+                poll_interval=0.05,
+            )
+            worker.start()
+            for message in _messages(10):
+                outbox.enqueue(message)
+
+            for _ in range(100):
+                if outbox.counts()[SENT] == 10:
+                    break
+                time.sleep(0.02)
+            worker.stop(timeout=5)
+
+            self.assertEqual(outbox.counts()[SENT], 10)
+            self.assertEqual(len(server.messages), 10)
+            self.assertEqual(worker.delivered, 10)
+
+    def test_drain_leaves_transient_failures_for_later(self):
+        with ServerThread(FakeSmtpServer()) as server, Outbox(
+            self.path
+        ) as outbox:
+            server.fail('MAIL', 421, 'Busy', times=1)
+            outbox.enqueue_many(_messages(2))
+            worker = OutboxWorker(
+                outbox,
+                lambda: AsyncDispatcher(
+                    '127.0.0.1',
+                    server.port,
+                    'me@host.com',
+                    connections=1,
+                    retries=0,
+                ),
+            )
+
+            self.assertEqual(worker.drain(), (1, 0))
+            self.assertEqual(outbox.counts()[PENDING], 1)
+            self.assertIsNotNone(outbox.next_due())
+
+    def test_drain_only_counts_its_own_failures(self):
+        with ServerThread(FakeSmtpServer()) as server, Outbox(
+            self.path
+        ) as outbox:
+            server.fail('MAIL', 554, 'Rejected', times=1)
+            worker = OutboxWorker(
+                outbox,
+                lambda: AsyncDispatcher(
+                    '127.0.0.1', server.port, 'me@host.com', connections=1
+                ),
+            )
+
+            outbox.enqueue_many(_messages(2))
+            self.assertEqual(worker.drain(), (1, 1))
+            outbox.enqueue_many(_messages(1))
+            self.assertEqual(worker.drain(), (1, 0))
+            self.assertEqual(outbox.counts()[FAILED], 1)
@@ -0,0 +1,78 @@
+"""
+Startup cost of CLIs using printer, measured in fresh interpreters.
+
+Run from the package root with:
+
+    python -m benchmarks.bench_import --runs 30
+    python -m benchmarks.bench_import --module mailer.app
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    'interpreter': 'pass',
+    'import': 'import printer.console',
+    'print to a pipe': 'from printer.console import inf; inf("[b]hello[/b]")',
+    'print to a terminal': (
+        'from printer.console import inf; inf("[b]hello[/b]")'
+    ),
+}
+
+
+def measure(code: str, runs: int, terminal: bool = False) -> list:
+    environment = dict(os.environ)
+    environment.pop('FORCE_COLOR', None)
+    if terminal:
+        # Rich renders as if stdout were a terminal.
+        environment['FORCE_COLOR'] = '1'
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-c', code],
+            check=True,
+            env=environment,
+            stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(name: str, timings: list, baseline: float) -> None:
+    median = statistics.median(timings)
+    print(
+        f'{name:>22}: median {median * 1000:7.1f}ms, '
+        f'min {min(timings) * 1000:7.1f}ms, '
+        f'+{(median - baseline) * 1000:6.1f}ms over the interpreter'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument(
+        '--module',
+        action='append',
+        default=[],
+        help='Also measure importing this module, e.g. mailer.app',
+    )
+    arguments = parser.parse_args()
+
+    baseline = statistics.median(measure('pass', arguments.runs))
+    for name, code in SCENARIOS.items():
+        timings = measure(code, arguments.runs, 'terminal' in name)
+        report(name, timings, baseline)
+
+    for module in arguments.module:
+        timings = measure(f'import {module}', arguments.runs)
+        report(f'import {module}', timings, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,153 @@
+"""
+Rich is only imported, and the consoles only created, the first time a
+message goes to a terminal, so short-lived CLIs writing to pipes or
+barely printing start faster. console_stdout and console_stderr are
+still available as module attributes.
+
+PRINTER_LEVEL sets the lowest level printed, inf by default, and
+PRINTER_FORMAT=json prints every message as a JSON object per line
+instead of text; set_level() and set_format() do the same at runtime.
+"""
+
+import atexit
+import os
+import queue
+import re
 import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
+from typing import TYPE_CHECKING, Any, TextIO
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+STYLES = {
+    'err': 'bold red',
+    'suc': 'bold green',
+    'war': 'bold yellow',
+    'inf': 'bold blue',
+    'dbg': 'dim',
+}
+LEVELS = {'dbg': 10, 'inf': 20, 'suc': 25, 'war': 30, 'err': 40}
+FORMATS = ('text', 'json')
+BUFFER_LINES = 512
+
+# Same tag syntax as rich.markup.
+_TAGS = re.compile(r'(\\*)\[[a-z#/@][^[]*?]')
+_ESCAPE = re.compile(r'(\\*)(\[[a-z#/@][^[]*?])')
+
+_lock = threading.RLock()
+_buffering = 0
+_pending: list[tuple[TextIO, str]] = []
+_queue: queue.SimpleQueue | None = None
+_worker: threading.Thread | None = None
+_terminals: dict[str, tuple[TextIO, bool]] = {}
+_consoles: dict[str, 'Console'] = {}
+_prefixes: dict[str, object] = {}
+_dumps: Callable[[dict[str, Any]], str] | None = None
+_threshold = LEVELS.get(os.environ.get('PRINTER_LEVEL', ''), LEVELS['inf'])
+_format = os.environ.get('PRINTER_FORMAT', 'text')
+if _format not in FORMATS:
+    _format = 'text'
 
-from rich.console import Console
-from rich.markup import escape
-from rich.text import Text
 
-console_stdout = Console()
-console_stderr = Console(file=sys.stderr)
+def __getattr__(name: str) -> 'Console':
+    if name == 'console_stdout':
+        return _console('stdout')
+    if name == 'console_stderr':
+        return _console('stderr')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
-def err(message: str) -> None:
+def err(message: str, **fields: Any) -> None:
     """
     Prints an error message to stderr with a red prefix.
 
     :param message: The message to print.
+    :param fields: Values printed along with the message.
     """
-    err_prefix = Text('err:', style='bold red')
-    console_stderr.print(err_prefix, message)
+    if LEVELS['err'] >= _threshold:
+        _emit('err', message, fields)
 
 
-def suc(message: str) -> None:
+def suc(message: str, **fields: Any) -> None:
     """
     Prints a success message to stdout with a green prefix.
 
     :param message: The message to print.
+    :param fields: Values printed along with the message.
     """
-    suc_prefix = Text('suc:', style='bold green')
-    console_stdout.print(suc_prefix, message, highlight=False)
+    if LEVELS['suc'] >= _threshold:
+        _emit('suc', message, fields)
 
 
-def war(message: str) -> None:
+def war(message: str, **fields: Any) -> None:
     """
     Prints a warning message to stdout with a yellow prefix.
 
     :param message: The message to print.
+    :param fields: Values printed along with the message.
     """
-    war_prefix = Text('war:', style='bold yellow')
-    console_stdout.print(war_prefix, message, highlight=False)
+    if LEVELS['war'] >= _threshold:
+        _emit('war', message, fields)
 
 
-def inf(message: str) -> None:
+def inf(message: str, **fields: Any) -> None:
     """
     Prints an info message to stdout with a blue prefix.
 
     :param message: The message to print.
+    :param fields: Values printed along with the message.
+    """
+    if LEVELS['inf'] >= _threshold:
+        _emit('inf', message, fields)
+
+
+def dbg(message: str, **fields: Any) -> None:
+    """
+    Prints a debug message to stdout with a dim prefix, only once the
+    level is lowered to dbg.
+
+    :param message: The message to print.
+    :param fields: Values printed along with the message.
+    """
+    if LEVELS['dbg'] >= _threshold:
+        _emit('dbg', message, fields)
+
+
+def set_level(level: str) -> None:
+    """
+    Sets the lowest level printed. Messages below it are dropped before
+    being formatted.
+
+    :param level: One of dbg, inf, suc, war and err.
+    :raise ValueError: If the level is unknown.
+    """
+    global _threshold
+
+    if level not in LEVELS:
+        raise ValueError(f'Unknown level {level!r}, expected one of {LEVELS}')
+    _threshold = LEVELS[level]
+
+
+def set_format(format: str) -> None:
+    """
+    Sets how messages are printed: text, rendered by Rich on terminals,
+    or json, one object per line with the level, timestamp, message and
+    fields, whatever the stream is.
+
+    :param format: One of FORMATS.
+    :raise ValueError: If the format is unknown.
     """
-    inf_prefix = Text('inf:', style='bold blue')
-    console_stdout.print(inf_prefix, message, highlight=False)
+    global _format
+
+    if format not in FORMATS:
+        raise ValueError(
+            f'Unknown format {format!r}, expected one of {FORMATS}'
+        )
+    _format = format
 
 
 def sanitize(message: str) -> str:
@@ -55,4 +157,263 @@ def sanitize(message: str) -> str:
     :param message: The message to sanitize.
     :return: The sanitized message string.
     """
-    return escape(message)
+    # Same as rich.markup.escape, without importing rich.
+    markup = _ESCAPE.sub(r'\1\1\\\2', message)
+    if markup.endswith('\\') and not markup.endswith('\\\\'):
+        return markup + '\\'
+    return markup
+
+
+@contextmanager
+def buffered() -> Iterator[None]:
+    """
+    Batches the messages printed within the block, writing them when it
+    ends, or every BUFFER_LINES lines.
+    """
+    global _buffering
+
+    with ExitStack() as stack:
+        # Rich consoles buffer their output while they are entered.
+        for stream in ('stdout', 'stderr'):
+            if _format == 'text' and _is_terminal(stream):
+                stack.enter_context(_console(stream))
+        with _lock:
+            _buffering += 1
+        try:
+            yield
+        finally:
+            with _lock:
+                _buffering -= 1
+                if not _buffering:
+                    _flush()
+
+
+def flush() -> None:
+    """
+    Writes the messages buffered so far.
+    """
+    with _lock:
+        _flush()
+
+
+def start_background() -> None:
+    """
+    Hands the messages to a thread printing them, so callers return
+    right away. The thread is stopped, after printing everything queued,
+    by stop_background() or when the interpreter exits.
+    """
+    global _queue, _worker
+
+    with _lock:
+        if _queue is not None:
+            return
+
+        _queue = queue.SimpleQueue()
+        _worker = threading.Thread(
+            target=_drain, args=(_queue,), name='printer', daemon=True
+        )
+        _worker.start()
+
+
+def stop_background(timeout: float | None = None) -> None:
+    """
+    Prints what is still queued, then stops the background thread.
+
+    :param timeout: Seconds to wait for the thread, None waits forever.
+    """
+    global _queue, _worker
+
+    with _lock:
+        messages, worker, _queue, _worker = _queue, _worker, None, None
+        if messages is not None:
+            messages.put(None)
+
+    if worker is not None:
+        worker.join(timeout)
+
+
+def _emit(level: str, message: str, fields: dict[str, Any]) -> None:
+    # Stamped here, as the background thread may write it much later.
+    record = (level, message, fields, time.time())
+    # Under the lock, so nothing is queued after the sentinel of
+    # stop_background(), where it would never be printed.
+    with _lock:
+        if _queue is not None:
+            _queue.put(record)
+            return
+
+    _write(*record)
+
+
+def _write(
+    level: str, message: str, fields: dict[str, Any], timestamp: float
+) -> None:
+    stream = 'stderr' if level == 'err' else 'stdout'
+    if _format == 'json':
+        line = _to_json(level, message, fields, timestamp)
+    elif _is_terminal(stream):
+        if fields:
+            message = f'{message} {sanitize(_format_fields(fields))}'
+        _console(stream).print(
+            _prefix(level), message, highlight=level == 'err'
+        )
+        return
+    else:
+        # Plain text fast path, skipping the rendering entirely.
+        line = f'{level}: {_strip_markup(message)}'
+        if fields:
+            line = f'{line} {_format_fields(fields)}'
+
+    line += '\n'
+    with _lock:
+        if _buffering:
+            _pending.append((_file(stream), line))
+            if len(_pending) >= BUFFER_LINES:
+                _flush()
+            return
+
+        file = _file(stream)
+        file.write(line)
+        file.flush()
+
+
+def _format_fields(fields: dict[str, Any]) -> str:
+    return ' '.join(f'{key}={value}' for key, value in fields.items())
+
+
+def _to_json(
+    level: str, message: str, fields: dict[str, Any], timestamp: float
+) -> str:
+    record = {
+        'level': level,
+        'timestamp': timestamp,
+        'message': _strip_markup(message),
+        'fields': fields,
+    }
+    return (_dumps or _serializer())(record)
+
+
+def _serializer() -> Callable[[dict[str, Any]], str]:
+    global _dumps
+
+    try:
+        import orjson
+
+        def dumps(record: dict[str, Any]) -> str:
+            return orjson.dumps(record, default=str).decode()
+
+    except ModuleNotFoundError:
+        import json
+
+        def dumps(record: dict[str, Any]) -> str:
+            return json.dumps(
+                record, default=str, ensure_ascii=False, separators=(',', ':')
+            )
+
+    _dumps = dumps
+    return dumps
+
+
+def _flush() -> None:
+    while _pending:
+        file = _pending[0][0]
+        count = 0
+        while count < len(_pending) and _pending[count][0] is file:
+            count += 1
+
+        file.write(''.join(line for _, line in _pending[:count]))
+        del _pending[:count]
+        file.flush()
+
+
+def _drain(messages: queue.SimpleQueue) -> None:
+    while (item := messages.get()) is not None:
+        with buffered():
+            while item is not None:
+                _write(*item)
+                try:
+                    item = messages.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                return
+
+
+def _strip_markup(message: str) -> str:
+    """
+    Removes the markup tags the way Rich renders them, keeping escaped
+    brackets.
+    """
+    message = str(message)
+    if '[' not in message:
+        return message
+    return _TAGS.sub(_replace_tag, message)
+
+
+def _replace_tag(match: re.Match[str]) -> str:
+    escapes = match.group(1)
+    backslashes, escaped = divmod(len(escapes), 2)
+    tag = match.group(0)[len(escapes) :] if escaped else ''
+    return '\\' * backslashes + tag
+
+
+def _console(stream: str) -> 'Console':
+    console = _consoles.get(stream)
+    if console is None:
+        from rich.console import Console
+
+        with _lock:
+            console = _consoles.setdefault(
+                stream, Console(stderr=stream == 'stderr')
+            )
+    return console
+
+
+def _prefix(level: str) -> object:
+    # Built once, instead of on every call.
+    prefix = _prefixes.get(level)
+    if prefix is None:
+        from rich.text import Text
+
+        prefix = _prefixes[level] = Text(f'{level}:', style=STYLES[level])
+    return prefix
+
+
+def _file(stream: str) -> TextIO:
+    console = _consoles.get(stream)
+    if console is not None:
+        return console.file
+    return sys.stderr if stream == 'stderr' else sys.stdout
+
+
+def _is_terminal(stream: str) -> bool:
+    # Answered once for as long as the stream writes to the same file.
+    file = _file(stream)
+    cached = _terminals.get(stream)
+    if cached is None or cached[0] is not file:
+        cached = _terminals[stream] = (file, _detect_terminal(stream, file))
+    return cached[1]
+
+
+def _detect_terminal(stream: str, file: TextIO) -> bool:
+    console = _consoles.get(stream)
+    if console is not None:
+        return console.is_terminal
+
+    # The environment variables Rich honours, then the file itself.
+    tty_compatible = os.environ.get('TTY_COMPATIBLE', '')
+    if tty_compatible in ('0', '1'):
+        return tty_compatible == '1'
+
+    force_color = os.environ.get('FORCE_COLOR')
+    if force_color is not None:
+        return force_color != ''
+
+    isatty = getattr(file, 'isatty', None)
+    try:
+        return bool(isatty and isatty())
+    except ValueError:
+        return False
+
+
+atexit.register(stop_background)
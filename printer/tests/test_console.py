@@ -0,0 +1,164 @@
+import io
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from rich.markup import escape
+from rich.text import Text
+
+from printer import console
+from printer.console import buffered, dbg, err, inf, sanitize, suc, war
+
+
+class TestConsole(TestCase):
+    def tearDown(self):
+        console.set_level('inf')
+        console.set_format('text')
+
+    def test_plain_output_strips_markup(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            inf(f'[b]{sanitize("[x]")}[/b] done')
+            suc('[bold green]ok[/bold green]')
+
+        self.assertEqual(output.getvalue(), 'inf: [x] done\nsuc: ok\n')
+
+    def test_strip_markup_matches_rich(self):
+        messages = [
+            'plain',
+            '[b]bold[/b] and [red]red[/]',
+            sanitize('[not a tag] and \\ backslash'),
+            'escaped \\[b] and \\\\[b]tag[/b]',
+            '[link=https://host.com]link[/link] [1, 2]',
+        ]
+        for message in messages:
+            self.assertEqual(
+                console._strip_markup(message), Text.from_markup(message).plain
+            )
+
+    def test_sanitize_matches_rich(self):
+        messages = ['[b]', 'a \\[b] \\\\[i]', 'ends with \\', '[1, 2] [/x]']
+        for message in messages:
+            self.assertEqual(sanitize(message), escape(message))
+
+    def test_rich_is_imported_lazily(self):
+        code = (
+            'import sys\n'
+            'from printer.console import inf\n'
+            'inf("[b]piped[/b]")\n'
+            'assert "rich" not in sys.modules\n'
+            'from printer.console import console_stdout\n'
+            'assert "rich" in sys.modules\n'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True,
+            check=False,
+            text=True,
+            env={'PYTHONPATH': str(Path(__file__).parents[1])},
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, 'inf: piped\n')
+
+    def test_buffered(self):
+        output = io.StringIO()
+        with redirect_stdout(output), buffered():
+            inf('first')
+            inf('second')
+            self.assertEqual(output.getvalue(), '')
+
+        self.assertEqual(output.getvalue(), 'inf: first\ninf: second\n')
+
+    def test_background(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            console.start_background()
+            for index in range(100):
+                inf(f'message {index}')
+            console.stop_background()
+
+        self.assertEqual(
+            output.getvalue().splitlines(),
+            [f'inf: message {index}' for index in range(100)],
+        )
+
+    def test_message_racing_stop_background_is_printed(self):
+        putting = threading.Event()
+
+        class SlowQueue(queue.SimpleQueue):
+            def put(self, item, *args, **kwargs):
+                if item is not None:
+                    putting.set()
+                    time.sleep(0.1)
+                super().put(item, *args, **kwargs)
+
+        output = io.StringIO()
+        with redirect_stdout(output), patch.object(
+            console.queue, 'SimpleQueue', SlowQueue
+        ):
+            console.start_background()
+            emitter = threading.Thread(target=inf, args=('late',))
+            emitter.start()
+            putting.wait()
+            console.stop_background()
+            emitter.join()
+
+        self.assertEqual(output.getvalue(), 'inf: late\n')
+
+    def test_level_threshold(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            dbg('hidden by default')
+            console.set_level('dbg')
+            dbg('shown', attempt=2)
+            console.set_level('war')
+            inf('hidden')
+            war('shown')
+
+        self.assertEqual(
+            output.getvalue(), 'dbg: shown attempt=2\nwar: shown\n'
+        )
+        self.assertRaises(ValueError, console.set_level, 'verbose')
+
+    def test_json_lines(self):
+        console.set_format('json')
+        output = io.StringIO()
+        errors = io.StringIO()
+        with redirect_stdout(output), redirect_stderr(errors):
+            inf('[b]copied[/b] file', path=Path('a.txt'), size=3)
+            err('failed')
+
+        record = json.loads(output.getvalue())
+        self.assertEqual(record['level'], 'inf')
+        self.assertEqual(record['message'], 'copied file')
+        self.assertEqual(record['fields'], {'path': 'a.txt', 'size': 3})
+        self.assertIsInstance(record['timestamp'], float)
+        self.assertEqual(json.loads(errors.getvalue())['fields'], {})
+
+    def test_format_from_environment(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                '-c',
+                'from printer.console import war; war("x")',
+            ],
+            capture_output=True,
+            check=False,
+            text=True,
+            env={
+                'PYTHONPATH': str(Path(__file__).parents[1]),
+                'PRINTER_FORMAT': 'json',
+                'PRINTER_LEVEL': 'war',
+            },
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout)['level'], 'war')
@@ -1,7 +1,7 @@
 import os
 import subprocess
 from pathlib import Path
-from time import sleep
+from time import perf_counter, sleep
 from typing import List
 
 from commons import CommandResult
@@ -206,6 +206,32 @@ class Adb:
 
         return result.exit_code == 0
 
+    def shell(
+        self,
+        device: str,
+        command: List[str],
+        as_root: bool = False,
+        timeout: int | None = None,
+    ) -> CommandResult:
+        """
+        Runs an arbitrary shell command on the specified device.
+
+        The arguments are joined by adb into a single command line, so
+        anything that must reach the remote shell as one argument has to
+        be quoted by the caller.
+
+        :param device: The ID or serial number of the device.
+        :param command: The command and its arguments.
+        :param as_root: If True, runs the command through su.
+        :param timeout: Maximum time (in seconds) for command execution.
+        :return: A CommandResult object containing the execution details.
+        """
+        prefix = ["-s", device, "shell"]
+        if as_root:
+            prefix += ["su", "0"]
+
+        return self._run_command(prefix + command, timeout)
+
     def file_exists(self, device: str, file_path: str) -> bool:
         result = self._run_command(["-s", device, "shell", "file", file_path])
         return result.exit_code == 0
@@ -407,23 +433,29 @@ class Adb:
             raise ValueError("Every command must be a string")
 
         args = [self.BINARY_PATH] + commands
+        started = perf_counter()
         try:
+            # The output is kept as bytes, CommandResult decodes it and
+            # splits it into lines only if it is read.
             result = subprocess.run(
                 args,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 timeout=timeout,
-                universal_newlines=True,
                 check=True,
             )
-            stdout = result.stdout.splitlines() if result.stdout else None
-            stderr = result.stderr.splitlines() if result.stderr else None
-            return CommandResult(stdout, stderr, result.returncode)
+            return CommandResult(
+                result.stdout,
+                result.stderr,
+                result.returncode,
+                perf_counter() - started,
+            )
         except subprocess.TimeoutExpired:
-            return CommandResult(None, None, 1)
+            return CommandResult(None, None, 1, perf_counter() - started)
         except subprocess.CalledProcessError as e:
-            stderr = e.stderr.splitlines() if e.stderr else None
-            return CommandResult(None, stderr, e.returncode)
+            return CommandResult(
+                None, e.stderr, e.returncode, perf_counter() - started
+            )
 
     @classmethod
     def _discover_from_path(cls, binary_name: str) -> List[str]:
@@ -65,6 +65,28 @@ class TestMockedAdb(TestCase):
         self.assertEqual(len(command_result.stdout), 1)
         self.assertEqual(command_result.exit_code, 0)
 
+    @patch("subprocess.run")
+    @patch("py_adb.Adb._discover_from_path")
+    @patch("py_adb.Adb._is_adb_available")
+    def test_run_keeps_raw_output(
+        self,
+        mock_is_adb_available: MagicMock,
+        mock_discover_from_path: MagicMock,
+        mock_run: MagicMock,
+    ) -> None:
+        mock_is_adb_available.return_value = True
+        mock_discover_from_path.return_value = ["1"]
+        mock_run.return_value = subprocess.CompletedProcess(
+            args="adb shell ps", returncode=0, stdout=b"1\r\n2\r\n", stderr=b""
+        )
+
+        adb = Adb()
+        command_result = adb._run_command(["shell", "ps"])
+        self.assertEqual(command_result.raw_stdout, b"1\r\n2\r\n")
+        self.assertEqual(command_result.stdout, ["1", "2"])
+        self.assertIsNone(command_result.stderr)
+        self.assertGreaterEqual(command_result.duration, 0)
+
     @patch("subprocess.run")
     @patch("py_adb.Adb._discover_from_path")
     @patch("py_adb.Adb._is_adb_available")